@@ -0,0 +1,36 @@
+"""Evidence text extraction columns
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        # Fresh database: Base.metadata.create_all() builds the full table
+        return True
+    return column in {c['name'] for c in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    # New tables (extraction_jobs) are created by Base.metadata.create_all() in main.py
+    if not _has_column('evidence', 'extracted_text'):
+        op.add_column('evidence', sa.Column('extracted_text', sa.Text()))
+    if not _has_column('evidence', 'page_count'):
+        op.add_column('evidence', sa.Column('page_count', sa.Integer()))
+
+
+def downgrade() -> None:
+    op.drop_column('evidence', 'page_count')
+    op.drop_column('evidence', 'extracted_text')
@@ -0,0 +1,36 @@
+"""Evidence full-text search index
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    if not bind.dialect.has_table(bind, 'evidence'):
+        # Fresh database: Base.metadata.create_all() builds the index with the table
+        return
+    # Must match models.evidence_search_vector() exactly for the planner to use it
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_evidence_search_vector ON evidence USING gin ((
+            setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(content_text, '')), 'C') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(extracted_text, '')), 'D')
+        ))
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_evidence_search_vector")
@@ -0,0 +1,41 @@
+"""Trigram indexes for unified search
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ('ix_controls_title_trgm', 'controls', 'title'),
+    ('ix_controls_description_trgm', 'controls', 'description'),
+    ('ix_risks_title_trgm', 'risks', 'title'),
+    ('ix_risks_category_trgm', 'risks', 'category'),
+    ('ix_policies_title_trgm', 'policies', 'title'),
+    ('ix_policies_content_trgm', 'policies', 'content'),
+    ('ix_requirements_code_trgm', 'requirements', 'code'),
+    ('ix_requirements_title_trgm', 'requirements', 'title'),
+]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in TRIGRAM_INDEXES:
+        # Fresh database: Base.metadata.create_all() builds these with the tables
+        if bind.dialect.has_table(bind, table):
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    for name, _, _ in TRIGRAM_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
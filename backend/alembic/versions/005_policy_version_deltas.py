@@ -0,0 +1,42 @@
+"""Delta-compressed policy version history
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('policy_versions'):
+        # Fresh database: Base.metadata.create_all() builds the full table
+        return
+    columns = {c['name'] for c in inspector.get_columns('policy_versions')}
+    with op.batch_alter_table('policy_versions') as batch:
+        if 'revision' not in columns:
+            batch.add_column(sa.Column('revision', sa.Integer()))
+        if 'is_snapshot' not in columns:
+            batch.add_column(sa.Column('is_snapshot', sa.Boolean(), nullable=False, server_default=sa.true()))
+        if 'delta' not in columns:
+            batch.add_column(sa.Column('delta', sa.Text()))
+        batch.alter_column('content', existing_type=sa.Text(), nullable=True)
+    op.create_index('ix_policy_versions_policy_revision', 'policy_versions', ['policy_id', 'revision'], unique=True)
+    # Existing rows keep their full content until `python policy_history.py` converts them;
+    # update_policy also converts a policy's rows the first time it is edited.
+
+
+def downgrade() -> None:
+    op.drop_index('ix_policy_versions_policy_revision', 'policy_versions')
+    with op.batch_alter_table('policy_versions') as batch:
+        batch.drop_column('delta')
+        batch.drop_column('is_snapshot')
+        batch.drop_column('revision')
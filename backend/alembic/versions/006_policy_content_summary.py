@@ -0,0 +1,45 @@
+"""Policy content length and hash for summary listings
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('policies'):
+        # Fresh database: Base.metadata.create_all() builds the full table
+        return
+    columns = {c['name'] for c in inspector.get_columns('policies')}
+    if 'content_length' not in columns:
+        op.add_column('policies', sa.Column('content_length', sa.Integer()))
+    if 'content_hash' not in columns:
+        op.add_column('policies', sa.Column('content_hash', sa.String(64)))
+
+    # Must match Policy._track_content
+    policies = sa.table('policies', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                        sa.column('content_length', sa.Integer), sa.column('content_hash', sa.String))
+    rows = bind.execute(sa.select(policies.c.id, policies.c.content).where(policies.c.content_hash.is_(None))).fetchall()
+    for policy_id, content in rows:
+        bind.execute(policies.update().where(policies.c.id == policy_id).values(
+            content_length=len(content),
+            content_hash=hashlib.sha256(content.encode('utf-8')).hexdigest()
+        ))
+
+
+def downgrade() -> None:
+    op.drop_column('policies', 'content_hash')
+    op.drop_column('policies', 'content_length')
@@ -0,0 +1,28 @@
+"""Risk likelihood/impact index for heatmap aggregates
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('risks'):
+        # Fresh database: Base.metadata.create_all() builds the full table
+        return
+    if 'ix_risks_likelihood_impact' not in {i['name'] for i in inspector.get_indexes('risks')}:
+        op.create_index('ix_risks_likelihood_impact', 'risks', ['likelihood', 'impact'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_risks_likelihood_impact', table_name='risks')
@@ -0,0 +1,53 @@
+"""Structured risk history diffs; history survives risk deletion
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # New tables (risk_register_snapshots) are created by Base.metadata.create_all() in main.py
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('risk_history'):
+        # Fresh database: Base.metadata.create_all() builds the full table
+        return
+    columns = {c['name'] for c in inspector.get_columns('risk_history')}
+    if 'risk_ref' not in columns:
+        op.add_column('risk_history', sa.Column('risk_ref', sa.Integer()))
+        op.execute("UPDATE risk_history SET risk_ref = risk_id")
+        op.create_index('ix_risk_history_risk_ref', 'risk_history', ['risk_ref'])
+    if 'action' not in columns:
+        op.add_column('risk_history', sa.Column('action', sa.String()))
+    if 'changes' not in columns:
+        json_type = postgresql.JSONB() if bind.dialect.name == 'postgresql' else sa.JSON()
+        op.add_column('risk_history', sa.Column('changes', json_type))
+    if 'ix_risk_history_changed_at' not in {i['name'] for i in inspector.get_indexes('risk_history')}:
+        op.create_index('ix_risk_history_changed_at', 'risk_history', ['changed_at'])
+
+    if bind.dialect.name == 'postgresql':
+        # Keep history rows when their risk is deleted
+        for fk in inspector.get_foreign_keys('risk_history'):
+            if fk['referred_table'] == 'risks':
+                op.drop_constraint(fk['name'], 'risk_history', type_='foreignkey')
+        op.create_foreign_key('risk_history_risk_id_fkey', 'risk_history', 'risks', ['risk_id'], ['id'], ondelete='SET NULL')
+        op.alter_column('risk_history', 'risk_id', nullable=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_risk_history_changed_at', table_name='risk_history')
+    op.drop_index('ix_risk_history_risk_ref', table_name='risk_history')
+    op.drop_column('risk_history', 'changes')
+    op.drop_column('risk_history', 'action')
+    op.drop_column('risk_history', 'risk_ref')
@@ -0,0 +1,34 @@
+"""FAIR frequency and magnitude ranges on risks
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+FAIR_COLUMNS = ('lef_min', 'lef_mode', 'lef_max', 'lm_min', 'lm_mode', 'lm_max')
+
+
+def upgrade() -> None:
+    # New tables (risk_simulations) are created by Base.metadata.create_all() in main.py
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('risks'):
+        # Fresh database: Base.metadata.create_all() builds the full table
+        return
+    columns = {c['name'] for c in inspector.get_columns('risks')}
+    for name in FAIR_COLUMNS:
+        if name not in columns:
+            op.add_column('risks', sa.Column(name, sa.Float()))
+
+
+def downgrade() -> None:
+    for name in reversed(FAIR_COLUMNS):
+        op.drop_column('risks', name)
@@ -0,0 +1,37 @@
+"""Indexes for framework gap analysis anti-joins
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_control_requirement_requirement_control', 'control_requirement', ['requirement_id', 'control_id']),
+    ('ix_control_requirement_control', 'control_requirement', ['control_id']),
+    ('ix_requirements_framework_id', 'requirements', ['framework_id']),
+    ('ix_evidence_control_id', 'evidence', ['control_id']),
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if not inspector.has_table(table):
+            # Fresh database: Base.metadata.create_all() builds the full table
+            continue
+        if name not in {i['name'] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,29 @@
+"""Requirement change time for catalog re-imports
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('requirements'):
+        # Fresh database: Base.metadata.create_all() builds the full table
+        return
+    columns = {c['name'] for c in inspector.get_columns('requirements')}
+    if 'updated_at' not in columns:
+        op.add_column('requirements', sa.Column('updated_at', sa.DateTime(timezone=True)))
+
+
+def downgrade() -> None:
+    op.drop_column('requirements', 'updated_at')
@@ -0,0 +1,53 @@
+"""Alert types and control indexes for the monitoring scheduler
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_controls_last_checked', 'controls', ['last_checked']),
+    ('ix_controls_created_at', 'controls', ['created_at']),
+    ('ix_controls_updated_at', 'controls', ['updated_at']),
+)
+
+
+def upgrade() -> None:
+    # New tables (monitor_jobs) are created by Base.metadata.create_all() in main.py
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('alerts'):
+        columns = {c['name'] for c in inspector.get_columns('alerts')}
+        # Batch mode: SQLite cannot add a column with a foreign key in place
+        with op.batch_alter_table('alerts') as batch:
+            if 'alert_type' not in columns:
+                batch.add_column(sa.Column('alert_type', sa.String()))
+                batch.create_index('ix_alerts_alert_type', ['alert_type'])
+            if 'related_policy_id' not in columns:
+                batch.add_column(sa.Column('related_policy_id', sa.Integer()))
+                batch.create_foreign_key(
+                    'fk_alerts_related_policy_id', 'policies', ['related_policy_id'], ['id'], ondelete='CASCADE'
+                )
+    # Fresh database: Base.metadata.create_all() builds the full tables
+    for name, table, columns in INDEXES:
+        if inspector.has_table(table) and name not in {i['name'] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    if sa.inspect(op.get_bind()).has_table('alerts'):
+        # Dropping the column drops its foreign key too
+        with op.batch_alter_table('alerts') as batch:
+            batch.drop_index('ix_alerts_alert_type')
+            batch.drop_column('related_policy_id')
+            batch.drop_column('alert_type')
@@ -0,0 +1,61 @@
+"""Alert fingerprints, occurrence counters and last-seen time
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if inspector.has_table('monitor_jobs'):
+        if 'last_resolved' not in {c['name'] for c in inspector.get_columns('monitor_jobs')}:
+            with op.batch_alter_table('monitor_jobs') as batch:
+                batch.add_column(sa.Column('last_resolved', sa.Integer(), nullable=False, server_default='0'))
+    if not inspector.has_table('alerts'):
+        # Fresh database: Base.metadata.create_all() builds the full table
+        return
+    columns = {c['name'] for c in inspector.get_columns('alerts')}
+    # Batch mode: SQLite cannot add a column with a non-constant default in place
+    with op.batch_alter_table('alerts') as batch:
+        if 'fingerprint' not in columns:
+            # Existing alerts keep a NULL fingerprint and are never coalesced
+            batch.add_column(sa.Column('fingerprint', sa.String()))
+        if 'occurrences' not in columns:
+            batch.add_column(sa.Column('occurrences', sa.Integer(), nullable=False, server_default='1'))
+        if 'last_seen_at' not in columns:
+            batch.add_column(sa.Column('last_seen_at', sa.DateTime(timezone=True), server_default=sa.func.now()))
+    if 'last_seen_at' not in columns:
+        op.execute("UPDATE alerts SET last_seen_at = created_at")
+
+    indexes = {i['name'] for i in inspector.get_indexes('alerts')}
+    if 'uq_alerts_open_fingerprint' not in indexes:
+        where = sa.text('is_resolved = false') if bind.dialect.name == 'postgresql' else sa.text('is_resolved = 0')
+        op.create_index('uq_alerts_open_fingerprint', 'alerts', ['fingerprint'], unique=True,
+                        postgresql_where=where, sqlite_where=where)
+    if 'ix_alerts_last_seen_at' not in indexes:
+        op.create_index('ix_alerts_last_seen_at', 'alerts', ['last_seen_at'])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('alerts'):
+        op.drop_index('ix_alerts_last_seen_at', table_name='alerts')
+        op.drop_index('uq_alerts_open_fingerprint', table_name='alerts')
+        with op.batch_alter_table('alerts') as batch:
+            batch.drop_column('last_seen_at')
+            batch.drop_column('occurrences')
+            batch.drop_column('fingerprint')
+    if inspector.has_table('monitor_jobs'):
+        with op.batch_alter_table('monitor_jobs') as batch:
+            batch.drop_column('last_resolved')
@@ -0,0 +1,42 @@
+"""Plain-text titles in stored policy tables of contents
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+import html
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def _unescape(entries):
+    return [{**e, 'title': html.unescape(e['title']), 'children': _unescape(e.get('children', []))} for e in entries]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('policy_renderings'):
+        return
+    # Renderings are kept per content hash (old revisions are served from
+    # them), so titles are fixed in place instead of re-rendering
+    rows = bind.execute(sa.text("SELECT id, toc FROM policy_renderings")).fetchall()
+    updates = []
+    for row_id, toc in rows:
+        fixed = json.dumps(_unescape(json.loads(toc)))
+        if fixed != toc:
+            updates.append({'id': row_id, 'toc': fixed})
+    if updates:
+        bind.execute(sa.text("UPDATE policy_renderings SET toc = :toc WHERE id = :id"), updates)
+
+
+def downgrade() -> None:
+    pass
@@ -0,0 +1,51 @@
+"""Render version on stored policy renderings
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table('policy_renderings'):
+        return
+    columns = {c['name'] for c in inspector.get_columns('policy_renderings')}
+    indexes = {i['name'] for i in inspector.get_indexes('policy_renderings')}
+    with op.batch_alter_table('policy_renderings') as batch:
+        if 'render_version' not in columns:
+            batch.add_column(sa.Column('render_version', sa.Integer(), nullable=False, server_default='1'))
+        if 'ix_policy_renderings_policy_hash' in indexes:
+            batch.drop_index('ix_policy_renderings_policy_hash')
+        if 'ix_policy_renderings_policy_hash_version' not in indexes:
+            batch.create_index(
+                'ix_policy_renderings_policy_hash_version',
+                ['policy_id', 'content_hash', 'render_version'], unique=True
+            )
+    # 014 already brought stored renderings in line with render version 2
+    bind.execute(sa.text("UPDATE policy_renderings SET render_version = 2"))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('policy_renderings'):
+        return
+    # Keep the newest rendering per (policy, hash) so the old unique index fits
+    bind.execute(sa.text(
+        "DELETE FROM policy_renderings WHERE id NOT IN ("
+        "SELECT MAX(id) FROM policy_renderings GROUP BY policy_id, content_hash)"
+    ))
+    with op.batch_alter_table('policy_renderings') as batch:
+        batch.drop_index('ix_policy_renderings_policy_hash_version')
+        batch.create_index('ix_policy_renderings_policy_hash', ['policy_id', 'content_hash'], unique=True)
+        batch.drop_column('render_version')
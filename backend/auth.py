@@ -13,6 +13,8 @@ from models import User, UserRole
 SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key_change_in_production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480  # 8 hours
+STREAM_TICKET_EXPIRE_SECONDS = int(os.getenv("STREAM_TICKET_EXPIRE_SECONDS", "60"))
+STREAM_SCOPE = "live"
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -40,6 +42,28 @@ def decode_token(token: str):
     except JWTError:
         return None
 
+def create_stream_ticket(email: str) -> str:
+    """Short-lived token that only opens the live update stream
+
+    EventSource cannot send headers, so the stream takes its credential in
+    the URL, where access logs record it; a ticket is useless elsewhere and
+    soon expires.
+    """
+    return create_access_token(
+        {"sub": email, "scope": STREAM_SCOPE}, expires_delta=timedelta(seconds=STREAM_TICKET_EXPIRE_SECONDS)
+    )
+
+def user_for_stream_ticket(db: Session, ticket: Optional[str]) -> Optional[User]:
+    """Active user for a stream ticket, or None"""
+    payload = decode_token(ticket) if ticket else None
+    if payload is None or payload.get("scope") != STREAM_SCOPE:
+        return None
+    email = payload.get("sub")
+    if email is None:
+        return None
+    user = db.query(User).filter(User.email == email).first()
+    return user if user is not None and user.is_active else None
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -53,7 +77,8 @@ async def get_current_user(
     token = credentials.credentials
     payload = decode_token(token)
     
-    if payload is None:
+    # Scoped tokens (stream tickets) are not API credentials
+    if payload is None or payload.get("scope") is not None:
         raise credentials_exception
     
     email: str = payload.get("sub")
@@ -0,0 +1,84 @@
+"""Benchmark list endpoints: legacy ORM rows + double validation vs column tuples
+
+Usage: python benchmark_serialization.py [rows] [iterations]
+Runs against a throwaway SQLite database; DATABASE_URL is overridden.
+Reports the median request time of each path.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/bench.db"
+os.environ.setdefault("EVIDENCE_DIR", f"{_tmp}/evidence")
+
+from typing import List
+
+from fastapi import Depends
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+import main
+from auth import create_access_token
+from database import SessionLocal, get_db
+from models import Control, ControlStatus, Evidence, Risk, RiskLevel, User, UserRole
+from schemas import ControlResponse, EvidenceResponse, RiskResponse
+
+
+def seed(rows: int):
+    db = SessionLocal()
+    db.add(User(email="bench@isms.local", full_name="Bench", role=UserRole.ADMIN, hashed_password="x"))
+    controls = [Control(title=f"Control {i}", description="d" * 200, status=ControlStatus.IN_PROGRESS) for i in range(rows)]
+    db.add_all(controls)
+    db.flush()
+    db.add_all(Evidence(control_id=c.id, title=f"Evidence {c.id}", description="e" * 200) for c in controls)
+    db.add_all(
+        Risk(title=f"Risk {i}", description="r" * 200, likelihood=3, impact=4, risk_score=12, risk_level=RiskLevel.HIGH)
+        for i in range(rows)
+    )
+    db.commit()
+    db.close()
+
+
+def add_legacy_routes(rows: int):
+    """The pre-fast-path implementation: model_validate per row, then response_model again"""
+    for path, model, schema in (
+        ("/bench/legacy/controls", Control, ControlResponse),
+        ("/bench/legacy/risks", Risk, RiskResponse),
+        ("/bench/legacy/evidence", Evidence, EvidenceResponse),
+    ):
+        def endpoint(db=Depends(get_db), model=model, schema=schema):
+            return [schema.model_validate(o) for o in db.query(model).limit(rows).all()]
+        main.app.add_api_route(path, endpoint, response_model=List[schema], response_class=JSONResponse)
+
+
+def timed(client, url, headers, iterations):
+    client.get(url, headers=headers)  # warm up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seed(rows)
+    add_legacy_routes(rows)
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench@isms.local"})}
+    client = TestClient(main.app)
+
+    print(f"{rows} rows, {iterations} iterations")
+    for name, fast_url in (
+        ("controls", f"/api/controls?limit={rows}"),
+        ("risks", f"/api/risks?limit={rows}"),
+        ("evidence", "/api/evidence"),
+    ):
+        legacy = timed(client, f"/bench/legacy/{name}", headers, iterations)
+        fast = timed(client, fast_url, headers, iterations)
+        print(f"{name:10s} legacy {legacy * 1000:8.1f} ms   fast {fast * 1000:8.1f} ms   speedup {legacy / fast:5.2f}x")
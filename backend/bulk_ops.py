@@ -0,0 +1,261 @@
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session, selectinload
+
+from invalidation import CONTROLS, RISKS, publish
+from mapping_graph import mapping_graph
+from models import Control, Requirement, Risk, User
+from risk_history import record_change, risk_state
+from risk_quant import ranges_after, validate_ranges
+from risk_scoring import get_active_matrix
+from schemas import ControlBulkPatch, ControlCreate, RiskBulkPatch, RiskCreate
+
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "5000"))
+IN_CHUNK_SIZE = 1000
+
+# Columns that reject an explicit null in a patch
+CONTROL_REQUIRED = ("title", "status")
+RISK_REQUIRED = ("title", "likelihood", "impact", "status")
+
+
+class RowError(Exception):
+    pass
+
+
+@dataclass
+class BulkReport:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    results: List[dict] = field(default_factory=list)  # {index, id, action} per saved row
+    errors: List[dict] = field(default_factory=list)  # {index, id, detail} per rejected row
+
+    def ok(self, index: int, id: int, action: str):
+        setattr(self, action, getattr(self, action) + 1)
+        self.results.append({"index": index, "id": id, "action": action})
+
+    def fail(self, index: int, detail: str, id: Optional[int] = None):
+        self.failed += 1
+        self.errors.append({"index": index, "id": id, "detail": detail})
+
+
+# ============ Batched lookups ============
+
+def _chunks(ids: Iterable[int]) -> Iterable[List[int]]:
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        yield ids[start:start + IN_CHUNK_SIZE]
+
+
+def _existing_ids(db: Session, column, ids: Iterable[int]) -> Set[int]:
+    found = set()
+    for chunk in _chunks(ids):
+        found.update(i for (i,) in db.query(column).filter(column.in_(chunk)))
+    return found
+
+
+def _load(db: Session, model, ids: Iterable[int], *options) -> Dict[int, object]:
+    rows = {}
+    for chunk in _chunks(ids):
+        rows.update((row.id, row) for row in db.query(model).options(*options).filter(model.id.in_(chunk)))
+    return rows
+
+
+def _row_id(item) -> Optional[int]:
+    """The item's id for error reports, if it is one; bad ids are reported by validation"""
+    id = item.get("id") if isinstance(item, dict) else None
+    return id if isinstance(id, int) and not isinstance(id, bool) else None
+
+
+def _parse(items: List[Any], create_schema, patch_schema, allow_create: bool, report: BulkReport) -> List[tuple]:
+    """(index, validated row) per valid item; items with an id are patches"""
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise RowError("item must be an object")
+            if item.get("id") is None and not allow_create:
+                raise RowError("id is required")
+            schema = patch_schema if item.get("id") is not None else create_schema
+            parsed.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            report.fail(index, detail, _row_id(item))
+        except RowError as e:
+            report.fail(index, str(e), _row_id(item))
+    return parsed
+
+
+def _changes(row: BaseModel, required: tuple) -> dict:
+    # Patches touch only the fields they send; creates take the schema defaults
+    data = row.model_dump(exclude_unset="id" in row.model_fields, exclude={"id"})
+    nulls = [name for name in required if name in data and data[name] is None]
+    if nulls:
+        raise RowError(f"{', '.join(nulls)} cannot be null")
+    return data
+
+
+def _check_ids(kind: str, wanted: Iterable[int], known) -> None:
+    missing = sorted(set(wanted) - set(known))
+    if missing:
+        raise RowError(f"Unknown {kind} ids: {missing}")
+
+
+def _assign(obj, data: dict) -> bool:
+    changed = False
+    for key, value in data.items():
+        if getattr(obj, key) != value:
+            setattr(obj, key, value)
+            changed = True
+    return changed
+
+
+# ============ Controls ============
+
+def save_controls(db: Session, items: List[Any], allow_create: bool = True) -> BulkReport:
+    """Create controls (rows without id) and patch existing ones (rows with id) in one transaction"""
+    report = BulkReport()
+    rows = _parse(items, ControlCreate, ControlBulkPatch, allow_create, report)
+
+    requirements = _load(db, Requirement, (r for _, row in rows for r in row.requirement_ids or ()))
+    owners = _existing_ids(db, User.id, (row.owner_id for _, row in rows if row.owner_id is not None))
+    controls = _load(db, Control, (row.id for _, row in rows if isinstance(row, ControlBulkPatch)),
+                     selectinload(Control.requirements))
+
+    now = datetime.utcnow()
+    saved = []
+    seen = set()
+    for index, row in rows:
+        try:
+            data = _changes(row, CONTROL_REQUIRED)
+            requirement_ids = data.pop("requirement_ids", None)
+            if requirement_ids is not None:
+                _check_ids("requirement", requirement_ids, requirements)
+            if data.get("owner_id") is not None:
+                _check_ids("owner", [data["owner_id"]], owners)
+
+            if isinstance(row, ControlBulkPatch):
+                control = controls.get(row.id)
+                if control is None:
+                    raise RowError("Control not found")
+                if row.id in seen:
+                    raise RowError("Control appears more than once")
+                seen.add(row.id)
+                changed = _assign(control, data)
+                if requirement_ids is not None and {r.id for r in control.requirements} != set(requirement_ids):
+                    control.requirements = [requirements[r] for r in set(requirement_ids)]
+                    changed = True
+                if changed:
+                    control.last_checked = now
+                saved.append((index, control, "updated" if changed else "unchanged", requirement_ids is not None))
+            else:
+                control = Control(**data)
+                control.requirements = [requirements[r] for r in set(requirement_ids or ())]
+                db.add(control)
+                saved.append((index, control, "created", True))
+        except RowError as e:
+            report.fail(index, str(e), getattr(row, "id", None))
+
+    try:
+        db.flush()
+        # Read ids and mappings before commit expires the objects
+        graph = [
+            (control.id, control.status, [r.id for r in control.requirements] if mapped else None)
+            for _, control, action, mapped in saved if action != "unchanged"
+        ]
+        for index, control, action, _ in saved:
+            report.ok(index, control.id, action)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    for control_id, status, requirement_ids in graph:
+        mapping_graph.upsert_control(control_id, status, requirement_ids)
+    if graph:
+        publish(db, CONTROLS, [control_id for control_id, _, _ in graph])
+    return report
+
+
+# ============ Risks ============
+
+def save_risks(db: Session, items: List[Any], changed_by_id: Optional[int], allow_create: bool = True) -> BulkReport:
+    """Create risks (rows without id) and patch existing ones (rows with id) in one transaction
+
+    Scores come from the active matrix and every created or changed risk gets
+    its structured history row, as with the single-risk endpoints.
+    """
+    report = BulkReport()
+    rows = _parse(items, RiskCreate, RiskBulkPatch, allow_create, report)
+
+    matrix = get_active_matrix(db)
+    controls = _load(db, Control, (c for _, row in rows for c in row.control_ids or ()))
+    owners = _existing_ids(db, User.id, (row.owner_id for _, row in rows if row.owner_id is not None))
+    risks = _load(db, Risk, (row.id for _, row in rows if isinstance(row, RiskBulkPatch)),
+                  selectinload(Risk.controls))
+
+    saved = []
+    seen = set()
+    for index, row in rows:
+        try:
+            data = _changes(row, RISK_REQUIRED)
+            control_ids = data.pop("control_ids", None)
+            if control_ids is not None:
+                _check_ids("control", control_ids, controls)
+            if data.get("owner_id") is not None:
+                _check_ids("owner", [data["owner_id"]], owners)
+
+            if isinstance(row, RiskBulkPatch):
+                risk = risks.get(row.id)
+                if risk is None:
+                    raise RowError("Risk not found")
+                if row.id in seen:
+                    raise RowError("Risk appears more than once")
+                problem = validate_ranges(ranges_after(risk, data))
+                if problem:
+                    raise RowError(problem)
+                seen.add(row.id)
+                before = risk_state(risk)
+                _assign(risk, data)
+                if "likelihood" in data or "impact" in data:
+                    matrix.apply(risk)
+                if control_ids is not None and {c.id for c in risk.controls} != set(control_ids):
+                    risk.controls = [controls[c] for c in set(control_ids)]
+                saved.append((index, risk, before, control_ids is not None))
+            else:
+                problem = validate_ranges(data)
+                if problem:
+                    raise RowError(problem)
+                risk = Risk(**data)
+                matrix.apply(risk)
+                risk.controls = [controls[c] for c in set(control_ids or ())]
+                db.add(risk)
+                saved.append((index, risk, None, True))
+        except RowError as e:
+            report.fail(index, str(e), getattr(row, "id", None))
+
+    try:
+        db.flush()  # New risks get their ids in one batched insert
+        graph = []
+        for index, risk, before, mapped in saved:
+            if before is None:
+                record_change(db, risk, None, "created", changed_by_id)
+                action = "created"
+            else:
+                action = "updated" if record_change(db, risk, before, "updated", changed_by_id) else "unchanged"
+            report.ok(index, risk.id, action)
+            if action != "unchanged":
+                graph.append((risk.id, [c.id for c in risk.controls] if mapped else None))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    for risk_id, control_ids in graph:
+        mapping_graph.upsert_risk(risk_id, control_ids)
+    if graph:
+        publish(db, RISKS, [risk_id for risk_id, _ in graph])
+    return report
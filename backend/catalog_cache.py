@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from invalidation import CATALOG, subscribe
+from models import Framework, Requirement
+from responses import make_etag
+from schemas import FrameworkResponse, RequirementResponse
+
+_frameworks = TypeAdapter(List[FrameworkResponse])
+_requirements = TypeAdapter(List[RequirementResponse])
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes  # Serialized JSON, sent as-is
+    etag: str
+
+
+def _cached(kind: str, key, body: bytes) -> CachedBody:
+    # Content-addressed, so every worker derives the same ETag for the same catalog
+    return CachedBody(body, make_etag(kind, key, hashlib.sha1(body).hexdigest()))
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    generation: int
+    frameworks: CachedBody
+    framework: Mapping[int, CachedBody]
+    requirements: CachedBody
+    requirements_by_framework: Mapping[int, CachedBody]
+
+    def framework_requirements(self, framework_id: int) -> CachedBody:
+        cached = self.requirements_by_framework.get(framework_id)
+        return cached if cached is not None else _cached("requirements", framework_id, b"[]")
+
+
+def build_snapshot(db: Session, generation: int) -> CatalogSnapshot:
+    frameworks = _frameworks.validate_python(db.query(Framework).order_by(Framework.id).all(), from_attributes=True)
+    requirements = _requirements.validate_python(db.query(Requirement).order_by(Requirement.id).all(), from_attributes=True)
+
+    by_framework: Dict[int, List[RequirementResponse]] = {}
+    for requirement in requirements:
+        by_framework.setdefault(requirement.framework_id, []).append(requirement)
+
+    return CatalogSnapshot(
+        generation=generation,
+        frameworks=_cached("frameworks", None, _frameworks.dump_json(frameworks)),
+        framework=MappingProxyType({
+            f.id: _cached("framework", f.id, f.model_dump_json().encode("utf-8")) for f in frameworks
+        }),
+        requirements=_cached("requirements", None, _requirements.dump_json(requirements)),
+        requirements_by_framework=MappingProxyType({
+            framework_id: _cached("requirements", framework_id, _requirements.dump_json(rows))
+            for framework_id, rows in by_framework.items()
+        }),
+    )
+
+
+class CatalogCache:
+    """Read-only in-process copy of the framework catalog
+
+    Readers get an immutable snapshot; invalidation only bumps the generation
+    and the next read builds a replacement and swaps it in. A build that
+    overlaps an invalidation is already stale when installed, so it is
+    rebuilt on the following read.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def invalidate(self):
+        with self._generation_lock:
+            self._generation += 1
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == self._generation:
+            return snapshot
+        with self._build_lock:
+            snapshot = self._snapshot
+            generation = self._generation
+            if snapshot is None or snapshot.generation != generation:
+                snapshot = self._snapshot = build_snapshot(db, generation)
+            return snapshot
+
+
+catalog_cache = CatalogCache()
+subscribe(CATALOG, lambda event: catalog_cache.invalidate())
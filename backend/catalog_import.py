@@ -0,0 +1,276 @@
+import codecs
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import Session
+
+from models import Framework, Requirement
+
+try:
+    import ijson
+except ImportError:  # optional: OSCAL files are then parsed in one piece
+    ijson = None
+
+IMPORT_BATCH_SIZE = 1000
+
+# Accepted CSV header names for each requirement field
+CSV_COLUMNS = {
+    "code": ("code", "id", "control_id", "requirement_id", "identifier"),
+    "title": ("title", "name"),
+    "description": ("description", "text", "statement"),
+}
+
+
+class CatalogError(ValueError):
+    pass
+
+
+@dataclass
+class CatalogRow:
+    code: str
+    title: str
+    description: Optional[str] = None
+
+
+@dataclass
+class ImportReport:
+    framework_id: Optional[int] = None
+    framework_name: Optional[str] = None
+    version: Optional[str] = None
+    framework_created: bool = False
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0  # Existing requirements absent from the file (deleted only with prune)
+    duplicates: int = 0
+    dry_run: bool = False
+    removed_codes: List[str] = field(default_factory=list)
+
+
+# ============ Parsers ============
+
+def parse_csv(stream: BinaryIO) -> Iterator[CatalogRow]:
+    reader = csv.DictReader(codecs.getreader("utf-8-sig")(stream))
+    headers = {h.strip().lower(): h for h in reader.fieldnames or []}
+    columns = {}
+    for name, aliases in CSV_COLUMNS.items():
+        columns[name] = next((headers[a] for a in aliases if a in headers), None)
+    if columns["code"] is None or columns["title"] is None:
+        raise CatalogError("CSV needs a code and a title column")
+    for line, row in enumerate(reader, start=2):
+        code = (row.get(columns["code"]) or "").strip()
+        title = (row.get(columns["title"]) or "").strip()
+        if not code or not title:
+            raise CatalogError(f"CSV line {line}: code and title are required")
+        description = row.get(columns["description"]) if columns["description"] else None
+        yield CatalogRow(code, title, description.strip() if description else None)
+
+
+def _prose(parts: List[dict]) -> List[str]:
+    text = []
+    for part in parts or []:
+        if part.get("prose"):
+            text.append(part["prose"].strip())
+        text.extend(_prose(part.get("parts")))
+    return text
+
+
+def _oscal_code(control: dict) -> str:
+    for prop in control.get("props") or []:
+        if prop.get("name") == "label" and prop.get("value"):
+            return prop["value"]
+    return control["id"].upper()
+
+
+def _oscal_controls(controls: List[dict]) -> Iterator[CatalogRow]:
+    """Controls and their enhancements (nested controls), depth first"""
+    for control in controls or []:
+        if "id" not in control or "title" not in control:
+            raise CatalogError("OSCAL control without id or title")
+        statements = [p for p in control.get("parts") or [] if p.get("name") == "statement"]
+        description = "\n".join(_prose(statements)) or None
+        yield CatalogRow(_oscal_code(control), control["title"].strip(), description)
+        yield from _oscal_controls(control.get("controls"))
+
+
+def _oscal_group(group: dict) -> Iterator[CatalogRow]:
+    yield from _oscal_controls(group.get("controls"))
+    for subgroup in group.get("groups") or []:
+        yield from _oscal_group(subgroup)
+
+
+def parse_oscal(stream: BinaryIO, metadata: Optional[dict] = None) -> Iterator[CatalogRow]:
+    """Controls of an OSCAL catalog; with ijson only one top-level group is held in memory"""
+    if ijson is None:
+        try:
+            catalog = json.load(stream).get("catalog") or {}
+        except json.JSONDecodeError as e:
+            raise CatalogError(f"Invalid JSON: {e}")
+        if metadata is not None:
+            metadata.update(catalog.get("metadata") or {})
+        yield from _oscal_group(catalog)
+        return
+
+    try:
+        for prefix, event, value in _oscal_events(stream):
+            if prefix == "catalog.metadata" and metadata is not None:
+                metadata.update(value)
+            elif prefix == "catalog.groups.item":
+                yield from _oscal_group(value)
+            elif prefix == "catalog.controls.item":
+                yield from _oscal_controls([value])
+    except ijson.JSONError as e:
+        raise CatalogError(f"Invalid JSON: {e}")
+
+
+def _oscal_events(stream: BinaryIO) -> Iterator[Tuple[str, str, dict]]:
+    # Build only the objects we need from the event stream
+    wanted = ("catalog.metadata", "catalog.groups.item", "catalog.controls.item")
+    events = ijson.parse(stream, use_float=True)
+    for prefix, event, value in events:
+        if prefix in wanted and event == "start_map":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+            for inner_prefix, inner_event, inner_value in events:
+                builder.event(inner_event, inner_value)
+                if inner_event in ("start_map", "start_array"):
+                    depth += 1
+                elif inner_event in ("end_map", "end_array"):
+                    depth -= 1
+                    if depth == 0:
+                        break
+            yield prefix, event, builder.value
+
+
+def detect_format(file_name: Optional[str], content_type: Optional[str]) -> str:
+    name = (file_name or "").lower()
+    if name.endswith(".csv") or (content_type or "").startswith("text/csv"):
+        return "csv"
+    if name.endswith(".json") or "json" in (content_type or ""):
+        return "oscal"
+    raise CatalogError("Unsupported catalog format; upload OSCAL JSON or CSV")
+
+
+# ============ Import ============
+
+def import_catalog(db: Session, stream: BinaryIO, fmt: str, name: Optional[str] = None,
+                   version: Optional[str] = None, description: Optional[str] = None,
+                   prune: bool = False, dry_run: bool = False) -> ImportReport:
+    """Create or update a framework's requirements from a catalog in one transaction
+
+    Requirements are matched on code: new codes are inserted and changed
+    titles/descriptions updated in batches; re-importing the same file is a
+    no-op. Any error rolls back the whole import.
+    """
+    metadata: dict = {}
+    rows = parse_oscal(stream, metadata) if fmt == "oscal" else parse_csv(stream)
+    report = ImportReport(dry_run=dry_run)
+    try:
+        # OSCAL metadata precedes the controls, so the first row fixes the framework
+        first = next(rows, None)
+        name = name or metadata.get("title")
+        version = version or metadata.get("version")
+        if not name:
+            raise CatalogError("Framework name is required (not found in catalog metadata)")
+
+        framework = db.query(Framework).filter(Framework.name == name).first()
+        if framework is None:
+            framework = Framework(name=name, version=version, description=description)
+            db.add(framework)
+            db.flush()
+            report.framework_created = True
+        elif version and framework.version != version:
+            framework.version = version
+        report.framework_id, report.framework_name, report.version = framework.id, framework.name, framework.version
+
+        existing: Dict[str, Tuple[int, str, Optional[str]]] = {
+            code: (rid, title, desc)
+            for rid, code, title, desc in db.query(
+                Requirement.id, Requirement.code, Requirement.title, Requirement.description
+            ).filter(Requirement.framework_id == framework.id)
+        }
+        now = datetime.now(timezone.utc)
+        seen = set()
+        inserts: List[dict] = []
+        updates: List[dict] = []
+
+        def flush():
+            if inserts:
+                db.execute(insert(Requirement), inserts)
+                inserts.clear()
+            if updates:
+                db.execute(update(Requirement), updates)
+                updates.clear()
+
+        for row in _chain(first, rows):
+            if row.code in seen:
+                report.duplicates += 1
+                continue
+            seen.add(row.code)
+            current = existing.get(row.code)
+            if current is None:
+                inserts.append({"framework_id": framework.id, "code": row.code, "title": row.title, "description": row.description})
+                report.added += 1
+            elif (current[1], current[2]) != (row.title, row.description):
+                updates.append({"id": current[0], "title": row.title, "description": row.description, "updated_at": now})
+                report.updated += 1
+            else:
+                report.unchanged += 1
+            if len(inserts) + len(updates) >= IMPORT_BATCH_SIZE:
+                flush()
+        flush()
+
+        missing = [(code, rid) for code, (rid, _, _) in existing.items() if code not in seen]
+        report.removed = len(missing)
+        report.removed_codes = sorted(code for code, _ in missing)[:100]
+        if prune and missing:
+            ids = [rid for _, rid in missing]
+            for start in range(0, len(ids), IMPORT_BATCH_SIZE):
+                db.query(Requirement).filter(Requirement.id.in_(ids[start:start + IMPORT_BATCH_SIZE])).delete(synchronize_session=False)
+
+        if report.added or report.updated or (prune and missing):
+            # Bumps the catalog ETags even when only requirement rows changed
+            framework.updated_at = func.now()
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return report
+
+
+def _chain(first: Optional[CatalogRow], rest: Iterator[CatalogRow]) -> Iterator[CatalogRow]:
+    if first is not None:
+        yield first
+        yield from rest
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import an OSCAL JSON or CSV catalog as framework requirements")
+    parser.add_argument("path")
+    parser.add_argument("--name", help="Framework name (default: OSCAL metadata title)")
+    parser.add_argument("--version", help="Framework version (default: OSCAL metadata version)")
+    parser.add_argument("--prune", action="store_true", help="Delete requirements missing from the file")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            print(import_catalog(db, f, detect_format(args.path, None), args.name, args.version,
+                                 prune=args.prune, dry_run=args.dry_run))
+        if not args.dry_run:
+            from invalidation import CATALOG, publish
+            publish(db, CATALOG)  # Running workers rebuild their catalog cache
+    finally:
+        db.close()
@@ -0,0 +1,161 @@
+"""Check the evidence storage drivers against the EvidenceStorage contract
+
+Usage: python check_storage.py
+LocalStorage runs in a temporary directory. S3Storage runs against moto's
+mocked S3 when moto is installed, otherwise against an in-memory stand-in
+client; no bucket or credentials are needed either way.
+"""
+import io
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from storage import EvidenceStorage, LocalStorage, S3Storage
+
+BUCKET = "isms-evidence-check"
+
+
+class _ClientError(Exception):
+    pass
+
+
+class _Paginator:
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, Bucket, Prefix="", Delimiter=None):
+        contents = []
+        for (bucket, key), (data, modified) in sorted(self.client.objects.items()):
+            if bucket != Bucket or not key.startswith(Prefix):
+                continue
+            if Delimiter and Delimiter in key[len(Prefix):]:
+                continue  # Reported as a common prefix by S3
+            contents.append({"Key": key, "Size": len(data), "LastModified": modified})
+        # Two pages, as S3 does for long listings
+        half = len(contents) // 2
+        yield {"Contents": contents[:half]}
+        yield {"Contents": contents[half:]}
+
+
+class FakeS3Client:
+    """In-memory stand-in for the S3 client calls S3Storage makes"""
+
+    class exceptions:
+        ClientError = _ClientError
+
+    def __init__(self):
+        self.objects = {}  # (bucket, key) -> (bytes, last modified)
+
+    def _get(self, bucket: str, key: str):
+        if (bucket, key) not in self.objects:
+            raise _ClientError(f"NoSuchKey: {key}")
+        return self.objects[(bucket, key)]
+
+    def upload_fileobj(self, fileobj, bucket, key, Config=None):
+        self.objects[(bucket, key)] = (fileobj.read(), datetime.now(timezone.utc))
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self._get(Bucket, Key)[0])}
+
+    def head_object(self, Bucket, Key):
+        data, modified = self._get(Bucket, Key)
+        return {"ContentLength": len(data), "LastModified": modified}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def copy_object(self, Bucket, Key, CopySource):
+        data, _ = self._get(CopySource["Bucket"], CopySource["Key"])
+        self.objects[(Bucket, Key)] = (data, datetime.now(timezone.utc))
+
+    def list_objects_v2(self, Bucket, Prefix=""):
+        return {"Contents": [obj for page in _Paginator(self).paginate(Bucket, Prefix) for obj in page["Contents"]]}
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return _Paginator(self)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://{Params['Bucket']}.s3.local/{Params['Key']}?expires={ExpiresIn}"
+
+
+def check_contract(storage: EvidenceStorage):
+    data = b"evidence " * 1000
+    assert storage.save("a.pdf", io.BytesIO(data)) == "a.pdf"
+    assert storage.exists("a.pdf")
+    with storage.open("a.pdf") as f:
+        assert f.read() == data
+
+    storage.save("sub/b.txt", io.BytesIO(b"nested"))
+    storage.save(".hidden", io.BytesIO(b"x"))
+    top = {obj.key: obj for obj in storage.list()}
+    assert set(top) == {"a.pdf"}, top
+    assert top["a.pdf"].size == len(data)
+    assert top["a.pdf"].modified > 0
+    assert [obj.key for obj in storage.list("sub/")] == ["sub/b.txt"]
+
+    storage.move("a.pdf", "sub/a.pdf")
+    assert not storage.exists("a.pdf")
+    with storage.open("sub/a.pdf") as f:
+        assert f.read() == data
+    assert {obj.key for obj in storage.list("sub/")} == {"sub/a.pdf", "sub/b.txt"}
+
+    storage.delete("sub/a.pdf")
+    assert not storage.exists("sub/a.pdf")
+    storage.delete("sub/a.pdf")  # Deleting a missing key is not an error
+    try:
+        storage.open("sub/a.pdf")
+    except Exception:
+        pass
+    else:
+        raise AssertionError("open() of a deleted key succeeded")
+
+
+def check_local():
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = LocalStorage(Path(tmp))
+        check_contract(storage)
+        assert storage.local_path("sub/b.txt") == Path(tmp).resolve() / "sub" / "b.txt"
+        try:
+            storage.save("../escape", io.BytesIO(b""))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("key outside the storage root was accepted")
+    return "local"
+
+
+def check_s3(client, label: str):
+    storage = S3Storage(BUCKET, "evidence/", client=client)
+    check_contract(storage)
+    # Keys live under the configured prefix
+    listed = client.list_objects_v2(Bucket=BUCKET)["Contents"]
+    assert {obj["Key"] for obj in listed} == {"evidence/sub/b.txt", "evidence/.hidden"}, listed
+    url = storage.presigned_url("sub/b.txt", "b.txt")
+    assert url and "evidence/sub/b.txt" in url
+    return label
+
+
+def check_s3_backends():
+    try:
+        import boto3
+        from moto import mock_aws
+    except ImportError:
+        return check_s3(FakeS3Client(), "s3 (in-memory stand-in; install moto to check against mocked S3)")
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        return check_s3(client, "s3 (moto)")
+
+
+def main():
+    for check in (check_local, check_s3_backends):
+        print(f"ok  {check()}")
+
+
+if __name__ == "__main__":
+    main()
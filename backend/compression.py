@@ -0,0 +1,290 @@
+import os
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: br is simply not offered
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is simply not offered
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+# Server preference order; used to break ties between equal client q-values
+COMPRESSION_ENCODINGS = [
+    e.strip() for e in os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(",") if e.strip()
+]
+
+# Event streams must reach the client as they are written, so they are never buffered
+_COMPRESSIBLE_TYPES = ("application/json", "application/xml", "application/javascript", "image/svg+xml")
+_COMPRESSIBLE_PREFIXES = ("text/",)
+_NEVER_COMPRESS = ("text/event-stream",)
+
+
+# ============ Encoders ============
+# Each encoder exposes compress(data), flush() to emit everything written so
+# far (one call per streamed chunk) and finish() to close the stream.
+
+class _GzipEncoder:
+    def __init__(self):
+        self._obj = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def _available_encoders() -> Dict[str, Callable]:
+    known = {"gzip": _GzipEncoder}
+    if brotli is not None:
+        known["br"] = _BrotliEncoder
+    if zstandard is not None:
+        known["zstd"] = _ZstdEncoder
+    return {name: known[name] for name in COMPRESSION_ENCODINGS if name in known}
+
+
+ENCODERS = _available_encoders()
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick the best available encoding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    wildcard = weights.get("*", 0.0)
+    candidates = [
+        (weights.get(name, wildcard), -rank, name)
+        for rank, name in enumerate(ENCODERS)
+    ]
+    candidates = [c for c in candidates if c[0] > 0]
+    return max(candidates)[2] if candidates else None
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "content-range" in headers:
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in _NEVER_COMPRESS:
+        return False
+    return content_type in _COMPRESSIBLE_TYPES or content_type.startswith(_COMPRESSIBLE_PREFIXES)
+
+
+# ============ Per-route metrics ============
+
+@dataclass
+class RouteCompressionStats:
+    route: str
+    responses: int = 0
+    compressed: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    cpu_seconds: float = 0.0
+
+
+class CompressionMetrics:
+    def __init__(self):
+        self._routes: Dict[str, RouteCompressionStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, compressed: bool, bytes_in: int, bytes_out: int, cpu_seconds: float):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteCompressionStats(route)
+            stats.responses += 1
+            stats.compressed += int(compressed)
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+            stats.cpu_seconds += cpu_seconds
+
+    def snapshot(self) -> List[dict]:
+        """Per-route totals, most compression CPU first"""
+        with self._lock:
+            rows = [asdict(s) for s in self._routes.values()]
+        for row in rows:
+            row["ratio"] = round(row["bytes_out"] / row["bytes_in"], 4) if row["bytes_in"] else None
+            row["cpu_ms_per_response"] = round(row["cpu_seconds"] * 1000 / row["responses"], 3)
+        rows.sort(key=lambda r: -r["cpu_seconds"])
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+compression_metrics = CompressionMetrics()
+
+_route_paths: Dict[int, Dict[Callable, str]] = {}
+
+
+def _route_label(scope: Scope) -> str:
+    # The router stores the matched endpoint in the scope; map it back to its path template
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    path = scope.get("path", "")
+    if endpoint is not None and app is not None:
+        paths = _route_paths.get(id(app))
+        if paths is None:
+            paths = _route_paths[id(app)] = {
+                r.endpoint: r.path for r in getattr(app, "routes", []) if hasattr(r, "endpoint")
+            }
+        path = paths.get(endpoint, path)
+    return f"{scope.get('method', '')} {path}"
+
+
+# ============ Middleware ============
+
+class CompressionMiddleware:
+    """Negotiated zstd/br/gzip response compression
+
+    Bodies are buffered only until minimum_size bytes have been seen: smaller
+    responses go out untouched, larger ones are compressed, and streamed
+    responses are flushed chunk by chunk so exports keep streaming.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(scope, send, encoding, self.minimum_size).run(self.app, receive)
+
+
+class _CompressingResponder:
+    def __init__(self, scope: Scope, send: Send, encoding: str, minimum_size: int):
+        self.scope = scope
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.encoder = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu = 0.0
+
+    async def run(self, app: ASGIApp, receive: Receive):
+        await app(self.scope, receive, self.on_send)
+
+    async def on_send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            if message["status"] < 200 or message["status"] in (204, 206, 304) or not _is_compressible(headers):
+                self.passthrough = True
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if more_body and self.buffered < self.minimum_size:
+                return
+            body = b"".join(self.buffer)
+            self.buffer = []
+            if not more_body and self.buffered < self.minimum_size:
+                await self.send(self.start)
+                await self.send({"type": "http.response.body", "body": body})
+                self._record(compressed=False, size=len(body))
+                return
+            self.encoder = ENCODERS[self.encoding]()
+            chunk = self._encode(body, more_body)
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(chunk))
+            await self.send(self.start)
+        else:
+            chunk = self._encode(body, more_body)
+
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        if not more_body:
+            self._record(compressed=True, size=self.bytes_in, compressed_size=self.bytes_out)
+
+    def _encode(self, body: bytes, more_body: bool) -> bytes:
+        started = time.thread_time()
+        chunk = self.encoder.compress(body) + (self.encoder.flush() if more_body else self.encoder.finish())
+        self.cpu += time.thread_time() - started
+        self.bytes_in += len(body)
+        self.bytes_out += len(chunk)
+        return chunk
+
+    def _record(self, compressed: bool, size: int, compressed_size: Optional[int] = None):
+        compression_metrics.record(
+            _route_label(self.scope), compressed, size,
+            size if compressed_size is None else compressed_size, self.cpu
+        )
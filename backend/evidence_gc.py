@@ -0,0 +1,120 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from models import Evidence
+from storage import EvidenceStorage, StoredObject
+
+# Files younger than this are never touched: an upload writes its file before
+# the Evidence row is committed, so a fresh file without a row is not an orphan.
+GC_MIN_AGE_SECONDS = int(os.getenv("EVIDENCE_GC_MIN_AGE_SECONDS", "3600"))
+# How long an orphan sits in quarantine before it is purged for good
+GC_QUARANTINE_SECONDS = int(os.getenv("EVIDENCE_GC_QUARANTINE_SECONDS", str(7 * 24 * 3600)))
+GC_BATCH_SIZE = int(os.getenv("EVIDENCE_GC_BATCH_SIZE", "500"))
+GC_INTERVAL_SECONDS = int(os.getenv("EVIDENCE_GC_INTERVAL_SECONDS", "3600"))
+
+QUARANTINE_PREFIX = ".quarantine/"
+
+
+@dataclass
+class GCReport:
+    scanned: int = 0
+    skipped_recent: int = 0
+    quarantined: int = 0
+    restored: int = 0
+    purged: int = 0
+    reclaimed_bytes: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def _referenced_keys(db: Session, storage: EvidenceStorage, keys: List[str]) -> set:
+    aliases: Dict[str, str] = {}
+    for key in keys:
+        for alias in storage.reference_aliases(key):
+            aliases[alias] = key
+    rows = db.query(Evidence.file_path).filter(Evidence.file_path.in_(list(aliases))).all()
+    return {aliases[r[0]] for r in rows}
+
+
+def _quarantine_batch(db: Session, storage: EvidenceStorage, batch: List[StoredObject], report: GCReport):
+    referenced = _referenced_keys(db, storage, [obj.key for obj in batch])
+    for obj in batch:
+        if obj.key in referenced:
+            continue
+        try:
+            # move() restarts the object's modification clock, which is what
+            # the quarantine retention is measured against
+            storage.move(obj.key, QUARANTINE_PREFIX + obj.key)
+            report.quarantined += 1
+        except FileNotFoundError:
+            # Deleted concurrently by delete_evidence
+            pass
+        except Exception as e:
+            report.errors.append(f"{obj.key}: {e}")
+
+
+def _purge_batch(db: Session, storage: EvidenceStorage, batch: List[StoredObject], now: float, report: GCReport):
+    originals = {obj.key: obj.key[len(QUARANTINE_PREFIX):] for obj in batch}
+    referenced = _referenced_keys(db, storage, list(originals.values()))
+    for obj in batch:
+        original = originals[obj.key]
+        try:
+            if original in referenced:
+                # A row points at it again (e.g. restored from a DB backup)
+                storage.move(obj.key, original)
+                report.restored += 1
+                continue
+            if now - obj.modified < GC_QUARANTINE_SECONDS:
+                continue
+            storage.delete(obj.key)
+            report.purged += 1
+            report.reclaimed_bytes += obj.size
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            report.errors.append(f"{obj.key}: {e}")
+
+
+def collect_orphaned_evidence(db: Session, storage: EvidenceStorage, batch_size: int = GC_BATCH_SIZE) -> GCReport:
+    """Quarantine evidence files with no Evidence row and purge expired quarantine"""
+    report = GCReport()
+    now = time.time()
+
+    # Purge first so files quarantined in this run get the full retention period
+    batch = []
+    for obj in storage.list(QUARANTINE_PREFIX):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            _purge_batch(db, storage, batch, now, report)
+            batch = []
+    if batch:
+        _purge_batch(db, storage, batch, now, report)
+
+    batch = []
+    for obj in storage.list():
+        report.scanned += 1
+        if now - obj.modified < GC_MIN_AGE_SECONDS:
+            report.skipped_recent += 1
+            continue
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            _quarantine_batch(db, storage, batch, report)
+            batch = []
+    if batch:
+        _quarantine_batch(db, storage, batch, report)
+
+    return report
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    from storage import get_storage
+
+    db = SessionLocal()
+    try:
+        print(collect_orphaned_evidence(db, get_storage()))
+    finally:
+        db.close()
@@ -0,0 +1,277 @@
+import asyncio
+import csv
+import io
+import logging
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from xml.etree import ElementTree
+
+from sqlalchemy import and_, update
+
+from database import SessionLocal
+from models import Evidence, ExtractionJob, JobStatus
+from storage import EvidenceStorage
+
+# The pool is deliberately small: parsing is CPU-bound and shares the host
+# with the API workers.
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+EXTRACTION_MAX_ATTEMPTS = int(os.getenv("EXTRACTION_MAX_ATTEMPTS", "3"))
+EXTRACTION_RETRY_SECONDS = int(os.getenv("EXTRACTION_RETRY_SECONDS", "60"))
+EXTRACTION_POLL_SECONDS = int(os.getenv("EXTRACTION_POLL_SECONDS", "30"))
+EXTRACTION_STALE_SECONDS = int(os.getenv("EXTRACTION_STALE_SECONDS", "900"))
+# A parse running longer than this is killed along with its pool
+EXTRACTION_TIMEOUT_SECONDS = int(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "120"))
+EXTRACTION_MAX_BYTES = int(os.getenv("EXTRACTION_MAX_BYTES", str(50 * 1024 * 1024)))
+# Keeps the Postgres search tsvector well under its 1 MB limit
+EXTRACTION_MAX_CHARS = int(os.getenv("EXTRACTION_MAX_CHARS", "500000"))
+
+logger = logging.getLogger("isms.extraction")
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_EP_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}"
+
+
+class UnsupportedFileType(Exception):
+    pass
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+# ============ Parsers (run inside the process pool) ============
+
+def _extract_pdf(data: bytes) -> Tuple[str, Optional[int]]:
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(data))
+    pages = [page.extract_text() or "" for page in reader.pages]
+    return "\n".join(pages), len(pages)
+
+
+def _extract_docx(data: bytes) -> Tuple[str, Optional[int]]:
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+        paragraphs = []
+        for p in root.iter(f"{_W_NS}p"):
+            text = "".join(t.text or "" for t in p.iter(f"{_W_NS}t"))
+            if text:
+                paragraphs.append(text)
+
+        # Word stores the page count it last rendered in the extended properties
+        page_count = None
+        if "docProps/app.xml" in archive.namelist():
+            pages = ElementTree.fromstring(archive.read("docProps/app.xml")).find(f"{_EP_NS}Pages")
+            if pages is not None and pages.text and pages.text.isdigit():
+                page_count = int(pages.text)
+    return "\n".join(paragraphs), page_count
+
+
+def _extract_csv(data: bytes) -> Tuple[str, Optional[int]]:
+    reader = csv.reader(io.StringIO(data.decode("utf-8-sig", errors="replace")))
+    return "\n".join(" ".join(cell for cell in row if cell) for row in reader), None
+
+
+def _extract_plain(data: bytes) -> Tuple[str, Optional[int]]:
+    return data.decode("utf-8", errors="replace"), None
+
+
+PARSERS = {
+    ".pdf": _extract_pdf,
+    ".docx": _extract_docx,
+    ".csv": _extract_csv,
+    ".txt": _extract_plain,
+    ".md": _extract_plain,
+}
+
+
+def extract_text(data: bytes, file_name: str) -> Tuple[str, Optional[int]]:
+    """Return (text, page_count) for an evidence file"""
+    parser = PARSERS.get(os.path.splitext(file_name or "")[1].lower())
+    if parser is None:
+        raise UnsupportedFileType(f"No text extractor for {file_name}")
+    text, page_count = parser(data)
+    return text[:EXTRACTION_MAX_CHARS], page_count
+
+
+# ============ Job Queue ============
+
+def enqueue_extraction(db, evidence: Evidence):
+    """Add an extraction job for an evidence file to the current transaction"""
+    if evidence.file_path and os.path.splitext(evidence.file_name or "")[1].lower() in PARSERS:
+        db.add(ExtractionJob(evidence_id=evidence.id, status=JobStatus.PENDING, next_attempt_at=datetime.utcnow()))
+
+
+class ExtractionDispatcher:
+    """Claims pending jobs from the database and feeds a bounded process pool"""
+
+    def __init__(self, storage: EvidenceStorage, workers: int = EXTRACTION_WORKERS, session_factory=SessionLocal):
+        self.storage = storage
+        self.workers = workers
+        self.session_factory = session_factory
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._wake = asyncio.Event()
+        # After a pool crash jobs run one at a time until one completes, so
+        # the file that crashes it is the only job charged for it
+        self._isolate = False
+
+    def notify(self):
+        self._wake.set()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _replace_pool(self, broken: ProcessPoolExecutor):
+        """Swap in a fresh pool; concurrent jobs that saw the same pool fail only replace it once"""
+        if self.pool is not broken:
+            return
+        # shutdown() does not stop a parse that is still running (a hung
+        # parser), so end the processes; their other futures then raise
+        # BrokenProcessPool and those jobs are requeued
+        for process in list((getattr(broken, "_processes", None) or {}).values()):
+            process.terminate()
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    async def run(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        while True:
+            try:
+                job_ids = await asyncio.to_thread(self._claim_jobs, 1 if self._isolate else self.workers)
+                if job_ids:
+                    # Never more jobs in flight than pool processes, so a
+                    # backlog waits in the table rather than in memory
+                    await asyncio.gather(*(self._process(job_id, isolated=len(job_ids) == 1) for job_id in job_ids))
+                    continue
+            except Exception:
+                logger.exception("Extraction dispatcher cycle failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=EXTRACTION_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _claim_jobs(self, limit: int) -> list:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            # Requeue jobs whose worker died mid-run, unless they already had
+            # every attempt (a file that takes the whole worker down each time)
+            stale = and_(ExtractionJob.status == JobStatus.RUNNING,
+                         ExtractionJob.updated_at < now - timedelta(seconds=EXTRACTION_STALE_SECONDS))
+            db.execute(
+                update(ExtractionJob)
+                .where(stale, ExtractionJob.attempts < EXTRACTION_MAX_ATTEMPTS)
+                .values(status=JobStatus.PENDING)
+            )
+            db.execute(
+                update(ExtractionJob)
+                .where(stale, ExtractionJob.attempts >= EXTRACTION_MAX_ATTEMPTS)
+                .values(status=JobStatus.FAILED, updated_at=now,
+                        last_error=f"Worker died during extraction on all {EXTRACTION_MAX_ATTEMPTS} attempts")
+            )
+            candidates = db.query(ExtractionJob.id).filter(
+                ExtractionJob.status == JobStatus.PENDING,
+                ExtractionJob.next_attempt_at <= now
+            ).order_by(ExtractionJob.id).limit(limit).all()
+
+            claimed = []
+            for (job_id,) in candidates:
+                # Conditional update so concurrent workers never claim the same job
+                result = db.execute(
+                    update(ExtractionJob)
+                    .where(ExtractionJob.id == job_id, ExtractionJob.status == JobStatus.PENDING)
+                    .values(status=JobStatus.RUNNING, attempts=ExtractionJob.attempts + 1, updated_at=now)
+                )
+                if result.rowcount == 1:
+                    claimed.append(job_id)
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def _load_input(self, job_id: int):
+        db = self.session_factory()
+        try:
+            job = db.query(ExtractionJob).filter(ExtractionJob.id == job_id).first()
+            evidence = job.evidence
+            with self.storage.open(self.storage.key_for(evidence.file_path)) as f:
+                data = f.read(EXTRACTION_MAX_BYTES + 1)
+            if len(data) > EXTRACTION_MAX_BYTES:
+                raise UnsupportedFileType(f"File exceeds {EXTRACTION_MAX_BYTES} bytes")
+            return data, evidence.file_name
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, result=None, error: Optional[Exception] = None):
+        db = self.session_factory()
+        try:
+            job = db.query(ExtractionJob).filter(ExtractionJob.id == job_id).first()
+            if job is None:
+                return
+            if error is None:
+                text, page_count = result
+                job.evidence.extracted_text = text
+                job.evidence.page_count = page_count
+                job.status = JobStatus.SUCCEEDED
+                job.last_error = None
+            else:
+                job.last_error = f"{type(error).__name__}: {error}"
+                if isinstance(error, UnsupportedFileType) or job.attempts >= EXTRACTION_MAX_ATTEMPTS:
+                    job.status = JobStatus.FAILED
+                else:
+                    job.status = JobStatus.PENDING
+                    job.next_attempt_at = datetime.utcnow() + timedelta(
+                        seconds=EXTRACTION_RETRY_SECONDS * 2 ** (job.attempts - 1)
+                    )
+            db.commit()
+        finally:
+            db.close()
+
+    def _requeue(self, job_id: int):
+        """Put a job back without charging the attempt it was claimed with"""
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(ExtractionJob)
+                .where(ExtractionJob.id == job_id)
+                .values(status=JobStatus.PENDING, attempts=ExtractionJob.attempts - 1,
+                        next_attempt_at=datetime.utcnow(), last_error="Extraction process pool crashed")
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def _process(self, job_id: int, isolated: bool = False):
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        if isolated:
+            self._isolate = False  # Whatever happens, this run settles who crashed the pool
+        try:
+            data, file_name = await asyncio.to_thread(self._load_input, job_id)
+            result = await asyncio.wait_for(
+                loop.run_in_executor(pool, extract_text, data, file_name), EXTRACTION_TIMEOUT_SECONDS
+            )
+        except BrokenProcessPool as e:
+            self._replace_pool(pool)
+            if isolated:
+                # Alone in the pool, so this file crashed it
+                await asyncio.to_thread(self._finish, job_id, None, e)
+            else:
+                self._isolate = True
+                await asyncio.to_thread(self._requeue, job_id)
+            return
+        except asyncio.TimeoutError:
+            self._replace_pool(pool)
+            error = ExtractionTimeout(f"Extraction took longer than {EXTRACTION_TIMEOUT_SECONDS}s")
+            await asyncio.to_thread(self._finish, job_id, None, error)
+            return
+        except Exception as e:
+            await asyncio.to_thread(self._finish, job_id, None, e)
+            return
+        await asyncio.to_thread(self._finish, job_id, result)
@@ -0,0 +1,86 @@
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import exists, func, null
+from sqlalchemy.orm import Session, aliased
+
+from models import Control, ControlStatus, Evidence, Requirement, control_requirement
+
+# unmapped:        no control is mapped to the requirement
+# not_implemented: controls are mapped, none of them is implemented
+# missing_evidence: at least one mapped control has no evidence
+GAP_CATEGORIES = ("unmapped", "not_implemented", "missing_evidence")
+
+STREAM_BATCH_SIZE = 1000
+
+_cr = control_requirement.c
+
+
+def _mapped():
+    return exists().where(_cr.requirement_id == Requirement.id)
+
+
+def _implemented():
+    # Aliased so the subquery does not correlate with the outer query's control
+    mapping = control_requirement.alias()
+    control = aliased(Control)
+    return exists().where(
+        mapping.c.requirement_id == Requirement.id,
+        mapping.c.control_id == control.id,
+        control.status == ControlStatus.IMPLEMENTED,
+    )
+
+
+def _has_evidence():
+    return exists().where(Evidence.control_id == Control.id)
+
+
+def _gap_query(db: Session, framework_id: int, category: str):
+    """Rows of (requirement id, code, title, control id or None) ordered by requirement"""
+    columns = (Requirement.id, Requirement.code, Requirement.title)
+    if category == "unmapped":
+        query = db.query(*columns, null()).filter(~_mapped())
+    elif category == "not_implemented":
+        query = db.query(*columns, Control.id).join(
+            control_requirement, _cr.requirement_id == Requirement.id
+        ).join(Control, Control.id == _cr.control_id).filter(~_implemented())
+    else:
+        query = db.query(*columns, Control.id).join(
+            control_requirement, _cr.requirement_id == Requirement.id
+        ).join(Control, Control.id == _cr.control_id).filter(~_has_evidence())
+    return query.filter(Requirement.framework_id == framework_id).order_by(Requirement.code, Requirement.id, *(
+        [] if category == "unmapped" else [Control.id]
+    ))
+
+
+def gap_counts(db: Session, framework_id: int) -> Dict[str, int]:
+    """Requirements per gap category, plus framework totals"""
+    counts = {"requirements": db.query(func.count(Requirement.id)).filter(Requirement.framework_id == framework_id).scalar()}
+    for category in GAP_CATEGORIES:
+        subquery = _gap_query(db, framework_id, category).order_by(None).with_entities(Requirement.id).distinct().subquery()
+        counts[category] = db.query(func.count()).select_from(subquery).scalar()
+    controls_without_evidence = _gap_query(db, framework_id, "missing_evidence").order_by(None).with_entities(
+        Control.id
+    ).distinct().subquery()
+    counts["controls_without_evidence"] = db.query(func.count()).select_from(controls_without_evidence).scalar()
+    return counts
+
+
+def iter_gaps(db: Session, framework_id: int, categories: List[str]) -> Iterator[dict]:
+    """One dict per (category, requirement), reading rows in batches"""
+    for category in categories:
+        current: Optional[dict] = None
+        for requirement_id, code, title, control_id in _gap_query(db, framework_id, category).yield_per(STREAM_BATCH_SIZE):
+            if current is None or current["requirement_id"] != requirement_id:
+                if current is not None:
+                    yield current
+                current = {
+                    "category": category,
+                    "requirement_id": requirement_id,
+                    "code": code,
+                    "title": title,
+                    "control_ids": [],
+                }
+            if control_id is not None:
+                current["control_ids"].append(control_id)
+        if current is not None:
+            yield current
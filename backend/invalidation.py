@@ -0,0 +1,242 @@
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import engine
+
+logger = logging.getLogger("isms")
+
+CHANNEL = "isms_invalidate"
+RECONNECT_SECONDS = float(os.getenv("INVALIDATION_RECONNECT_SECONDS", "5"))
+POLL_SECONDS = 1.0
+
+# NOTIFY payloads are limited to 8000 bytes; longer id lists become "everything"
+MAX_PAYLOAD_BYTES = 7900
+
+# Identifies this process in notifications so it skips its own events
+INSTANCE_ID = uuid.uuid4().hex[:12]
+
+USE_NOTIFY = engine.dialect.name == "postgresql"
+
+# Topics
+CATALOG = "catalog"  # frameworks and requirements
+CONTROLS = "controls"
+RISKS = "risks"
+ALERTS = "alerts"
+
+
+@dataclass(frozen=True)
+class InvalidationEvent:
+    topic: str  # Entity kind, e.g. "catalog", "controls", "risks"
+    ids: Optional[Tuple[int, ...]] = None  # None: the whole topic changed
+    version: Optional[str] = None  # Publisher-defined, e.g. the entity's updated_at
+    sent_at: Optional[float] = None  # Publisher's wall clock (epoch seconds)
+    remote: bool = False  # Published by another worker
+
+
+Handler = Callable[[InvalidationEvent], None]
+
+# topic -> [(handler, local)]; local=False handlers only see other workers' events
+_handlers: Dict[str, List[Tuple[Handler, bool]]] = {}
+
+
+def subscribe(topic: str, handler: Handler, local: bool = True):
+    """Register a handler; pass local=False when the publisher already updated its own state"""
+    _handlers.setdefault(topic, []).append((handler, local))
+
+
+def _dispatch(event: InvalidationEvent):
+    for handler, local in _handlers.get(event.topic, ()):
+        if not event.remote and not local:
+            continue
+        try:
+            handler(event)
+        except Exception:
+            logger.exception("Invalidation handler for %s failed", event.topic)
+
+
+# ============ Metrics ============
+
+@dataclass
+class TopicStats:
+    topic: str
+    published: int = 0
+    received: int = 0
+    lag_ms_last: Optional[float] = None
+    lag_ms_max: Optional[float] = None
+    lag_ms_total: float = 0.0
+    last_received_at: Optional[float] = None
+
+
+class InvalidationMetrics:
+    def __init__(self):
+        self._topics: Dict[str, TopicStats] = {}
+        self._lock = threading.Lock()
+        self.connected = False
+        self.reconnects = 0
+        self.malformed = 0
+
+    def _stats(self, topic: str) -> TopicStats:
+        stats = self._topics.get(topic)
+        if stats is None:
+            stats = self._topics[topic] = TopicStats(topic)
+        return stats
+
+    def published(self, topic: str):
+        with self._lock:
+            self._stats(topic).published += 1
+
+    def received(self, topic: str, sent_at: Optional[float]):
+        now = time.time()
+        with self._lock:
+            stats = self._stats(topic)
+            stats.received += 1
+            stats.last_received_at = now
+            if sent_at is not None:
+                # Includes clock skew when workers run on different hosts
+                lag = max(0.0, (now - sent_at) * 1000)
+                stats.lag_ms_last = round(lag, 3)
+                stats.lag_ms_max = round(max(lag, stats.lag_ms_max or 0.0), 3)
+                stats.lag_ms_total += lag
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            topics = [asdict(s) for s in self._topics.values()]
+            state = {"connected": self.connected, "reconnects": self.reconnects, "malformed": self.malformed}
+        for row in topics:
+            total = row.pop("lag_ms_total")
+            row["lag_ms_avg"] = round(total / row["received"], 3) if row["received"] and row["lag_ms_last"] is not None else None
+        topics.sort(key=lambda r: r["topic"])
+        return {"instance_id": INSTANCE_ID, "notify_enabled": USE_NOTIFY, **state, "topics": topics}
+
+    def reset(self):
+        with self._lock:
+            self._topics.clear()
+            self.reconnects = 0
+            self.malformed = 0
+
+
+invalidation_metrics = InvalidationMetrics()
+
+
+# ============ Publishing ============
+
+def _payload(event: InvalidationEvent) -> str:
+    body = {"topic": event.topic, "ids": list(event.ids) if event.ids is not None else None,
+            "version": event.version, "sent_at": event.sent_at, "source": INSTANCE_ID}
+    payload = json.dumps(body, separators=(",", ":"))
+    if len(payload.encode("utf-8")) > MAX_PAYLOAD_BYTES:
+        body["ids"] = None
+        payload = json.dumps(body, separators=(",", ":"))
+    return payload
+
+
+def version_of(row) -> Optional[str]:
+    """Event version for an ORM row: its last change time"""
+    changed = getattr(row, "updated_at", None) or getattr(row, "created_at", None)
+    return changed.isoformat() if changed else None
+
+
+def publish(db: Session, topic: str, ids: Optional[Sequence[int]] = None, version: Optional[str] = None):
+    """Invalidate `topic` in this process and, on PostgreSQL, in every other worker
+
+    Call after the change is committed; the notification is sent in its own
+    short transaction.
+    """
+    event = InvalidationEvent(
+        topic=topic,
+        ids=tuple(sorted(set(ids))) if ids is not None else None,
+        version=version,
+        sent_at=time.time(),
+    )
+    _dispatch(event)
+    invalidation_metrics.published(topic)
+    if USE_NOTIFY:
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": _payload(event)})
+        db.commit()
+
+
+# ============ Listening ============
+
+class InvalidationListener:
+    """LISTENs on a dedicated connection and applies other workers' invalidations"""
+
+    def __init__(self):
+        self._conn = None
+
+    def _connect(self):
+        raw = engine.raw_connection()
+        raw.detach()  # Autocommit LISTEN connection, never returned to the pool
+        conn = raw.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        self._conn = conn
+
+    def _close(self):
+        invalidation_metrics.connected = False
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _poll(self) -> List[str]:
+        if select.select([self._conn], [], [], POLL_SECONDS) == ([], [], []):
+            return []
+        self._conn.poll()
+        notifies, self._conn.notifies[:] = list(self._conn.notifies), []
+        return [n.payload for n in notifies]
+
+    async def run(self):
+        while True:
+            try:
+                if self._conn is None:
+                    await asyncio.to_thread(self._connect)
+                    invalidation_metrics.connected = True
+                    # Events may have been missed while disconnected
+                    for topic in list(_handlers):
+                        _dispatch(InvalidationEvent(topic=topic, remote=True))
+                for payload in await asyncio.to_thread(self._poll):
+                    self._apply(payload)
+            except asyncio.CancelledError:
+                self._close()
+                raise
+            except Exception:
+                logger.exception("Invalidation listener failed; reconnecting")
+                self._close()
+                invalidation_metrics.reconnects += 1
+                await asyncio.sleep(RECONNECT_SECONDS)
+
+    def _apply(self, payload: str):
+        try:
+            body = json.loads(payload)
+            event = InvalidationEvent(
+                topic=body["topic"],
+                ids=tuple(body["ids"]) if body.get("ids") is not None else None,
+                version=body.get("version"),
+                sent_at=body.get("sent_at"),
+                remote=True,
+            )
+        except (ValueError, KeyError, TypeError):
+            invalidation_metrics.malformed += 1
+            logger.warning("Ignoring malformed invalidation payload: %r", payload)
+            return
+        if body.get("source") == INSTANCE_ID:
+            return
+        invalidation_metrics.received(event.topic, event.sent_at)
+        _dispatch(event)
+
+
+invalidation_listener: Optional[InvalidationListener] = InvalidationListener() if USE_NOTIFY else None
@@ -0,0 +1,243 @@
+import asyncio
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional, Set
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from invalidation import ALERTS, CATALOG, CONTROLS, RISKS, InvalidationEvent, subscribe
+from models import Alert, Control, UserRole
+from schemas import AlertResponse
+
+logger = logging.getLogger("isms")
+
+QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "64"))  # Frames buffered per client before it is resynced
+MAX_CLIENTS = int(os.getenv("LIVE_MAX_CLIENTS", "1000"))  # Per worker
+HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Events arriving within this window are pushed together, one lookup per topic
+BATCH_SECONDS = float(os.getenv("LIVE_BATCH_SECONDS", "0.5"))
+RETRY_MS = 5000
+IN_CHUNK_SIZE = 1000
+
+# Audiences, matching what each role's UI shows
+EVERYONE: FrozenSet[UserRole] = frozenset(UserRole)
+STAFF: FrozenSet[UserRole] = frozenset({UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER, UserRole.EXTERNAL_AUDITOR})
+# Dashboard fields employees see; the rest go to STAFF only
+EMPLOYEE_DASHBOARD_FIELDS = ("compliance_progress",)
+
+TOPICS = (ALERTS, CONTROLS, RISKS, CATALOG)
+
+_alerts = TypeAdapter(List[AlertResponse])
+
+
+def sse_frame(event: str, data, id: Optional[int] = None) -> bytes:
+    head = f"id: {id}\n" if id is not None else ""
+    return f"{head}event: {event}\n".encode("utf-8") + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+HEARTBEAT = b": keepalive\n\n"
+# Tells the client to refetch: sent on connect and after frames were dropped
+RESYNC = sse_frame("resync", {})
+CLOSE = None  # Queue sentinel: end the stream
+
+
+@dataclass(frozen=True)
+class LiveFrame:
+    body: bytes
+    audience: FrozenSet[UserRole]
+
+
+class Subscriber:
+    def __init__(self, user_id: int, role: UserRole):
+        self.user_id = user_id
+        self.role = role
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.resyncs = 0
+
+    def offer(self, body: bytes) -> bool:
+        """Queue a frame without waiting; a full queue is replaced by one resync"""
+        try:
+            self.queue.put_nowait(body)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.resyncs += 1
+            return False
+
+
+class LiveBroadcaster:
+    """Pushes alert, control and dashboard changes to connected clients
+
+    Fed by the invalidation bus, so changes committed on any worker reach
+    every worker's clients. Events are batched; each batch costs one lookup
+    per topic and one serialized frame per audience, however many clients
+    are connected. Delivery never waits on a client: a client that falls
+    QUEUE_SIZE frames behind has its backlog replaced by a resync event.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pending: Dict[str, Optional[Set[int]]] = {}  # topic -> ids; None: the whole topic
+        self._dashboard: Optional[dict] = None  # Last pushed shared dashboard stats
+        self._ids = itertools.count(1)
+        self.sent = 0
+        self.resyncs = 0
+        self.rejected = 0
+
+    @property
+    def clients(self) -> int:
+        return len(self._subscribers)
+
+    # Called from any thread by the invalidation bus
+    def notify(self, event: InvalidationEvent):
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        loop.call_soon_threadsafe(self._collect, event)
+
+    def _collect(self, event: InvalidationEvent):
+        if event.topic in self._pending and self._pending[event.topic] is None:
+            return
+        if event.ids is None:
+            self._pending[event.topic] = None
+        else:
+            self._pending.setdefault(event.topic, set()).update(event.ids)
+        self._wakeup.set()
+
+    def connect(self, user_id: int, role: UserRole) -> Optional[Subscriber]:
+        if len(self._subscribers) >= MAX_CLIENTS:
+            self.rejected += 1
+            return None
+        subscriber = Subscriber(user_id, role)
+        subscriber.offer(RESYNC)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        self.resyncs += subscriber.resyncs
+        if not self._subscribers:
+            self._dashboard = None  # Stale once nobody is watching
+
+    def close_all(self):
+        for subscriber in list(self._subscribers):
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(CLOSE)
+
+    def broadcast(self, frame: LiveFrame):
+        for subscriber in self._subscribers:
+            if subscriber.role in frame.audience:
+                subscriber.offer(frame.body)
+                self.sent += 1
+
+    async def run(self, dashboard_stats: Callable[[Session], dict]):
+        """Batch and push events until cancelled; dashboard_stats computes the role-independent stats"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(BATCH_SECONDS)
+            self._wakeup.clear()
+            pending, self._pending = self._pending, {}
+            if not self._subscribers:
+                continue
+            try:
+                frames = await run_in_threadpool(self._build, pending, dashboard_stats)
+            except Exception:
+                logger.exception("Building live updates failed")
+                frames = [LiveFrame(RESYNC, EVERYONE)]
+            for frame in frames:
+                self.broadcast(frame)
+
+    def _build(self, pending: Dict[str, Optional[Set[int]]], dashboard_stats) -> List[LiveFrame]:
+        db = SessionLocal()
+        try:
+            frames = []
+            if ALERTS in pending:
+                frames.append(self._alerts_frame(db, pending[ALERTS]))
+            if CONTROLS in pending:
+                frames.append(self._controls_frame(db, pending[CONTROLS]))
+            frames.extend(self._dashboard_frames(dashboard_stats(db)))
+            return frames
+        finally:
+            db.close()
+
+    def _alerts_frame(self, db: Session, ids: Optional[Set[int]]) -> LiveFrame:
+        if ids is None:
+            return LiveFrame(sse_frame("alerts", {"alerts": None}, next(self._ids)), STAFF)
+        rows = []
+        for chunk in _chunks(ids):
+            rows.extend(db.query(Alert).filter(Alert.id.in_(chunk)))
+        alerts = _alerts.dump_python(_alerts.validate_python(rows, from_attributes=True), mode="json")
+        return LiveFrame(sse_frame("alerts", {"alerts": alerts}, next(self._ids)), STAFF)
+
+    def _controls_frame(self, db: Session, ids: Optional[Set[int]]) -> LiveFrame:
+        if ids is None:
+            return LiveFrame(sse_frame("controls", {"controls": None}, next(self._ids)), STAFF)
+        controls = []
+        for chunk in _chunks(ids):
+            controls.extend(
+                {"id": c.id, "title": c.title, "status": c.status.value if c.status else None}
+                for c in db.query(Control.id, Control.title, Control.status).filter(Control.id.in_(chunk))
+            )
+        removed = sorted(ids - {c["id"] for c in controls})
+        return LiveFrame(sse_frame("controls", {"controls": controls, "removed": removed}, next(self._ids)), STAFF)
+
+    def _dashboard_frames(self, stats: dict) -> List[LiveFrame]:
+        previous, self._dashboard = self._dashboard, stats
+        delta = {key: value for key, value in stats.items() if previous is None or previous.get(key) != value}
+        frames = []
+        if delta:
+            frames.append(LiveFrame(sse_frame("dashboard", delta, next(self._ids)), STAFF))
+        employee_delta = {key: delta[key] for key in EMPLOYEE_DASHBOARD_FIELDS if key in delta}
+        if employee_delta:
+            frames.append(LiveFrame(sse_frame("dashboard", employee_delta, next(self._ids)), EVERYONE - STAFF))
+        return frames
+
+    def snapshot(self) -> dict:
+        return {
+            "clients": self.clients,
+            "max_clients": MAX_CLIENTS,
+            "queue_size": QUEUE_SIZE,
+            "frames_sent": self.sent,
+            "resyncs": self.resyncs + sum(s.resyncs for s in self._subscribers),
+            "rejected": self.rejected,
+        }
+
+
+def _chunks(ids: Set[int]):
+    ids = sorted(ids)
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        yield ids[start:start + IN_CHUNK_SIZE]
+
+
+async def stream(subscriber: Subscriber):
+    """SSE body for one client; ends when the client goes away or on shutdown"""
+    yield f"retry: {RETRY_MS}\n\n".encode("utf-8")
+    try:
+        while True:
+            try:
+                body = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                body = HEARTBEAT
+            if body is CLOSE:
+                return
+            yield body
+    finally:
+        live_broadcaster.disconnect(subscriber)
+
+
+live_broadcaster = LiveBroadcaster()
+for _topic in TOPICS:
+    subscribe(_topic, live_broadcaster.notify)
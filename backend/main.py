@@ -1,21 +1,57 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, ORJSONResponse, RedirectResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, defer
 from typing import List, Optional
-from datetime import datetime, timedelta
-import shutil
+from datetime import date, datetime, timedelta
+import asyncio
+import dataclasses
+import logging
+import json
+import orjson
 import os
-from pathlib import Path
 
-from database import get_db, engine
-from models import Base, User, UserRole, Framework, Requirement, Control, Evidence, Policy, PolicyAcknowledgment, PolicyVersion, Risk, RiskHistory, Alert, RiskLevel, ControlStatus
+from database import get_db, engine, SessionLocal
+from models import Base, User, UserRole, Framework, Requirement, Control, Evidence, ExtractionJob, Policy, PolicyAcknowledgment, PolicyVersion, PolicyRendering, Risk, RiskHistory, RiskScoringMatrix, Alert, MonitorJob, RiskLevel, RiskStatus, ControlStatus
 from schemas import *
-from auth import get_password_hash, verify_password, create_access_token, get_current_user, require_role
+from auth import (
+    get_password_hash, verify_password, create_access_token, get_current_user, require_role,
+    create_stream_ticket, user_for_stream_ticket, STREAM_TICKET_EXPIRE_SECONDS
+)
+from evidence_gc import collect_orphaned_evidence, GC_INTERVAL_SECONDS
+from storage import get_storage
+from extraction import ExtractionDispatcher, enqueue_extraction
+from search import search_evidence, search_all, SEARCH_ENTITIES
+from policy_history import append_version, reconstruct, delta_hunks
+from policy_render import RENDER_VERSION, render_policy, render_policy_task
+from risk_scoring import ScoringMatrix, activate_matrix, get_active_matrix, rescore_all, rescore_task, validate_matrix
+from risk_history import HistoryUnavailable, record_change, register_as_of, risk_state
+from posture import PERIODS, auto_granularity, posture_trends, record_daily_snapshot, SNAPSHOT_INTERVAL_SECONDS as POSTURE_INTERVAL_SECONDS
+from risk_quant import (
+    RANGE_FIELDS, SIM_MAX_TRIALS, SIM_SEED, SIM_TRIALS, SimulationTooLarge, ranges_after,
+    shutdown_pool as shutdown_simulation_pool, simulate_register, simulate_risk, validate_ranges
+)
+from mapping_graph import mapping_graph
+from gap_analysis import GAP_CATEGORIES, gap_counts, iter_gaps
+from catalog_import import CatalogError, detect_format, import_catalog
+from bulk_ops import BULK_MAX_ROWS, save_controls, save_risks
+from catalog_cache import CachedBody, catalog_cache
+from monitoring import JOBS as MONITOR_JOBS, JOBS_BY_NAME as MONITOR_JOBS_BY_NAME, TICK_SECONDS as MONITOR_TICK_SECONDS, monitor_loop, run_job as run_monitoring
+from invalidation import CATALOG, CONTROLS, RISKS, invalidation_listener, invalidation_metrics, publish, version_of
+from compression import CompressionMiddleware, compression_metrics
+from live_updates import live_broadcaster, stream as live_stream
+from responses import (
+    list_response, parse_fields, sparse_response, make_etag, collection_version, cache_headers, is_not_modified, not_modified,
+    CACHE_CATALOG, CACHE_REVALIDATE, CACHE_IMMUTABLE
+)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="ISMS Platform", version="1.0.0")
+app = FastAPI(title="ISMS Platform", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -26,9 +62,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Evidence file storage
-EVIDENCE_DIR = Path("/app/evidence")
-EVIDENCE_DIR.mkdir(exist_ok=True)
+# Negotiated zstd/br/gzip compression above COMPRESSION_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware)
+
+# Evidence file storage (local volume or S3-compatible bucket, see storage.py)
+storage = get_storage()
+
+logger = logging.getLogger("isms")
+
+def _run_evidence_gc():
+    db = SessionLocal()
+    try:
+        return collect_orphaned_evidence(db, storage)
+    finally:
+        db.close()
+
+async def _evidence_gc_loop():
+    while True:
+        await asyncio.sleep(GC_INTERVAL_SECONDS)
+        try:
+            report = await run_in_threadpool(_run_evidence_gc)
+            logger.info("Evidence GC: %s", report)
+        except Exception:
+            logger.exception("Evidence GC run failed")
+
+def _record_posture():
+    db = SessionLocal()
+    try:
+        return record_daily_snapshot(db)
+    finally:
+        db.close()
+
+async def _posture_snapshot_loop():
+    while True:
+        try:
+            await run_in_threadpool(_record_posture)
+        except Exception:
+            logger.exception("Posture snapshot failed")
+        await asyncio.sleep(POSTURE_INTERVAL_SECONDS)
+
+def _warm_catalog_cache():
+    db = SessionLocal()
+    try:
+        catalog_cache.get(db)
+    finally:
+        db.close()
+
+# Text extraction for uploaded evidence runs in a bounded process pool
+extraction_dispatcher = ExtractionDispatcher(storage)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    if GC_INTERVAL_SECONDS > 0:
+        app.state.evidence_gc_task = asyncio.create_task(_evidence_gc_loop())
+    if POSTURE_INTERVAL_SECONDS > 0:
+        app.state.posture_task = asyncio.create_task(_posture_snapshot_loop())
+    if extraction_dispatcher.workers > 0:
+        app.state.extraction_task = asyncio.create_task(extraction_dispatcher.run())
+    if MONITOR_TICK_SECONDS > 0:
+        app.state.monitor_task = asyncio.create_task(monitor_loop())
+    if invalidation_listener is not None:
+        app.state.invalidation_task = asyncio.create_task(invalidation_listener.run())
+    app.state.live_task = asyncio.create_task(live_broadcaster.run(_live_dashboard_stats))
+    try:
+        await run_in_threadpool(_warm_catalog_cache)
+    except Exception:
+        logger.exception("Catalog cache warm-up failed; it will be built on first read")
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    if invalidation_listener is not None and hasattr(app.state, "invalidation_task"):
+        app.state.invalidation_task.cancel()
+    live_broadcaster.close_all()
+    if hasattr(app.state, "live_task"):
+        app.state.live_task.cancel()
+    extraction_dispatcher.shutdown()
+    shutdown_simulation_pool()
 
 # ============ Authentication Endpoints ============
 
@@ -84,11 +193,16 @@ def create_user(
 def list_users(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
 ):
-    users = db.query(User).offset(skip).limit(limit).all()
-    return [UserResponse.model_validate(u) for u in users]
+    query = db.query(User).offset(skip).limit(limit)
+    selected = parse_fields(fields, UserResponse)
+    if selected:
+        return sparse_response(query, User, selected)
+    users = query.all()
+    return list_response(UserResponse, users)
 
 @app.get("/api/users/{user_id}", response_model=UserResponse)
 def get_user(
@@ -125,6 +239,13 @@ def update_user(
 
 # ============ Framework Endpoints ============
 
+def _catalog_response(request: Request, cached: CachedBody) -> Response:
+    """Serve pre-serialized catalog JSON from the in-process snapshot"""
+    headers = cache_headers(cached.etag, CACHE_CATALOG)
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
 @app.post("/api/frameworks", response_model=FrameworkResponse)
 def create_framework(
     framework: FrameworkCreate,
@@ -135,26 +256,122 @@ def create_framework(
     db.add(db_framework)
     db.commit()
     db.refresh(db_framework)
-    return FrameworkResponse.model_validate(db_framework)
+    result = FrameworkResponse.model_validate(db_framework)
+    publish(db, CATALOG, [result.id], version_of(db_framework))
+    return result
+
+@app.post("/api/frameworks/import", response_model=CatalogImportReport)
+def import_framework_catalog(
+    file: UploadFile = File(...),
+    name: Optional[str] = None,
+    version: Optional[str] = None,
+    description: Optional[str] = None,
+    format: Optional[str] = Query(None, pattern="^(oscal|csv)$"),
+    prune: bool = False,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
+):
+    # Sync endpoint: parsing and the batched inserts run in the threadpool
+    try:
+        fmt = format or detect_format(file.filename, file.content_type)
+        report = import_catalog(db, file.file, fmt, name=name, version=version, description=description,
+                                prune=prune, dry_run=dry_run)
+    except (CatalogError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Catalog conflicts with existing data")
+    if not dry_run:
+        publish(db, CATALOG, [report.framework_id])
+        if mapping_graph.built:
+            mapping_graph.reload(db)
+    return CatalogImportReport(**dataclasses.asdict(report))
 
 @app.get("/api/frameworks", response_model=List[FrameworkResponse])
 def list_frameworks(
+    request: Request,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    frameworks = db.query(Framework).all()
-    return [FrameworkResponse.model_validate(f) for f in frameworks]
+    selected = parse_fields(fields, FrameworkResponse)
+    if not selected:
+        return _catalog_response(request, catalog_cache.get(db).frameworks)
+    query = db.query(Framework)
+    
+    headers = cache_headers(make_etag("frameworks", selected, collection_version(query, Framework)), CACHE_CATALOG)
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    return sparse_response(query, Framework, selected, headers)
 
 @app.get("/api/frameworks/{framework_id}", response_model=FrameworkResponse)
 def get_framework(
     framework_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    framework = db.query(Framework).filter(Framework.id == framework_id).first()
-    if not framework:
+    cached = catalog_cache.get(db).framework.get(framework_id)
+    if cached is None:
+        # Possibly created by another worker whose notification has not arrived yet
+        if not db.query(Framework.id).filter(Framework.id == framework_id).first():
+            raise HTTPException(status_code=404, detail="Framework not found")
+        catalog_cache.invalidate()
+        cached = catalog_cache.get(db).framework[framework_id]
+    return _catalog_response(request, cached)
+
+@app.get("/api/frameworks/{framework_id}/coverage", response_model=FrameworkCoverage)
+def get_framework_coverage(
+    framework_id: int,
+    target_framework_id: int,
+    code_prefix: str = "",
+    implemented_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Target framework requirements reached through controls mapped to this framework's requirements"""
+    mapping_graph.build(db)
+    control_ids, covered = mapping_graph.covered_requirements(framework_id, target_framework_id, code_prefix, implemented_only)
+    return FrameworkCoverage(
+        framework_id=framework_id,
+        target_framework_id=target_framework_id,
+        code_prefix=code_prefix,
+        control_ids=control_ids,
+        requirements=[CoveredRequirement(id=r.id, code=r.code) for r in covered]
+    )
+
+@app.get("/api/frameworks/{framework_id}/gaps", response_model=FrameworkGapReport)
+def get_framework_gaps(
+    framework_id: int,
+    category: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Categorized gaps, counted up front and streamed requirement by requirement"""
+    if not db.query(Framework.id).filter(Framework.id == framework_id).first():
         raise HTTPException(status_code=404, detail="Framework not found")
-    return FrameworkResponse.model_validate(framework)
+    categories = category or list(GAP_CATEGORIES)
+    unknown = [c for c in categories if c not in GAP_CATEGORIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown gap categories: {', '.join(unknown)}")
+    
+    counts = gap_counts(db, framework_id)
+    
+    def stream():
+        # The request session is closed once the response starts, so use our own
+        session = SessionLocal()
+        try:
+            yield b'{"framework_id":' + orjson.dumps(framework_id) + b',"counts":' + orjson.dumps(counts) + b',"gaps":['
+            separator = b""
+            for gap in iter_gaps(session, framework_id, categories):
+                yield separator + orjson.dumps(gap)
+                separator = b","
+            yield b"]}"
+        finally:
+            session.close()
+    
+    return StreamingResponse(stream(), media_type="application/json")
 
 # ============ Requirement Endpoints ============
 
@@ -168,19 +385,37 @@ def create_requirement(
     db.add(db_requirement)
     db.commit()
     db.refresh(db_requirement)
-    return RequirementResponse.model_validate(db_requirement)
+    mapping_graph.upsert_requirement(db_requirement.id, db_requirement.framework_id, db_requirement.code)
+    result = RequirementResponse.model_validate(db_requirement)
+    publish(db, CATALOG, [result.framework_id], version_of(db_requirement))
+    return result
 
 @app.get("/api/requirements", response_model=List[RequirementResponse])
 def list_requirements(
+    request: Request,
     framework_id: Optional[int] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    selected = parse_fields(fields, RequirementResponse)
+    if not selected:
+        snapshot = catalog_cache.get(db)
+        cached = snapshot.framework_requirements(framework_id) if framework_id else snapshot.requirements
+        return _catalog_response(request, cached)
+    
     query = db.query(Requirement)
     if framework_id:
         query = query.filter(Requirement.framework_id == framework_id)
-    requirements = query.all()
-    return [RequirementResponse.model_validate(r) for r in requirements]
+    
+    headers = cache_headers(
+        make_etag("requirements", framework_id, selected, collection_version(query, Requirement)),
+        CACHE_CATALOG
+    )
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    return sparse_response(query, Requirement, selected, headers)
 
 # ============ Control Endpoints ============
 
@@ -206,28 +441,68 @@ def create_control(
     db.add(control)
     db.commit()
     db.refresh(control)
-    return ControlResponse.model_validate(control)
+    mapping_graph.upsert_control(control.id, control.status, [r.id for r in control.requirements])
+    result = ControlResponse.model_validate(control)
+    publish(db, CONTROLS, [control.id], version_of(control))
+    return result
+
+def _check_bulk_size(request: BulkRequest):
+    if len(request.items) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ROWS} rows per request")
+
+@app.post("/api/controls/bulk", response_model=BulkResult)
+def bulk_upsert_controls(
+    request: BulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
+):
+    """Create controls (rows without id) and update existing ones (rows with id)"""
+    _check_bulk_size(request)
+    return BulkResult(**dataclasses.asdict(save_controls(db, request.items)))
+
+@app.patch("/api/controls/bulk", response_model=BulkResult)
+def bulk_patch_controls(
+    request: BulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
+):
+    """Partial updates; every row needs an id"""
+    _check_bulk_size(request)
+    return BulkResult(**dataclasses.asdict(save_controls(db, request.items, allow_create=False)))
 
 @app.get("/api/controls", response_model=List[ControlResponse])
 def list_controls(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # External auditors have read-only access
-    controls = db.query(Control).offset(skip).limit(limit).all()
-    return [ControlResponse.model_validate(c) for c in controls]
+    query = db.query(Control).offset(skip).limit(limit)
+    # Full rows take the column path too: see sparse_response
+    selected = parse_fields(fields, ControlResponse) or list(ControlResponse.model_fields)
+    return sparse_response(query, Control, selected)
 
 @app.get("/api/controls/{control_id}", response_model=ControlResponse)
 def get_control(
     control_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    control = db.query(Control).filter(Control.id == control_id).first()
-    if not control:
+    # Check the version columns first so a 304 never loads or serializes the row
+    version = db.query(Control.id, Control.created_at, Control.updated_at).filter(Control.id == control_id).first()
+    if not version:
         raise HTTPException(status_code=404, detail="Control not found")
+    
+    headers = cache_headers(make_etag("control", version.id, version.updated_at or version.created_at), CACHE_REVALIDATE)
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    control = db.query(Control).filter(Control.id == control_id).first()
+    response.headers.update(headers)
     return ControlResponse.model_validate(control)
 
 @app.put("/api/controls/{control_id}", response_model=ControlResponse)
@@ -254,7 +529,12 @@ def update_control(
     control.last_checked = datetime.utcnow()
     db.commit()
     db.refresh(control)
-    return ControlResponse.model_validate(control)
+    mapping_graph.upsert_control(
+        control.id, control.status, [r.id for r in control.requirements] if requirement_ids is not None else None
+    )
+    result = ControlResponse.model_validate(control)
+    publish(db, CONTROLS, [control.id], version_of(control))
+    return result
 
 @app.delete("/api/controls/{control_id}")
 def delete_control(
@@ -267,8 +547,24 @@ def delete_control(
         raise HTTPException(status_code=404, detail="Control not found")
     db.delete(control)
     db.commit()
+    mapping_graph.remove_control(control_id)
+    publish(db, CONTROLS, [control_id])
     return {"message": "Control deleted successfully"}
 
+@app.get("/api/controls/{control_id}/impact", response_model=ControlImpact)
+def get_control_impact(
+    control_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Risks that lose mitigation if this control fails"""
+    mapping_graph.build(db)
+    impact = mapping_graph.control_impact(control_id)
+    if impact is None:
+        raise HTTPException(status_code=404, detail="Control not found")
+    risk_ids, unmitigated = impact
+    return ControlImpact(control_id=control_id, risk_ids=risk_ids, unmitigated_risk_ids=unmitigated)
+
 # ============ Evidence Endpoints ============
 
 @app.post("/api/evidence", response_model=EvidenceResponse)
@@ -294,30 +590,53 @@ async def create_evidence(
     )
     
     if file:
-        # Save file
-        file_path = EVIDENCE_DIR / f"{datetime.utcnow().timestamp()}_{file.filename}"
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Save file; the upload is blocking I/O (possibly a multipart S3 upload)
+        key = f"{datetime.utcnow().timestamp()}_{os.path.basename(file.filename)}"
+        await run_in_threadpool(storage.save, key, file.file)
         
         evidence.file_name = file.filename
-        evidence.file_path = str(file_path)
+        evidence.file_path = key
     
     db.add(evidence)
+    db.flush()
+    enqueue_extraction(db, evidence)
     db.commit()
     db.refresh(evidence)
+    extraction_dispatcher.notify()
     return EvidenceResponse.model_validate(evidence)
 
 @app.get("/api/evidence", response_model=List[EvidenceResponse])
 def list_evidence(
     control_id: Optional[int] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     query = db.query(Evidence)
     if control_id:
         query = query.filter(Evidence.control_id == control_id)
-    evidence = query.all()
-    return [EvidenceResponse.model_validate(e) for e in evidence]
+    # Only the schema's columns are read, so extracted_text never is
+    selected = parse_fields(fields, EvidenceResponse) or list(EvidenceResponse.model_fields)
+    return sparse_response(query, Evidence, selected)
+
+@app.get("/api/evidence/search", response_model=EvidenceSearchResponse)
+def search_evidence_endpoint(
+    q: str = Query(..., min_length=1),
+    control_id: Optional[int] = None,
+    framework_id: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    hits, has_more = search_evidence(db, q, control_id=control_id, framework_id=framework_id, skip=skip, limit=limit)
+    return EvidenceSearchResponse(
+        query=q,
+        skip=skip,
+        limit=limit,
+        has_more=has_more,
+        results=[EvidenceSearchHit(evidence=EvidenceResponse.model_validate(e), rank=rank) for e, rank in hits]
+    )
 
 @app.delete("/api/evidence/{evidence_id}")
 def delete_evidence(
@@ -329,14 +648,60 @@ def delete_evidence(
     if not evidence:
         raise HTTPException(status_code=404, detail="Evidence not found")
     
-    # Delete file if exists
-    if evidence.file_path and os.path.exists(evidence.file_path):
-        os.remove(evidence.file_path)
-    
+    file_path = evidence.file_path
     db.delete(evidence)
     db.commit()
+    
+    # Delete file after the row is gone; anything left behind is reclaimed by evidence GC
+    if file_path:
+        storage.delete(storage.key_for(file_path))
     return {"message": "Evidence deleted successfully"}
 
+@app.get("/api/evidence/{evidence_id}/extraction", response_model=List[ExtractionJobResponse])
+def get_evidence_extraction_jobs(
+    evidence_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
+):
+    jobs = db.query(ExtractionJob).filter(ExtractionJob.evidence_id == evidence_id).order_by(ExtractionJob.id).all()
+    return list_response(ExtractionJobResponse, jobs)
+
+@app.get("/api/evidence/{evidence_id}/download")
+def download_evidence(
+    evidence_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER, UserRole.EXTERNAL_AUDITOR]))
+):
+    evidence = db.query(Evidence).filter(Evidence.id == evidence_id).first()
+    if not evidence or not evidence.file_path:
+        raise HTTPException(status_code=404, detail="Evidence file not found")
+    
+    key = storage.key_for(evidence.file_path)
+    
+    # Object stores hand out a short-lived URL so the bytes bypass the API workers
+    url = storage.presigned_url(key, evidence.file_name)
+    if url:
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    
+    path = storage.local_path(key)
+    if path is not None:
+        if not path.is_file():
+            raise HTTPException(status_code=404, detail="Evidence file not found")
+        return FileResponse(path, filename=evidence.file_name)
+    
+    return StreamingResponse(
+        storage.open(key),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{evidence.file_name}"'}
+    )
+
+@app.post("/api/evidence/gc", response_model=EvidenceGCReport)
+async def run_evidence_gc(
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    report = await run_in_threadpool(_run_evidence_gc)
+    return EvidenceGCReport(**dataclasses.asdict(report))
+
 # ============ Policy Endpoints ============
 
 @app.post("/api/policies", response_model=PolicyResponse)
@@ -351,32 +716,54 @@ def create_policy(
     db.refresh(policy)
     return PolicyResponse.model_validate(policy)
 
-@app.get("/api/policies", response_model=List[PolicyResponse])
+@app.get("/api/policies", response_model=List[PolicySummary])
 def list_policies(
+    request: Request,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Employees only see published policies
+    published_only = current_user.role == UserRole.EMPLOYEE
     query = db.query(Policy)
-    if current_user.role == UserRole.EMPLOYEE:
+    if published_only:
         query = query.filter(Policy.is_published == True)
-    policies = query.all()
-    return [PolicyResponse.model_validate(p) for p in policies]
+    # List views never load policy bodies; use get_policy for content
+    selected = parse_fields(fields, PolicySummary) or list(PolicySummary.model_fields)
+    
+    headers = cache_headers(
+        make_etag("policies", published_only, selected, RENDER_VERSION, collection_version(query, Policy)),
+        CACHE_REVALIDATE
+    )
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    return sparse_response(query, Policy, selected, headers, constants={"render_version": RENDER_VERSION})
 
 @app.get("/api/policies/{policy_id}", response_model=PolicyResponse)
 def get_policy(
     policy_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    policy = db.query(Policy).filter(Policy.id == policy_id).first()
-    if not policy:
+    # Check the version columns first so a 304 never loads the policy body
+    version = db.query(
+        Policy.id, Policy.is_published, Policy.created_at, Policy.updated_at
+    ).filter(Policy.id == policy_id).first()
+    if not version:
         raise HTTPException(status_code=404, detail="Policy not found")
     
     # Employees can only view published policies
-    if current_user.role == UserRole.EMPLOYEE and not policy.is_published:
+    if current_user.role == UserRole.EMPLOYEE and not version.is_published:
         raise HTTPException(status_code=403, detail="Policy not accessible")
     
+    headers = cache_headers(make_etag("policy", version.id, version.updated_at or version.created_at), CACHE_REVALIDATE)
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    policy = db.query(Policy).filter(Policy.id == policy_id).first()
+    response.headers.update(headers)
     return PolicyResponse.model_validate(policy)
 
 @app.put("/api/policies/{policy_id}", response_model=PolicyResponse)
@@ -386,18 +773,14 @@ def update_policy(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
 ):
-    policy = db.query(Policy).filter(Policy.id == policy_id).first()
+    # Row lock serializes concurrent edits so revisions stay sequential
+    policy = db.query(Policy).filter(Policy.id == policy_id).with_for_update().first()
     if not policy:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    # Save current version to history before updating
+    # Save current version to history (as a delta) before updating
     if policy_data.content and policy_data.content != policy.content:
-        version = PolicyVersion(
-            policy_id=policy.id,
-            version=policy.version,
-            content=policy.content
-        )
-        db.add(version)
+        append_version(db, policy.id, policy.version, policy.content)
     
     update_data = policy_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
@@ -407,9 +790,142 @@ def update_policy(
     db.refresh(policy)
     return PolicyResponse.model_validate(policy)
 
+def _get_policy_version(db: Session, policy_id: int, revision: int) -> PolicyVersion:
+    version = db.query(PolicyVersion).filter(
+        PolicyVersion.policy_id == policy_id,
+        PolicyVersion.revision == revision
+    ).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Policy version not found")
+    return version
+
+@app.get("/api/policies/{policy_id}/versions", response_model=List[PolicyVersionResponse])
+def list_policy_versions(
+    policy_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER, UserRole.EXTERNAL_AUDITOR]))
+):
+    versions = db.query(
+        PolicyVersion.id, PolicyVersion.policy_id, PolicyVersion.revision, PolicyVersion.version,
+        PolicyVersion.is_snapshot, PolicyVersion.created_at
+    ).filter(PolicyVersion.policy_id == policy_id).order_by(PolicyVersion.revision).all()
+    return list_response(PolicyVersionResponse, versions)
+
+@app.get("/api/policies/{policy_id}/versions/{revision}", response_model=PolicyVersionContent)
+def get_policy_version(
+    policy_id: int,
+    revision: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER, UserRole.EXTERNAL_AUDITOR]))
+):
+    version = _get_policy_version(db, policy_id, revision)
+    content = reconstruct(db, policy_id, revision)
+    if content is None:
+        raise HTTPException(status_code=409, detail="Policy history has not been converted yet")
+    return PolicyVersionContent(
+        **PolicyVersionResponse.model_validate(version).model_dump(),
+        content=content
+    )
+
+@app.get("/api/policies/{policy_id}/versions/{revision}/diff", response_model=PolicyVersionDiff)
+def get_policy_version_diff(
+    policy_id: int,
+    revision: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER, UserRole.EXTERNAL_AUDITOR]))
+):
+    version = _get_policy_version(db, policy_id, revision)
+    
+    # The first revision has nothing before it: everything is an addition
+    if revision == 1 or version.delta is None:
+        content = reconstruct(db, policy_id, revision) or ""
+        hunks = [{"base_start": 1, "removed": [], "added": content.splitlines(keepends=True)}] if content else []
+        base_revision = None
+    else:
+        base = reconstruct(db, policy_id, revision - 1)
+        if base is None:
+            raise HTTPException(status_code=409, detail="Policy history has not been converted yet")
+        hunks = delta_hunks(base, version.delta)
+        base_revision = revision - 1
+    
+    return PolicyVersionDiff(
+        policy_id=policy_id,
+        revision=revision,
+        version=version.version,
+        base_revision=base_revision,
+        lines_added=sum(len(h["added"]) for h in hunks),
+        lines_removed=sum(len(h["removed"]) for h in hunks),
+        hunks=[PolicyDiffHunk(**h) for h in hunks]
+    )
+
+def _rendered_response(rendering: PolicyRendering, headers: dict) -> Response:
+    body = PolicyRenderedResponse(
+        policy_id=rendering.policy_id,
+        version=rendering.version,
+        content_hash=rendering.content_hash,
+        html=rendering.html,
+        toc=json.loads(rendering.toc),
+        render_version=rendering.render_version,
+        rendered_at=rendering.rendered_at
+    )
+    return Response(body.model_dump_json(), media_type="application/json", headers=headers)
+
+@app.get("/api/policies/{policy_id}/rendered", response_model=PolicyRenderedResponse)
+def get_policy_rendered(
+    policy_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    version = db.query(Policy.id, Policy.is_published, Policy.content_hash).filter(Policy.id == policy_id).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    
+    # Employees can only view published policies
+    if current_user.role == UserRole.EMPLOYEE and not version.is_published:
+        raise HTTPException(status_code=403, detail="Policy not accessible")
+    
+    headers = cache_headers(make_etag("policy-html", version.id, version.content_hash, RENDER_VERSION), CACHE_REVALIDATE)
+    if is_not_modified(request, headers["ETag"]):
+        return not_modified(headers)
+    
+    # Normally rendered at publish time; drafts and edits are rendered on first view
+    rendering = db.query(PolicyRendering).filter(
+        PolicyRendering.policy_id == policy_id,
+        PolicyRendering.content_hash == version.content_hash,
+        PolicyRendering.render_version == RENDER_VERSION
+    ).first() or render_policy(db, policy_id)
+    return _rendered_response(rendering, headers)
+
+@app.get("/api/policies/{policy_id}/rendered/{content_hash}", response_model=PolicyRenderedResponse)
+def get_policy_rendered_revision(
+    policy_id: int,
+    content_hash: str,
+    v: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    rendering = db.query(PolicyRendering).filter(
+        PolicyRendering.policy_id == policy_id,
+        PolicyRendering.content_hash == content_hash,
+        PolicyRendering.render_version == RENDER_VERSION
+    ).first()
+    if not rendering:
+        raise HTTPException(status_code=404, detail="Rendered policy not found")
+    
+    if current_user.role == UserRole.EMPLOYEE and not rendering.policy.is_published:
+        raise HTTPException(status_code=403, detail="Policy not accessible")
+    
+    # Content hash plus render version pin the bytes, so that URL can be cached
+    # forever; without (or with a stale) ?v= the body may change, so revalidate
+    cache_policy = CACHE_IMMUTABLE if v == RENDER_VERSION else CACHE_REVALIDATE
+    headers = cache_headers(make_etag("policy-html", policy_id, content_hash, RENDER_VERSION), cache_policy)
+    return _rendered_response(rendering, headers)
+
 @app.post("/api/policies/{policy_id}/publish")
 def publish_policy(
     policy_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
 ):
@@ -428,6 +944,9 @@ def publish_policy(
     policy.published_at = datetime.utcnow()
     db.commit()
     
+    # Render the HTML after responding so publishing stays fast
+    background_tasks.add_task(render_policy_task, policy_id)
+    
     return {"message": "Policy published successfully"}
 
 @app.delete("/api/policies/{policy_id}")
@@ -475,13 +994,13 @@ def acknowledge_policy(
     db.refresh(acknowledgment)
     return PolicyAcknowledgmentResponse.model_validate(acknowledgment)
 
-@app.get("/api/policy-acknowledgments/pending", response_model=List[PolicyResponse])
+@app.get("/api/policy-acknowledgments/pending", response_model=List[PolicySummary])
 def get_pending_acknowledgments(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Get all published policies
-    published_policies = db.query(Policy).filter(Policy.is_published == True).all()
+    published_policies = db.query(Policy).options(defer(Policy.content)).filter(Policy.is_published == True).all()
     
     # Filter out already acknowledged
     pending = []
@@ -495,7 +1014,7 @@ def get_pending_acknowledgments(
         if not ack:
             pending.append(policy)
     
-    return [PolicyResponse.model_validate(p) for p in pending]
+    return list_response(PolicySummary, pending)
 
 # ============ Risk Endpoints ============
 
@@ -505,29 +1024,22 @@ def create_risk(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
 ):
-    # Calculate risk score and level
-    risk_score = risk_data.likelihood * risk_data.impact
-    
-    if risk_score >= 20:
-        risk_level = RiskLevel.CRITICAL
-    elif risk_score >= 12:
-        risk_level = RiskLevel.HIGH
-    elif risk_score >= 6:
-        risk_level = RiskLevel.MEDIUM
-    else:
-        risk_level = RiskLevel.LOW
+    problem = validate_ranges(risk_data.model_dump())
+    if problem:
+        raise HTTPException(status_code=400, detail=problem)
     
     risk = Risk(
         title=risk_data.title,
         description=risk_data.description,
         likelihood=risk_data.likelihood,
         impact=risk_data.impact,
-        risk_score=risk_score,
-        risk_level=risk_level,
         category=risk_data.category,
         status=risk_data.status,
-        owner_id=risk_data.owner_id
+        owner_id=risk_data.owner_id,
+        **{f: getattr(risk_data, f) for f in RANGE_FIELDS}
     )
+    # Calculate risk score and level with the active scoring matrix
+    get_active_matrix(db).apply(risk)
     
     # Add control mappings
     if risk_data.control_ids:
@@ -535,29 +1047,175 @@ def create_risk(
         risk.controls = controls
     
     db.add(risk)
-    db.commit()
-    db.refresh(risk)
+    db.flush()
     
     # Create history entry
-    history = RiskHistory(
-        risk_id=risk.id,
-        changed_by_id=current_user.id,
-        change_description=f"Risk created with status: {risk.status}"
-    )
-    db.add(history)
+    record_change(db, risk, None, "created", current_user.id)
     db.commit()
-    
-    return RiskResponse.model_validate(risk)
+    db.refresh(risk)
+    mapping_graph.upsert_risk(risk.id, [c.id for c in risk.controls])
+    result = RiskResponse.model_validate(risk)
+    publish(db, RISKS, [risk.id], version_of(risk))
+    return result
+
+@app.post("/api/risks/bulk", response_model=BulkResult)
+def bulk_upsert_risks(
+    request: BulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
+):
+    """Create risks (rows without id) and update existing ones (rows with id)"""
+    _check_bulk_size(request)
+    return BulkResult(**dataclasses.asdict(save_risks(db, request.items, current_user.id)))
+
+@app.patch("/api/risks/bulk", response_model=BulkResult)
+def bulk_patch_risks(
+    request: BulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER]))
+):
+    """Partial updates; every row needs an id"""
+    _check_bulk_size(request)
+    return BulkResult(**dataclasses.asdict(save_risks(db, request.items, current_user.id, allow_create=False)))
 
 @app.get("/api/risks", response_model=List[RiskResponse])
 def list_risks(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    query = db.query(Risk).offset(skip).limit(limit)
+    selected = parse_fields(fields, RiskResponse) or list(RiskResponse.model_fields)
+    return sparse_response(query, Risk, selected)
+
+# ============ Risk Analytics Endpoints ============
+
+def _filtered_risks(query, status: Optional[RiskStatus], category: Optional[str],
+                    owner_id: Optional[int], risk_level: Optional[RiskLevel]):
+    if status:
+        query = query.filter(Risk.status == status)
+    if category:
+        query = query.filter(Risk.category == category)
+    if owner_id:
+        query = query.filter(Risk.owner_id == owner_id)
+    if risk_level:
+        query = query.filter(Risk.risk_level == risk_level)
+    return query
+
+@app.get("/api/risks/heatmap", response_model=RiskHeatmap)
+def get_risk_heatmap(
+    status: Optional[RiskStatus] = None,
+    category: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    risk_level: Optional[RiskLevel] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    query = _filtered_risks(
+        db.query(Risk.likelihood, Risk.impact, func.count(Risk.id)),
+        status, category, owner_id, risk_level
+    ).group_by(Risk.likelihood, Risk.impact).order_by(Risk.likelihood, Risk.impact)
+    cells = [[likelihood, impact, count] for likelihood, impact, count in query]
+    return RiskHeatmap(cells=cells, total=sum(c[2] for c in cells))
+
+# group_by -> column
+RISK_AGGREGATES = {
+    "category": Risk.category,
+    "status": Risk.status,
+    "owner": Risk.owner_id,
+    "level": Risk.risk_level,
+}
+
+@app.get("/api/risks/aggregates", response_model=RiskAggregateResponse)
+def get_risk_aggregates(
+    group_by: str = "level",
+    status: Optional[RiskStatus] = None,
+    category: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    risk_level: Optional[RiskLevel] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    risks = db.query(Risk).offset(skip).limit(limit).all()
-    return [RiskResponse.model_validate(r) for r in risks]
+    column = RISK_AGGREGATES.get(group_by)
+    if column is None:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(RISK_AGGREGATES)}")
+    
+    query = db.query(column, func.count(Risk.id), func.avg(Risk.risk_score), func.max(Risk.risk_score))
+    if group_by == "owner":
+        query = query.add_columns(User.full_name).outerjoin(User, User.id == Risk.owner_id).group_by(column, User.full_name)
+    else:
+        query = query.group_by(column)
+    query = _filtered_risks(query, status, category, owner_id, risk_level).order_by(func.count(Risk.id).desc())
+    
+    groups = []
+    for row in query:
+        key = row[0].value if hasattr(row[0], "value") else row[0]
+        groups.append(RiskAggregateGroup(
+            key=None if key is None else str(key),
+            label=(row[4] or "Unassigned") if group_by == "owner" else None,
+            count=row[1],
+            avg_score=round(float(row[2]), 2) if row[2] is not None else None,
+            max_score=row[3]
+        ))
+    return RiskAggregateResponse(group_by=group_by, groups=groups, total=sum(g.count for g in groups))
+
+@app.get("/api/risks/drilldown", response_model=RiskIdPage)
+def drill_down_risks(
+    likelihood: Optional[int] = Query(None, ge=1, le=5),
+    impact: Optional[int] = Query(None, ge=1, le=5),
+    status: Optional[RiskStatus] = None,
+    category: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    risk_level: Optional[RiskLevel] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Ids of the risks behind a heatmap cell or aggregate group"""
+    query = _filtered_risks(db.query(Risk.id), status, category, owner_id, risk_level)
+    if likelihood:
+        query = query.filter(Risk.likelihood == likelihood)
+    if impact:
+        query = query.filter(Risk.impact == impact)
+    ids = [r[0] for r in query.order_by(Risk.id).offset(skip).limit(limit + 1)]
+    return RiskIdPage(ids=ids[:limit], has_more=len(ids) > limit)
+
+# ============ Quantitative Risk Endpoints ============
+
+@app.get("/api/risks/simulation", response_model=RegisterSimulationResponse)
+def simulate_risk_register(
+    trials: int = Query(SIM_TRIALS, ge=1000, le=SIM_MAX_TRIALS),
+    seed: int = SIM_SEED,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER, UserRole.EXTERNAL_AUDITOR]))
+):
+    """Annualized loss across every risk with FAIR ranges; cached until the inputs change"""
+    try:
+        return simulate_register(db, trials, seed)
+    except SimulationTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@app.get("/api/risks/{risk_id}/simulation", response_model=RiskSimulationResponse)
+def simulate_single_risk(
+    risk_id: int,
+    trials: int = Query(SIM_TRIALS, ge=1000, le=SIM_MAX_TRIALS),
+    seed: int = SIM_SEED,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.COMPLIANCE_OFFICER, UserRole.EXTERNAL_AUDITOR]))
+):
+    risk = db.query(Risk).filter(Risk.id == risk_id).first()
+    if not risk:
+        raise HTTPException(status_code=404, detail="Risk not found")
+    try:
+        result = simulate_risk(db, risk, trials, seed)
+    except SimulationTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=400, detail="Risk has no frequency and magnitude ranges")
+    return RiskSimulationResponse(risk_id=risk.id, **result)
 
 @app.get("/api/risks/{risk_id}", response_model=RiskResponse)
 def get_risk(
@@ -583,45 +1241,36 @@ def update_risk(
     
     update_data = risk_data.model_dump(exclude_unset=True)
     control_ids = update_data.pop("control_ids", None)
+    before = risk_state(risk)
+    
+    # FAIR ranges take explicit nulls (clearing a triple); other fields ignore them
+    ranges = ranges_after(risk, update_data)
+    problem = validate_ranges(ranges)
+    if problem:
+        raise HTTPException(status_code=400, detail=problem)
     
-    changes = []
     for key, value in update_data.items():
-        if value is not None and getattr(risk, key) != value:
-            changes.append(f"{key}: {getattr(risk, key)} -> {value}")
+        if (value is not None or key in RANGE_FIELDS) and getattr(risk, key) != value:
             setattr(risk, key, value)
     
     # Recalculate risk score if likelihood or impact changed
     if risk_data.likelihood is not None or risk_data.impact is not None:
-        risk.risk_score = risk.likelihood * risk.impact
-        
-        if risk.risk_score >= 20:
-            risk.risk_level = RiskLevel.CRITICAL
-        elif risk.risk_score >= 12:
-            risk.risk_level = RiskLevel.HIGH
-        elif risk.risk_score >= 6:
-            risk.risk_level = RiskLevel.MEDIUM
-        else:
-            risk.risk_level = RiskLevel.LOW
+        get_active_matrix(db).apply(risk)
     
     if control_ids is not None:
         controls = db.query(Control).filter(Control.id.in_(control_ids)).all()
         risk.controls = controls
-        changes.append(f"Controls updated")
     
+    # Create history entry with field-level diffs
+    record_change(db, risk, before, "updated", current_user.id)
     db.commit()
     
-    # Create history entry
-    if changes:
-        history = RiskHistory(
-            risk_id=risk.id,
-            changed_by_id=current_user.id,
-            change_description="; ".join(changes)
-        )
-        db.add(history)
-        db.commit()
-    
     db.refresh(risk)
-    return RiskResponse.model_validate(risk)
+    if control_ids is not None:
+        mapping_graph.upsert_risk(risk.id, [c.id for c in risk.controls])
+    result = RiskResponse.model_validate(risk)
+    publish(db, RISKS, [risk.id], version_of(risk))
+    return result
 
 @app.delete("/api/risks/{risk_id}")
 def delete_risk(
@@ -632,31 +1281,163 @@ def delete_risk(
     risk = db.query(Risk).filter(Risk.id == risk_id).first()
     if not risk:
         raise HTTPException(status_code=404, detail="Risk not found")
+    record_change(db, risk, None, "deleted", current_user.id)
     db.delete(risk)
     db.commit()
+    mapping_graph.remove_risk(risk_id)
+    publish(db, RISKS, [risk_id])
     return {"message": "Risk deleted successfully"}
 
+@app.get("/api/risks/{risk_id}/history", response_model=List[RiskHistoryResponse])
+def get_risk_history(
+    risk_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # risk_ref also covers risks that have since been deleted
+    history = db.query(RiskHistory).filter(
+        RiskHistory.risk_ref == risk_id
+    ).order_by(RiskHistory.changed_at, RiskHistory.id).all()
+    if not history and not db.query(Risk.id).filter(Risk.id == risk_id).first():
+        raise HTTPException(status_code=404, detail="Risk not found")
+    return list_response(RiskHistoryResponse, history)
+
+# ============ Risk Scoring Endpoints ============
+
+def _matrix_response(matrix: ScoringMatrix, rescored_at=None) -> RiskScoringMatrixResponse:
+    return RiskScoringMatrixResponse(
+        id=matrix.id,
+        name=matrix.name,
+        scores=[list(row) for row in matrix.scores],
+        medium_threshold=matrix.medium_threshold,
+        high_threshold=matrix.high_threshold,
+        critical_threshold=matrix.critical_threshold,
+        rescored_at=rescored_at
+    )
+
+@app.get("/api/risk-scoring/matrix", response_model=RiskScoringMatrixResponse)
+def get_risk_scoring_matrix(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    matrix = get_active_matrix(db)
+    rescored_at = None
+    if matrix.id is not None:
+        rescored_at = db.query(RiskScoringMatrix.rescored_at).filter(RiskScoringMatrix.id == matrix.id).scalar()
+    return _matrix_response(matrix, rescored_at)
+
+@app.put("/api/risk-scoring/matrix", response_model=RiskScoringMatrixResponse)
+def update_risk_scoring_matrix(
+    matrix_data: RiskScoringMatrixUpdate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    problem = validate_matrix(
+        matrix_data.scores,
+        [matrix_data.medium_threshold, matrix_data.high_threshold, matrix_data.critical_threshold]
+    )
+    if problem:
+        raise HTTPException(status_code=400, detail=problem)
+    
+    row = activate_matrix(db, created_by_id=current_user.id, **matrix_data.model_dump())
+    db.commit()
+    db.refresh(row)
+    
+    # Existing risks are rescored after the response is sent
+    background_tasks.add_task(rescore_task, row.id, current_user.id)
+    return _matrix_response(ScoringMatrix.from_model(row))
+
+@app.post("/api/risk-scoring/rescore", response_model=RiskRescoreReport)
+def rescore_risks(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    report = rescore_all(db, changed_by_id=current_user.id)
+    return RiskRescoreReport(**dataclasses.asdict(report))
+
 # ============ Alert Endpoints ============
 
+@app.get("/api/monitoring/jobs", response_model=List[MonitorJobResponse])
+def list_monitoring_jobs(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    rows = {row.name: row for row in db.query(MonitorJob)}
+    jobs = []
+    for job in MONITOR_JOBS:
+        row = rows.get(job.name)
+        jobs.append(MonitorJobResponse(
+            name=job.name,
+            interval_seconds=job.interval_seconds,
+            **({c: getattr(row, c) for c in ("lease_holder", "lease_expires_at", "next_run_at", "last_run_at",
+                                            "last_alerts", "last_resolved", "last_error")} if row else {})
+        ))
+    return jobs
+
+@app.post("/api/monitoring/jobs/{name}/run", response_model=MonitorRunResult)
+def run_monitoring_job(
+    name: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Run a job now, unless another worker holds its lease"""
+    job = MONITOR_JOBS_BY_NAME.get(name)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Monitoring job not found")
+    run = run_monitoring(db, job, force=True)
+    if run is None:
+        raise HTTPException(status_code=409, detail="Job is running on another worker")
+    return MonitorRunResult(name=name, alerts=run.alerts, resolved=run.resolved)
+
 @app.get("/api/alerts", response_model=List[AlertResponse])
 def list_alerts(
     include_resolved: bool = False,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     query = db.query(Alert)
     if not include_resolved:
         query = query.filter(Alert.is_resolved == False)
-    alerts = query.order_by(Alert.created_at.desc()).all()
-    return [AlertResponse.model_validate(a) for a in alerts]
+    # Coalesced alerts surface again when they recur
+    query = query.order_by(Alert.last_seen_at.desc(), Alert.id.desc()).offset(skip).limit(limit)
+    selected = parse_fields(fields, AlertResponse)
+    if selected:
+        return sparse_response(query, Alert, selected)
+    alerts = query.all()
+    return list_response(AlertResponse, alerts)
 
-# ============ Dashboard Endpoints ============
+# ============ Search Endpoints ============
 
-@app.get("/api/dashboard/stats", response_model=DashboardStats)
-def get_dashboard_stats(
+@app.get("/api/search", response_model=SearchResponse)
+def unified_search(
+    q: str = Query(..., min_length=2),
+    types: Optional[str] = Query(None, description="Comma-separated subset of control,risk,policy,requirement"),
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    entity_types = list(SEARCH_ENTITIES)
+    if types:
+        entity_types = [t.strip() for t in types.split(",") if t.strip()]
+        unknown = [t for t in entity_types if t not in SEARCH_ENTITIES]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+    
+    hits = search_all(
+        db, q, entity_types, limit=limit,
+        # Employees only see published policies
+        published_only=current_user.role == UserRole.EMPLOYEE
+    )
+    return SearchResponse(query=q, results=[SearchHit(**h) for h in hits])
+
+# ============ Dashboard Endpoints ============
+
+def _shared_dashboard_stats(db: Session) -> dict:
+    """Dashboard stats that are the same for every user"""
     # Compliance progress by framework
     frameworks = db.query(Framework).all()
     compliance_progress = []
@@ -693,6 +1474,32 @@ def get_dashboard_stats(
     for risk in risks:
         risk_counts[risk.risk_level] += 1
     
+    # Active alerts
+    active_alerts = db.query(Alert).filter(Alert.is_resolved == False).count()
+    
+    # Controls lacking evidence
+    controls_lacking_evidence = db.query(Control).outerjoin(Evidence).filter(Evidence.id == None).count()
+    
+    return dict(
+        compliance_progress=compliance_progress,
+        total_risks=len(risks),
+        high_risks=risk_counts[RiskLevel.HIGH] + risk_counts[RiskLevel.CRITICAL],
+        medium_risks=risk_counts[RiskLevel.MEDIUM],
+        low_risks=risk_counts[RiskLevel.LOW],
+        active_alerts=active_alerts,
+        controls_lacking_evidence=controls_lacking_evidence
+    )
+
+def _live_dashboard_stats(db: Session) -> dict:
+    stats = _shared_dashboard_stats(db)
+    stats["compliance_progress"] = [p.model_dump(mode="json") for p in stats["compliance_progress"]]
+    return stats
+
+@app.get("/api/dashboard/stats", response_model=DashboardStats)
+def get_dashboard_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     # Pending acknowledgments
     if current_user.role == UserRole.EMPLOYEE:
         published_policies = db.query(Policy).filter(Policy.is_published == True).all()
@@ -713,21 +1520,68 @@ def get_dashboard_stats(
         total_acknowledged = db.query(PolicyAcknowledgment).count()
         pending_count = total_expected - total_acknowledged
     
-    # Active alerts
-    active_alerts = db.query(Alert).filter(Alert.is_resolved == False).count()
-    
-    # Controls lacking evidence
-    controls_lacking_evidence = db.query(Control).outerjoin(Evidence).filter(Evidence.id == None).count()
-    
     return DashboardStats(
-        compliance_progress=compliance_progress,
-        total_risks=len(risks),
-        high_risks=risk_counts[RiskLevel.HIGH] + risk_counts[RiskLevel.CRITICAL],
-        medium_risks=risk_counts[RiskLevel.MEDIUM],
-        low_risks=risk_counts[RiskLevel.LOW],
-        pending_acknowledgments=pending_count,
-        active_alerts=active_alerts,
-        controls_lacking_evidence=controls_lacking_evidence
+        **_shared_dashboard_stats(db),
+        pending_acknowledgments=pending_count
+    )
+
+@app.get("/api/dashboard/trends", response_model=PostureTrends)
+def get_dashboard_trends(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: Optional[str] = None,
+    framework_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=90)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    granularity = granularity or auto_granularity(start, end)
+    if granularity not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(PERIODS)}")
+    
+    points = posture_trends(db, start, end, granularity, framework_id)
+    framework_ids = {f["framework_id"] for p in points for f in p["frameworks"]}
+    names = dict(db.query(Framework.id, Framework.name).filter(Framework.id.in_(framework_ids))) if framework_ids else {}
+    return PostureTrends(granularity=granularity, start=start, end=end, frameworks=names, points=points)
+
+# ============ Live Update Endpoints ============
+
+def _stream_user(ticket: str) -> Optional[User]:
+    db = SessionLocal()
+    try:
+        return user_for_stream_ticket(db, ticket)
+    finally:
+        db.close()
+
+@app.post("/api/live/ticket", response_model=LiveTicket)
+def issue_live_ticket(current_user: User = Depends(get_current_user)):
+    """Short-lived credential for /api/live, which EventSource can only pass in the URL"""
+    return LiveTicket(ticket=create_stream_ticket(current_user.email), expires_in=STREAM_TICKET_EXPIRE_SECONDS)
+
+@app.get("/api/live")
+async def live_updates(ticket: str):
+    """Server-Sent Events: alerts, control status and dashboard stat changes
+
+    Events are "alerts" (changed alerts; null means refetch), "controls"
+    (id, title and status of changed controls, plus removed ids),
+    "dashboard" (only the stats that changed) and "resync" (refetch
+    everything; sent on connect and when this client fell behind).
+    Alert and control events go to admins, compliance officers and auditors.
+    Authenticated by a ticket from POST /api/live/ticket, checked on connect.
+    """
+    user = await run_in_threadpool(_stream_user, ticket)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    subscriber = live_broadcaster.connect(user.id, user.role)
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many live connections", headers={"Retry-After": "30"})
+    return StreamingResponse(
+        live_stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 # ============ Report Endpoints ============
@@ -771,9 +1625,13 @@ def get_policy_acknowledgment_report(
 
 @app.get("/api/reports/risk-register")
 def get_risk_register_report(
+    as_of: Optional[datetime] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    if as_of is not None:
+        return _risk_register_as_of(db, as_of)
+    
     risks = db.query(Risk).all()
     
     report = []
@@ -799,6 +1657,39 @@ def get_risk_register_report(
     
     return {"risks": report, "total_count": len(report)}
 
+def _risk_register_as_of(db: Session, as_of: datetime):
+    try:
+        register = register_as_of(db, as_of)
+    except HistoryUnavailable as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Owner and control names are today's; everything else is as of the given time
+    owner_ids = {s.get("owner_id") for s in register.values()} - {None}
+    control_ids = {c for s in register.values() for c in s.get("control_ids", [])}
+    owners = dict(db.query(User.id, User.full_name).filter(User.id.in_(owner_ids))) if owner_ids else {}
+    controls = dict(db.query(Control.id, Control.title).filter(Control.id.in_(control_ids))) if control_ids else {}
+    
+    report = []
+    for risk_id in sorted(register):
+        state = register[risk_id]
+        report.append({
+            "id": risk_id,
+            "title": state.get("title"),
+            "description": state.get("description"),
+            "likelihood": state.get("likelihood"),
+            "impact": state.get("impact"),
+            "risk_score": state.get("risk_score"),
+            "risk_level": state.get("risk_level"),
+            "category": state.get("category"),
+            "status": state.get("status"),
+            "owner": owners.get(state.get("owner_id"), "Unassigned"),
+            "mitigating_controls": [controls[c] for c in state.get("control_ids", []) if c in controls],
+            "created_at": state.get("created_at"),
+            "updated_at": None
+        })
+    
+    return {"risks": report, "total_count": len(report), "as_of": as_of.isoformat()}
+
 @app.get("/api/reports/compliance/{framework_id}")
 def get_compliance_report(
     framework_id: int,
@@ -838,6 +1729,34 @@ def get_compliance_report(
         "requirements": report
     }
 
+# ============ Metrics Endpoints ============
+
+@app.get("/api/metrics/compression", response_model=List[RouteCompressionStats])
+def get_compression_metrics(
+    reset: bool = False,
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    stats = compression_metrics.snapshot()
+    if reset:
+        compression_metrics.reset()
+    return stats
+
+@app.get("/api/metrics/invalidation", response_model=InvalidationStats)
+def get_invalidation_metrics(
+    reset: bool = False,
+    current_user: User = Depends(require_role([UserRole.ADMIN]))
+):
+    """Cross-worker invalidation bus state and per-topic delivery lag for this worker"""
+    stats = invalidation_metrics.snapshot()
+    if reset:
+        invalidation_metrics.reset()
+    return stats
+
+@app.get("/api/metrics/live", response_model=LiveStats)
+def get_live_metrics(current_user: User = Depends(require_role([UserRole.ADMIN]))):
+    """Live update connections and delivery on this worker"""
+    return live_broadcaster.snapshot()
+
 @app.get("/")
 def root():
     return {"message": "ISMS Platform API", "version": "1.0.0"}
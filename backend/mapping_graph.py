@@ -0,0 +1,246 @@
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from invalidation import CATALOG, CONTROLS, RISKS, subscribe
+from models import Control, ControlStatus, Requirement, Risk, control_requirement, control_risk
+
+
+def _ids(values: Iterable[int]) -> array:
+    return array("l", sorted(set(values)))
+
+
+def _without(ids: array, value: int) -> array:
+    return array("l", (i for i in ids if i != value))
+
+
+def _with(ids: array, value: int) -> array:
+    return ids if value in ids else _ids(list(ids) + [value])
+
+
+class RequirementNode:
+    __slots__ = ("id", "framework_id", "code", "controls")
+
+    def __init__(self, id: int, framework_id: int, code: str):
+        self.id = id
+        self.framework_id = framework_id
+        self.code = code
+        self.controls = array("l")
+
+
+class ControlNode:
+    __slots__ = ("id", "implemented", "requirements", "risks")
+
+    def __init__(self, id: int, implemented: bool):
+        self.id = id
+        self.implemented = implemented
+        self.requirements = array("l")
+        self.risks = array("l")
+
+
+class RiskNode:
+    __slots__ = ("id", "controls")
+
+    def __init__(self, id: int):
+        self.id = id
+        self.controls = array("l")
+
+
+class MappingGraph:
+    """In-process index of the requirement - control - risk mapping tables
+
+    Nodes hold sorted integer-id adjacency arrays in both directions. The graph
+    is loaded on first use and then kept current by the write endpoints;
+    updates before the first load are no-ops.
+    """
+
+    def __init__(self):
+        self._requirements: Dict[int, RequirementNode] = {}
+        self._controls: Dict[int, ControlNode] = {}
+        self._risks: Dict[int, RiskNode] = {}
+        self._framework_requirements: Dict[int, array] = {}
+        self._lock = threading.RLock()
+        self.built = False
+
+    # ---- loading ----
+
+    def build(self, db: Session):
+        with self._lock:
+            if self.built:
+                return
+            self._load(db)
+            self.built = True
+
+    def invalidate(self):
+        """Drop the graph; the next read reloads it"""
+        with self._lock:
+            self.built = False
+
+    def reload(self, db: Session):
+        with self._lock:
+            self._load(db)
+            self.built = True
+
+    def _load(self, db: Session):
+        requirements = {
+            r.id: RequirementNode(r.id, r.framework_id, r.code)
+            for r in db.query(Requirement.id, Requirement.framework_id, Requirement.code)
+        }
+        controls = {
+            c.id: ControlNode(c.id, c.status == ControlStatus.IMPLEMENTED)
+            for c in db.query(Control.id, Control.status)
+        }
+        risks = {r.id: RiskNode(r.id) for r in db.query(Risk.id)}
+
+        by_framework: Dict[int, List[int]] = {}
+        for node in requirements.values():
+            by_framework.setdefault(node.framework_id, []).append(node.id)
+
+        control_reqs: Dict[int, List[int]] = {}
+        req_controls: Dict[int, List[int]] = {}
+        for control_id, requirement_id in db.query(control_requirement.c.control_id, control_requirement.c.requirement_id):
+            if control_id in controls and requirement_id in requirements:
+                control_reqs.setdefault(control_id, []).append(requirement_id)
+                req_controls.setdefault(requirement_id, []).append(control_id)
+        control_risks: Dict[int, List[int]] = {}
+        risk_controls: Dict[int, List[int]] = {}
+        for control_id, risk_id in db.query(control_risk.c.control_id, control_risk.c.risk_id):
+            if control_id in controls and risk_id in risks:
+                control_risks.setdefault(control_id, []).append(risk_id)
+                risk_controls.setdefault(risk_id, []).append(control_id)
+
+        for control_id, node in controls.items():
+            node.requirements = _ids(control_reqs.get(control_id, ()))
+            node.risks = _ids(control_risks.get(control_id, ()))
+        for requirement_id, node in requirements.items():
+            node.controls = _ids(req_controls.get(requirement_id, ()))
+        for risk_id, node in risks.items():
+            node.controls = _ids(risk_controls.get(risk_id, ()))
+
+        self._requirements = requirements
+        self._controls = controls
+        self._risks = risks
+        self._framework_requirements = {f: _ids(ids) for f, ids in by_framework.items()}
+
+    # ---- incremental updates ----
+
+    def upsert_requirement(self, requirement_id: int, framework_id: int, code: str):
+        with self._lock:
+            if not self.built:
+                return
+            node = self._requirements.get(requirement_id)
+            if node is None:
+                node = self._requirements[requirement_id] = RequirementNode(requirement_id, framework_id, code)
+            elif node.framework_id != framework_id:
+                self._framework_requirements[node.framework_id] = _without(
+                    self._framework_requirements.get(node.framework_id, array("l")), requirement_id
+                )
+            node.framework_id = framework_id
+            node.code = code
+            self._framework_requirements[framework_id] = _with(
+                self._framework_requirements.get(framework_id, array("l")), requirement_id
+            )
+
+    def upsert_control(self, control_id: int, status: ControlStatus, requirement_ids: Optional[Iterable[int]] = None):
+        """Add or update a control; requirement_ids, when given, replaces its mappings"""
+        with self._lock:
+            if not self.built:
+                return
+            node = self._controls.get(control_id)
+            if node is None:
+                node = self._controls[control_id] = ControlNode(control_id, False)
+            node.implemented = status == ControlStatus.IMPLEMENTED
+            if requirement_ids is None:
+                return
+            for requirement_id in node.requirements:
+                requirement = self._requirements.get(requirement_id)
+                if requirement is not None:
+                    requirement.controls = _without(requirement.controls, control_id)
+            node.requirements = _ids(r for r in requirement_ids if r in self._requirements)
+            for requirement_id in node.requirements:
+                requirement = self._requirements[requirement_id]
+                requirement.controls = _with(requirement.controls, control_id)
+
+    def remove_control(self, control_id: int):
+        with self._lock:
+            node = self._controls.pop(control_id, None)
+            if node is None:
+                return
+            for requirement_id in node.requirements:
+                requirement = self._requirements.get(requirement_id)
+                if requirement is not None:
+                    requirement.controls = _without(requirement.controls, control_id)
+            for risk_id in node.risks:
+                risk = self._risks.get(risk_id)
+                if risk is not None:
+                    risk.controls = _without(risk.controls, control_id)
+
+    def upsert_risk(self, risk_id: int, control_ids: Optional[Iterable[int]] = None):
+        """Add a risk; control_ids, when given, replaces its mitigating controls"""
+        with self._lock:
+            if not self.built:
+                return
+            node = self._risks.get(risk_id)
+            if node is None:
+                node = self._risks[risk_id] = RiskNode(risk_id)
+            if control_ids is None:
+                return
+            for control_id in node.controls:
+                control = self._controls.get(control_id)
+                if control is not None:
+                    control.risks = _without(control.risks, risk_id)
+            node.controls = _ids(c for c in control_ids if c in self._controls)
+            for control_id in node.controls:
+                control = self._controls[control_id]
+                control.risks = _with(control.risks, risk_id)
+
+    def remove_risk(self, risk_id: int):
+        with self._lock:
+            node = self._risks.pop(risk_id, None)
+            if node is None:
+                return
+            for control_id in node.controls:
+                control = self._controls.get(control_id)
+                if control is not None:
+                    control.risks = _without(control.risks, risk_id)
+
+    # ---- queries ----
+
+    def covered_requirements(self, source_framework_id: int, target_framework_id: int, code_prefix: str = "",
+                             implemented_only: bool = False) -> Tuple[List[int], List[RequirementNode]]:
+        """Controls mapped to source requirements (matching code_prefix) and the target requirements they map to"""
+        with self._lock:
+            control_ids = set()
+            for requirement_id in self._framework_requirements.get(source_framework_id, ()):
+                requirement = self._requirements[requirement_id]
+                if requirement.code.startswith(code_prefix):
+                    control_ids.update(requirement.controls)
+            if implemented_only:
+                control_ids = {c for c in control_ids if self._controls[c].implemented}
+            covered = set()
+            for control_id in control_ids:
+                for requirement_id in self._controls[control_id].requirements:
+                    if self._requirements[requirement_id].framework_id == target_framework_id:
+                        covered.add(requirement_id)
+            return sorted(control_ids), [self._requirements[r] for r in sorted(covered)]
+
+    def control_impact(self, control_id: int) -> Optional[Tuple[List[int], List[int]]]:
+        """(risks mitigated by the control, those left with no other implemented control if it fails)"""
+        with self._lock:
+            node = self._controls.get(control_id)
+            if node is None:
+                return None
+            unmitigated = [
+                risk_id for risk_id in node.risks
+                if not any(c != control_id and self._controls[c].implemented for c in self._risks[risk_id].controls)
+            ]
+            return list(node.risks), unmitigated
+
+
+mapping_graph = MappingGraph()
+
+# This worker's writes update the graph incrementally; other workers' writes reload it
+for _topic in (CATALOG, CONTROLS, RISKS):
+    subscribe(_topic, lambda event: mapping_graph.invalidate(), local=False)
@@ -1,8 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, Enum as SQLEnum, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Boolean, Float, Enum as SQLEnum, Table, Index, JSON, literal_column, event, DDL
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from database import Base
 import enum
+import hashlib
 
 # Enums
 class UserRole(str, enum.Enum):
@@ -30,12 +32,31 @@ class RiskLevel(str, enum.Enum):
     HIGH = "high"
     CRITICAL = "critical"
 
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+# Trigram indexes back the typo-tolerant unified search (PostgreSQL only)
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+def trigram_index(name, column_name):
+    return Index(name, column_name, postgresql_using="gin", postgresql_ops={column_name: "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+
 # Association tables for many-to-many relationships
 control_requirement = Table(
     'control_requirement',
     Base.metadata,
     Column('control_id', Integer, ForeignKey('controls.id', ondelete='CASCADE')),
-    Column('requirement_id', Integer, ForeignKey('requirements.id', ondelete='CASCADE'))
+    Column('requirement_id', Integer, ForeignKey('requirements.id', ondelete='CASCADE')),
+    # Both directions are walked by gap analysis anti-joins
+    Index('ix_control_requirement_requirement_control', 'requirement_id', 'control_id'),
+    Index('ix_control_requirement_control', 'control_id')
 )
 
 control_risk = Table(
@@ -82,11 +103,17 @@ class Requirement(Base):
     __tablename__ = "requirements"
 
     id = Column(Integer, primary_key=True, index=True)
-    framework_id = Column(Integer, ForeignKey("frameworks.id", ondelete="CASCADE"), nullable=False)
+    framework_id = Column(Integer, ForeignKey("frameworks.id", ondelete="CASCADE"), nullable=False, index=True)
     code = Column(String, nullable=False)  # e.g., "CC6.2", "A.9.4.2"
     title = Column(String, nullable=False)
     description = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        trigram_index("ix_requirements_code_trgm", "code"),
+        trigram_index("ix_requirements_title_trgm", "title"),
+    )
 
     # Relationships
     framework = relationship("Framework", back_populates="requirements")
@@ -106,29 +133,77 @@ class Control(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        trigram_index("ix_controls_title_trgm", "title"),
+        trigram_index("ix_controls_description_trgm", "description"),
+        # Time-window scans of the monitoring jobs (see monitoring.py)
+        Index("ix_controls_last_checked", "last_checked"),
+        Index("ix_controls_created_at", "created_at"),
+        Index("ix_controls_updated_at", "updated_at"),
+    )
+
     # Relationships
     owner = relationship("User", back_populates="owned_controls", foreign_keys=[owner_id])
     requirements = relationship("Requirement", secondary=control_requirement, back_populates="controls")
     evidence = relationship("Evidence", back_populates="control", cascade="all, delete-orphan")
     risks = relationship("Risk", secondary=control_risk, back_populates="controls")
 
+# Weighted full-text document for evidence search (PostgreSQL only). The GIN
+# index on evidence is built on this exact expression, so queries must reuse it.
+def evidence_search_vector(title, description, content_text, extracted_text):
+    weighted = [
+        func.setweight(func.to_tsvector(literal_column("'english'::regconfig"), func.coalesce(column, literal_column("''"))), literal_column(f"'{weight}'"))
+        for column, weight in ((title, "A"), (description, "B"), (content_text, "C"), (extracted_text, "D"))
+    ]
+    vector = weighted[0]
+    for part in weighted[1:]:
+        vector = vector.op("||")(part)
+    return vector
+
 # Evidence Model
 class Evidence(Base):
     __tablename__ = "evidence"
 
     id = Column(Integer, primary_key=True, index=True)
-    control_id = Column(Integer, ForeignKey("controls.id", ondelete="CASCADE"), nullable=False)
+    control_id = Column(Integer, ForeignKey("controls.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String, nullable=False)
     description = Column(Text)
     file_path = Column(String)  # Path to uploaded file
     file_name = Column(String)
     content_text = Column(Text)  # For text-based evidence
+    extracted_text = Column(Text)  # Populated from the uploaded file by the extraction worker
+    page_count = Column(Integer)
     uploaded_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index(
+            "ix_evidence_search_vector",
+            evidence_search_vector(title, description, content_text, extracted_text),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
     # Relationships
     control = relationship("Control", back_populates="evidence")
     uploaded_by = relationship("User")
+    extraction_jobs = relationship("ExtractionJob", back_populates="evidence", cascade="all, delete-orphan")
+
+# Extraction Job Model (text extraction queue for uploaded evidence files)
+class ExtractionJob(Base):
+    __tablename__ = "extraction_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    evidence_id = Column(Integer, ForeignKey("evidence.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.PENDING, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Relationships
+    evidence = relationship("Evidence", back_populates="extraction_jobs")
 
 # Policy Model
 class Policy(Base):
@@ -137,15 +212,29 @@ class Policy(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
+    content_length = Column(Integer)  # Kept in sync with content so list views never read it
+    content_hash = Column(String(64))  # SHA-256 hex of content
     version = Column(String, default="1.0")
     is_published = Column(Boolean, default=False)
     published_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        trigram_index("ix_policies_title_trgm", "title"),
+        trigram_index("ix_policies_content_trgm", "content"),
+    )
+
     # Relationships
     acknowledgments = relationship("PolicyAcknowledgment", back_populates="policy", cascade="all, delete-orphan")
     versions = relationship("PolicyVersion", back_populates="policy", cascade="all, delete-orphan")
+    renderings = relationship("PolicyRendering", back_populates="policy", cascade="all, delete-orphan")
+
+    @validates("content")
+    def _track_content(self, key, content):
+        self.content_length = len(content) if content is not None else None
+        self.content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest() if content is not None else None
+        return content
 
 # Policy Version Model (for version history)
 class PolicyVersion(Base):
@@ -154,12 +243,39 @@ class PolicyVersion(Base):
     id = Column(Integer, primary_key=True, index=True)
     policy_id = Column(Integer, ForeignKey("policies.id", ondelete="CASCADE"), nullable=False)
     version = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
+    revision = Column(Integer)  # 1-based position in the policy's history
+    is_snapshot = Column(Boolean, nullable=False, default=True)
+    content = Column(Text)  # Full text, stored on snapshot revisions only
+    delta = Column(Text)  # Line delta from the previous revision (see policy_history.py)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_policy_versions_policy_revision", "policy_id", "revision", unique=True),
+    )
+
     # Relationships
     policy = relationship("Policy", back_populates="versions")
 
+# Policy Rendering Model (sanitized HTML of one policy content revision)
+class PolicyRendering(Base):
+    __tablename__ = "policy_renderings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    policy_id = Column(Integer, ForeignKey("policies.id", ondelete="CASCADE"), nullable=False)
+    version = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    html = Column(Text, nullable=False)
+    toc = Column(Text, nullable=False)  # JSON list of {level, id, title, children}
+    render_version = Column(Integer, nullable=False, default=1)  # policy_render.RENDER_VERSION that produced it
+    rendered_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_policy_renderings_policy_hash_version", "policy_id", "content_hash", "render_version", unique=True),
+    )
+
+    # Relationships
+    policy = relationship("Policy", back_populates="renderings")
+
 # Policy Acknowledgment Model
 class PolicyAcknowledgment(Base):
     __tablename__ = "policy_acknowledgments"
@@ -188,28 +304,124 @@ class Risk(Base):
     category = Column(String)
     status = Column(SQLEnum(RiskStatus), nullable=False, default=RiskStatus.IDENTIFIED)
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    # Optional FAIR ranges for quantitative analysis (see risk_quant.py)
+    lef_min = Column(Float)  # Loss events per year
+    lef_mode = Column(Float)
+    lef_max = Column(Float)
+    lm_min = Column(Float)  # Loss magnitude per event
+    lm_mode = Column(Float)
+    lm_max = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        trigram_index("ix_risks_title_trgm", "title"),
+        trigram_index("ix_risks_category_trgm", "category"),
+        Index("ix_risks_likelihood_impact", "likelihood", "impact"),  # heatmap GROUP BY
+        # History is keyed by risk id, so ids of deleted risks must not be reused
+        {"sqlite_autoincrement": True},
+    )
+
     # Relationships
     owner = relationship("User", back_populates="owned_risks", foreign_keys=[owner_id])
     controls = relationship("Control", secondary=control_risk, back_populates="risks")
-    history = relationship("RiskHistory", back_populates="risk", cascade="all, delete-orphan")
+    # History outlives the risk so past register states can be reconstructed
+    history = relationship("RiskHistory", back_populates="risk", passive_deletes=True)
 
 # Risk History Model (audit trail for risk changes)
 class RiskHistory(Base):
     __tablename__ = "risk_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    risk_id = Column(Integer, ForeignKey("risks.id", ondelete="CASCADE"), nullable=False)
+    risk_id = Column(Integer, ForeignKey("risks.id", ondelete="SET NULL"))
+    risk_ref = Column(Integer, index=True)  # Same id as risk_id, kept after the risk is deleted
     changed_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    action = Column(String)  # created, updated, rescored, deleted; NULL on rows written before field diffs
+    changes = Column(JSON().with_variant(JSONB(), "postgresql"))  # {field: {old, new}, controls: {added, removed}}
     change_description = Column(Text, nullable=False)
-    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # Relationships
     risk = relationship("Risk", back_populates="history")
     changed_by = relationship("User")
 
+# Risk Simulation Model (cached Monte Carlo results keyed by a hash of their inputs)
+class RiskSimulation(Base):
+    __tablename__ = "risk_simulations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, nullable=False)
+    scope = Column(String, nullable=False)  # risk, register
+    risk_id = Column(Integer, ForeignKey("risks.id", ondelete="CASCADE"), index=True)
+    result = Column(Text, nullable=False)  # JSON summary
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Risk Register Snapshot Model (full register state for as_of reconstruction; see risk_history.py)
+class RiskRegisterSnapshot(Base):
+    __tablename__ = "risk_register_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    taken_at = Column(DateTime(timezone=True), nullable=False, index=True)  # State covers history up to this time
+    risk_count = Column(Integer, nullable=False)
+    data = Column(Text, nullable=False)  # JSON {risk_id: state}
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# Risk Scoring Matrix Model (one active row; see risk_scoring.py)
+class RiskScoringMatrix(Base):
+    __tablename__ = "risk_scoring_matrices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    scores = Column(Text, nullable=False)  # JSON 5x5 list indexed [likelihood - 1][impact - 1]
+    medium_threshold = Column(Integer, nullable=False)
+    high_threshold = Column(Integer, nullable=False)
+    critical_threshold = Column(Integer, nullable=False)
+    is_active = Column(Boolean, nullable=False, default=False, index=True)
+    created_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    rescored_at = Column(DateTime(timezone=True))  # Last completed bulk rescore
+
+    # Relationships
+    created_by = relationship("User")
+
+# Posture Snapshot Models (daily rows plus week/month rollups; see posture.py)
+class PostureSnapshot(Base):
+    __tablename__ = "posture_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    period = Column(String, nullable=False)  # day, week, month
+    period_start = Column(Date, nullable=False)
+    samples = Column(Integer, nullable=False, default=1)  # Daily rows averaged into a rollup
+    total_risks = Column(Float, nullable=False, default=0)
+    low_risks = Column(Float, nullable=False, default=0)
+    medium_risks = Column(Float, nullable=False, default=0)
+    high_risks = Column(Float, nullable=False, default=0)
+    critical_risks = Column(Float, nullable=False, default=0)
+    controls_lacking_evidence = Column(Float, nullable=False, default=0)
+    active_alerts = Column(Float, nullable=False, default=0)
+    acknowledgment_rate = Column(Float, nullable=False, default=0)  # percent
+    captured_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_posture_snapshots_period_start", "period", "period_start", unique=True),
+    )
+
+class FrameworkPostureSnapshot(Base):
+    __tablename__ = "framework_posture_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    framework_id = Column(Integer, ForeignKey("frameworks.id", ondelete="CASCADE"), nullable=False)
+    period = Column(String, nullable=False)
+    period_start = Column(Date, nullable=False)
+    samples = Column(Integer, nullable=False, default=1)
+    total_controls = Column(Float, nullable=False, default=0)
+    implemented_controls = Column(Float, nullable=False, default=0)
+    compliance_percentage = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_framework_posture_period_start", "period", "period_start", "framework_id", unique=True),
+    )
+
 # Alert/Notification Model
 class Alert(Base):
     __tablename__ = "alerts"
@@ -219,9 +431,35 @@ class Alert(Base):
     description = Column(Text)
     severity = Column(String, default="info")  # info, warning, critical
     is_resolved = Column(Boolean, default=False)
+    alert_type = Column(String, index=True)  # Set by monitoring jobs: stale_control, failed_control, ...
     related_control_id = Column(Integer, ForeignKey("controls.id", ondelete="CASCADE"))
+    related_policy_id = Column(Integer, ForeignKey("policies.id", ondelete="CASCADE"))
+    # Monitoring alerts with the same fingerprint coalesce while unresolved
+    fingerprint = Column(String)
+    occurrences = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen_at = Column(DateTime(timezone=True), server_default=func.now())
     resolved_at = Column(DateTime(timezone=True))
 
+    __table_args__ = (
+        Index("uq_alerts_open_fingerprint", "fingerprint", unique=True,
+              postgresql_where=(is_resolved == False), sqlite_where=(is_resolved == False)),
+        Index("ix_alerts_last_seen_at", "last_seen_at"),
+    )
+
     # Relationships
     related_control = relationship("Control")
+
+# Monitoring job state: a lease so one worker runs each job, plus its high-water marks
+class MonitorJob(Base):
+    __tablename__ = "monitor_jobs"
+
+    name = Column(String, primary_key=True)
+    lease_holder = Column(String)
+    lease_expires_at = Column(DateTime(timezone=True))
+    next_run_at = Column(DateTime(timezone=True))
+    state = Column(Text)  # JSON, job-specific
+    last_run_at = Column(DateTime(timezone=True))
+    last_alerts = Column(Integer, nullable=False, default=0)
+    last_resolved = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
@@ -0,0 +1,402 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import and_, exists, func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from invalidation import ALERTS, publish
+from risk_history import SNAPSHOT_INTERVAL_SECONDS, take_snapshot
+from models import (
+    Alert, Control, ControlStatus, Evidence, MonitorJob, Policy, PolicyAcknowledgment, User, UserRole,
+)
+
+logger = logging.getLogger("isms")
+
+TICK_SECONDS = int(os.getenv("MONITOR_TICK_SECONDS", "60"))  # 0 disables the scheduler
+CONTROL_SCAN_INTERVAL_SECONDS = int(os.getenv("MONITOR_CONTROL_INTERVAL_SECONDS", "300"))
+ACK_SCAN_INTERVAL_SECONDS = int(os.getenv("MONITOR_ACK_INTERVAL_SECONDS", "3600"))
+LEASE_SECONDS = int(os.getenv("MONITOR_LEASE_SECONDS", "600"))
+BATCH_SIZE = int(os.getenv("MONITOR_BATCH_SIZE", "500"))
+STALE_AFTER_DAYS = int(os.getenv("MONITOR_STALE_AFTER_DAYS", "90"))
+EVIDENCE_GRACE_DAYS = int(os.getenv("MONITOR_EVIDENCE_GRACE_DAYS", "30"))
+ACK_DROP_POINTS = float(os.getenv("MONITOR_ACK_DROP_POINTS", "10"))
+# Windows end this far behind now() so rows from transactions still in
+# flight (timestamped at their start) are not skipped by the high-water mark
+SCAN_LAG_SECONDS = int(os.getenv("MONITOR_SCAN_LAG_SECONDS", "60"))
+
+HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def alert_fingerprint(alert_type: str, control_id: Optional[int] = None, policy_id: Optional[int] = None) -> str:
+    return f"{alert_type}:c{control_id or ''}:p{policy_id or ''}"
+
+
+def _upsert_alerts(db: Session, rows: List[dict]) -> Optional[List[int]]:
+    """Insert alerts; a row matching an open alert's fingerprint bumps that alert instead
+
+    Returns the ids written, or None where the dialect cannot return them.
+    """
+    dialect = db.get_bind().dialect
+    if dialect.name not in ("postgresql", "sqlite"):
+        db.execute(insert(Alert), rows)
+        return None
+    stmt = (postgresql.insert if dialect.name == "postgresql" else sqlite.insert)(Alert)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Alert.fingerprint],
+        index_where=Alert.is_resolved == False,
+        set_={
+            "occurrences": Alert.occurrences + stmt.excluded.occurrences,
+            "last_seen_at": stmt.excluded.last_seen_at,
+            "title": stmt.excluded.title,
+            "description": stmt.excluded.description,
+            "severity": stmt.excluded.severity,
+        },
+    )
+    if not dialect.insert_executemany_returning:
+        db.execute(stmt, rows)
+        return None
+    return list(db.scalars(stmt.returning(Alert.id), rows))
+
+
+class JobRun:
+    """One leased run of a job: pending alerts, state and per-batch checkpoints"""
+
+    def __init__(self, db: Session, job: "Job", state: dict, now: datetime):
+        self.db = db
+        self.job = job
+        self.state = state
+        self.now = now
+        self.alerts = 0
+        self.resolved = 0
+        self._pending: Dict[str, dict] = {}  # By fingerprint; one statement may not hit a row twice
+        self._changed: Optional[Set[int]] = set()  # Alert ids to announce; None: unknown
+
+    def alert(self, alert_type: str, title: str, severity: str, description: Optional[str] = None,
+              control_id: Optional[int] = None, policy_id: Optional[int] = None):
+        fingerprint = alert_fingerprint(alert_type, control_id, policy_id)
+        pending = self._pending.get(fingerprint)
+        if pending is not None:
+            pending["occurrences"] += 1
+            return
+        self._pending[fingerprint] = {
+            "alert_type": alert_type,
+            "fingerprint": fingerprint,
+            "title": title,
+            "description": description,
+            "severity": severity,
+            "is_resolved": False,
+            "occurrences": 1,
+            "last_seen_at": self.now,
+            "related_control_id": control_id,
+            "related_policy_id": policy_id,
+        }
+
+    def resolve(self, alert_type: str, cleared):
+        """Resolve open alerts of a type whose condition (a SQL expression on Alert) no longer holds"""
+        stmt = update(Alert).where(Alert.alert_type == alert_type, Alert.is_resolved == False, cleared).values(
+            is_resolved=True, resolved_at=self.now
+        ).execution_options(synchronize_session=False)
+        if self.db.get_bind().dialect.update_returning:
+            ids = list(self.db.scalars(stmt.returning(Alert.id)))
+            self.resolved += len(ids)
+            self._track(ids)
+        else:
+            resolved = self.db.execute(stmt).rowcount
+            self.resolved += resolved
+            if resolved:
+                self._track(None)
+
+    def _track(self, ids: Optional[List[int]]):
+        if ids is None:
+            self._changed = None
+        elif self._changed is not None:
+            self._changed.update(ids)
+
+    def checkpoint(self):
+        """Insert pending alerts and save state in one commit, renewing the lease"""
+        if self._pending:
+            rows = list(self._pending.values())
+            self._track(_upsert_alerts(self.db, rows))
+            self.alerts += sum(row["occurrences"] for row in rows)
+            self._pending = {}
+        renewed = self.db.execute(
+            update(MonitorJob).where(MonitorJob.name == self.job.name, MonitorJob.lease_holder == HOLDER).values(
+                state=json.dumps(self.state),
+                lease_expires_at=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS),
+            )
+        ).rowcount
+        if not renewed:
+            self.db.rollback()
+            raise LeaseLost(self.job.name)
+        self.db.commit()
+        if self._changed is None or self._changed:
+            publish(self.db, ALERTS, self._changed)
+            self._changed = set()
+
+
+# ============ Time-window scans ============
+
+def _window_scan(run: JobRun, upper: datetime, in_window: Callable, handle: Callable):
+    """Visit rows whose timestamps fall in (previous upper, upper], in id order
+
+    The window's start is the high-water mark of the last completed scan, so
+    each run reads only what changed (or came of age) since then. Progress
+    within a window is checkpointed by id, so an interrupted run resumes.
+    """
+    state = run.state
+    if state.get("pending_upper") is None:
+        state["pending_upper"] = upper.isoformat()
+        state["last_id"] = 0
+    lower = datetime.fromisoformat(state["upper"]) if state.get("upper") else None
+    upper = datetime.fromisoformat(state["pending_upper"])
+
+    while True:
+        rows = run.db.query(Control.id, Control.title).filter(
+            in_window(lower, upper), Control.id > state["last_id"]
+        ).order_by(Control.id).limit(BATCH_SIZE).all()
+        for row in rows:
+            handle(run, row)
+        if rows:
+            state["last_id"] = rows[-1].id
+        if len(rows) < BATCH_SIZE:
+            state["upper"] = state.pop("pending_upper")
+            state.pop("last_id", None)
+            run.checkpoint()
+            return
+        run.checkpoint()
+
+
+def _between(column, lower: Optional[datetime], upper: datetime):
+    return and_(column > lower, column <= upper) if lower is not None else column <= upper
+
+
+def scan_stale_controls(run: JobRun):
+    """Controls whose last check (or creation, if never checked) passed the staleness age"""
+    def in_window(lower, upper):
+        return or_(
+            _between(Control.last_checked, lower, upper),
+            and_(Control.last_checked == None, _between(Control.created_at, lower, upper)),
+        )
+
+    def handle(run, row):
+        run.alert("stale_control", f"Control not checked in {STALE_AFTER_DAYS} days: {row.title}", "warning",
+                  control_id=row.id)
+
+    cutoff = run.now - timedelta(days=STALE_AFTER_DAYS)
+    run.resolve("stale_control", exists().where(
+        Control.id == Alert.related_control_id, Control.last_checked > cutoff
+    ))
+    _window_scan(run, cutoff, in_window, handle)
+
+
+def scan_failed_controls(run: JobRun):
+    """Controls changed since the last scan that are now FAILED"""
+    def in_window(lower, upper):
+        changed = or_(
+            _between(Control.updated_at, lower, upper),
+            and_(Control.updated_at == None, _between(Control.created_at, lower, upper)),
+        )
+        return and_(changed, Control.status == ControlStatus.FAILED)
+
+    def handle(run, row):
+        run.alert("failed_control", f"Control failed: {row.title}", "critical", control_id=row.id)
+
+    run.resolve("failed_control", exists().where(
+        Control.id == Alert.related_control_id, Control.status != ControlStatus.FAILED
+    ))
+    _window_scan(run, run.now - timedelta(seconds=SCAN_LAG_SECONDS), in_window, handle)
+
+
+def scan_controls_without_evidence(run: JobRun):
+    """Controls past their evidence grace period with no evidence attached"""
+    def in_window(lower, upper):
+        return and_(
+            _between(Control.created_at, lower, upper),
+            ~exists().where(Evidence.control_id == Control.id),
+        )
+
+    def handle(run, row):
+        run.alert("missing_evidence",
+                  f"Control has no evidence {EVIDENCE_GRACE_DAYS} days after creation: {row.title}", "warning",
+                  control_id=row.id)
+
+    run.resolve("missing_evidence", exists().where(Evidence.control_id == Alert.related_control_id))
+    _window_scan(run, run.now - timedelta(days=EVIDENCE_GRACE_DAYS), in_window, handle)
+
+
+def acknowledgment_rates(db: Session) -> Dict[int, tuple]:
+    """{policy id: (title, % of active employees who acknowledged the current version)}"""
+    employees = db.query(User.id).filter(User.role == UserRole.EMPLOYEE, User.is_active == True)
+    expected = employees.count()
+    counts = dict(db.query(PolicyAcknowledgment.policy_id, func.count(func.distinct(PolicyAcknowledgment.user_id))).join(
+        Policy, Policy.id == PolicyAcknowledgment.policy_id
+    ).filter(
+        Policy.is_published == True,
+        PolicyAcknowledgment.policy_version == Policy.version,
+        PolicyAcknowledgment.user_id.in_(employees),
+    ).group_by(PolicyAcknowledgment.policy_id).all())
+    return {
+        policy_id: (title, round(counts.get(policy_id, 0) / expected * 100, 2) if expected else 0.0)
+        for policy_id, title in db.query(Policy.id, Policy.title).filter(Policy.is_published == True)
+    }
+
+
+def scan_acknowledgment_rates(run: JobRun):
+    """Alert when a published policy's acknowledgment rate fell since the previous run
+
+    The alert resolves once the rate is back to where it was before the drop,
+    or the policy is no longer published.
+    """
+    previous = run.state.get("rates", {})
+    dropped_from = run.state.get("dropped_from", {})
+    rates = acknowledgment_rates(run.db)
+    for policy_id, (title, rate) in rates.items():
+        key = str(policy_id)
+        before = previous.get(key)
+        if before is not None and before - rate >= ACK_DROP_POINTS:
+            run.alert("ack_rate_drop", f"Acknowledgment rate for '{title}' fell from {before}% to {rate}%", "warning",
+                      policy_id=policy_id)
+            dropped_from[key] = max(before, dropped_from.get(key, 0))
+    recovered = [int(key) for key, level in dropped_from.items()
+                 if int(key) not in rates or rates[int(key)][1] >= level]
+    if recovered:
+        run.resolve("ack_rate_drop", Alert.related_policy_id.in_(recovered))
+    run.state["rates"] = {str(policy_id): rate for policy_id, (_, rate) in rates.items()}
+    run.state["dropped_from"] = {key: level for key, level in dropped_from.items() if int(key) not in recovered}
+    run.checkpoint()
+
+
+def snapshot_risk_register(run: JobRun):
+    snapshot = take_snapshot(run.db)
+    run.state["taken_at"] = snapshot.taken_at.isoformat()
+    run.state["risk_count"] = snapshot.risk_count
+    run.checkpoint()
+
+
+# ============ Scheduler ============
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    interval_seconds: int
+    scan: Callable[[JobRun], None]
+
+
+JOBS = [
+    Job("stale_controls", CONTROL_SCAN_INTERVAL_SECONDS, scan_stale_controls),
+    Job("failed_controls", CONTROL_SCAN_INTERVAL_SECONDS, scan_failed_controls),
+    Job("controls_without_evidence", CONTROL_SCAN_INTERVAL_SECONDS, scan_controls_without_evidence),
+    Job("acknowledgment_rates", ACK_SCAN_INTERVAL_SECONDS, scan_acknowledgment_rates),
+]
+if SNAPSHOT_INTERVAL_SECONDS > 0:
+    JOBS.append(Job("risk_register_snapshot", SNAPSHOT_INTERVAL_SECONDS, snapshot_risk_register))
+JOBS_BY_NAME = {job.name: job for job in JOBS}
+
+
+def _acquire(db: Session, job: Job, now: datetime, force: bool) -> bool:
+    """Take the job's lease if it is due (or forced) and no live lease is held"""
+    if db.get(MonitorJob, job.name) is None:
+        db.add(MonitorJob(name=job.name))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # Another worker registered it first
+    conditions = [MonitorJob.name == job.name,
+                  or_(MonitorJob.lease_expires_at == None, MonitorJob.lease_expires_at < now)]
+    if not force:
+        conditions.append(or_(MonitorJob.next_run_at == None, MonitorJob.next_run_at <= now))
+    acquired = db.execute(
+        update(MonitorJob).where(*conditions).values(
+            lease_holder=HOLDER, lease_expires_at=now + timedelta(seconds=LEASE_SECONDS)
+        )
+    ).rowcount == 1
+    db.commit()
+    return acquired
+
+
+def run_job(db: Session, job: Job, force: bool = False) -> Optional[JobRun]:
+    """Run the job under its lease; None if it was not due or another worker holds it"""
+    now = datetime.utcnow()
+    if not _acquire(db, job, now, force):
+        return None
+    row = db.get(MonitorJob, job.name)
+    run = JobRun(db, job, json.loads(row.state) if row.state else {}, now)
+    error = None
+    try:
+        job.scan(run)
+    except LeaseLost:
+        logger.warning("Monitoring job %s lost its lease", job.name)
+        return run
+    except Exception as e:
+        db.rollback()
+        logger.exception("Monitoring job %s failed", job.name)
+        error = str(e)
+    db.execute(update(MonitorJob).where(MonitorJob.name == job.name, MonitorJob.lease_holder == HOLDER).values(
+        lease_holder=None,
+        lease_expires_at=None,
+        next_run_at=now + timedelta(seconds=job.interval_seconds),
+        last_run_at=now,
+        last_alerts=run.alerts,
+        last_resolved=run.resolved,
+        last_error=error,
+    ))
+    db.commit()
+    return run
+
+
+def run_due_jobs(session_factory=SessionLocal) -> Dict[str, tuple]:
+    """{job name: (alerts, resolved)} for the jobs that ran"""
+    results = {}
+    for job in JOBS:
+        db = session_factory()
+        try:
+            run = run_job(db, job)
+            if run is not None:
+                results[job.name] = (run.alerts, run.resolved)
+        finally:
+            db.close()
+    return results
+
+
+async def monitor_loop():
+    while True:
+        try:
+            results = await asyncio.to_thread(run_due_jobs)
+            if any(any(counts) for counts in results.values()):
+                logger.info("Monitoring (alerts, resolved): %s", results)
+        except Exception:
+            logger.exception("Monitoring cycle failed")
+        await asyncio.sleep(TICK_SECONDS)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run monitoring jobs once")
+    parser.add_argument("jobs", nargs="*", help=f"Any of {', '.join(JOBS_BY_NAME)} (default: all)")
+    args = parser.parse_args()
+    unknown = [name for name in args.jobs if name not in JOBS_BY_NAME]
+    if unknown:
+        parser.error(f"unknown jobs: {', '.join(unknown)}")
+
+    db = SessionLocal()
+    try:
+        for name in args.jobs or list(JOBS_BY_NAME):
+            run = run_job(db, JOBS_BY_NAME[name], force=True)
+            print(name, "skipped (leased elsewhere)" if run is None else f"alerts={run.alerts} resolved={run.resolved}")
+    finally:
+        db.close()
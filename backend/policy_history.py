@@ -0,0 +1,167 @@
+import difflib
+import json
+import os
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import PolicyVersion
+
+# Every Nth revision stores the full content, so reconstructing any revision
+# replays at most N-1 deltas.
+SNAPSHOT_INTERVAL = int(os.getenv("POLICY_SNAPSHOT_INTERVAL", "10"))
+
+
+# ============ Line Deltas ============
+# A delta is a JSON list of ops applied to the previous revision's lines:
+#   {"c": [i1, i2]}  copy base lines i1..i2
+#   {"i": [lines]}   insert new lines
+# Base lines not covered by a copy are deleted.
+
+def _lines(text: str) -> List[str]:
+    return text.splitlines(keepends=True)
+
+
+def encode_delta(base: str, target: str) -> str:
+    base_lines, target_lines = _lines(base), _lines(target)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append({"c": [i1, i2]})
+        elif tag in ("replace", "insert"):
+            ops.append({"i": target_lines[j1:j2]})
+    return json.dumps(ops, separators=(",", ":"))
+
+
+def apply_delta(base: str, delta: str) -> str:
+    base_lines = _lines(base)
+    out = []
+    for op in json.loads(delta):
+        if "c" in op:
+            i1, i2 = op["c"]
+            out.extend(base_lines[i1:i2])
+        else:
+            out.extend(op["i"])
+    return "".join(out)
+
+
+def delta_hunks(base: str, delta: str) -> List[dict]:
+    """Turn a stored delta into change hunks without re-diffing"""
+    base_lines = _lines(base)
+    hunks = []
+    cursor = 0
+    hunk = None
+
+    def open_hunk():
+        nonlocal hunk
+        if hunk is None:
+            hunk = {"base_start": cursor + 1, "removed": [], "added": []}
+        return hunk
+
+    for op in json.loads(delta):
+        if "c" in op:
+            i1, i2 = op["c"]
+            if i1 > cursor:
+                open_hunk()["removed"].extend(base_lines[cursor:i1])
+            if hunk is not None:
+                hunks.append(hunk)
+                hunk = None
+            cursor = i2
+        else:
+            open_hunk()["added"].extend(op["i"])
+    if cursor < len(base_lines):
+        open_hunk()["removed"].extend(base_lines[cursor:])
+    if hunk is not None:
+        hunks.append(hunk)
+    return hunks
+
+
+# ============ Version Chain ============
+
+def reconstruct(db: Session, policy_id: int, revision: int) -> Optional[str]:
+    """Content of a stored revision: nearest snapshot plus forward deltas"""
+    snapshot_rev = db.query(func.max(PolicyVersion.revision)).filter(
+        PolicyVersion.policy_id == policy_id,
+        PolicyVersion.revision <= revision,
+        PolicyVersion.is_snapshot == True
+    ).scalar()
+    if snapshot_rev is None:
+        return None
+
+    rows = db.query(PolicyVersion.revision, PolicyVersion.content, PolicyVersion.delta).filter(
+        PolicyVersion.policy_id == policy_id,
+        PolicyVersion.revision >= snapshot_rev,
+        PolicyVersion.revision <= revision
+    ).order_by(PolicyVersion.revision).all()
+    if not rows or rows[-1].revision != revision:
+        return None
+
+    content = rows[0].content
+    for row in rows[1:]:
+        content = apply_delta(content, row.delta)
+    return content
+
+
+def _backfill_policy(db: Session, policy_id: int):
+    rows = db.query(PolicyVersion).filter(
+        PolicyVersion.policy_id == policy_id
+    ).order_by(PolicyVersion.revision.is_(None), PolicyVersion.revision, PolicyVersion.id).all()
+
+    # Resolve every row's full text before any row is rewritten
+    contents = [row.content if row.revision is None else reconstruct(db, policy_id, row.revision) for row in rows]
+
+    previous = None
+    for index, (row, content) in enumerate(zip(rows, contents)):
+        revision = index + 1
+        row.revision = revision
+        row.delta = encode_delta(previous, content) if previous is not None else None
+        row.is_snapshot = (revision - 1) % SNAPSHOT_INTERVAL == 0
+        row.content = content if row.is_snapshot else None
+        previous = content
+    db.flush()
+
+
+def append_version(db: Session, policy_id: int, version: str, content: str) -> PolicyVersion:
+    """Record the content a policy is about to replace as the next revision"""
+    # Rows written before delta storage have no revision; convert them first
+    if db.query(PolicyVersion.id).filter(
+        PolicyVersion.policy_id == policy_id, PolicyVersion.revision.is_(None)
+    ).first():
+        _backfill_policy(db, policy_id)
+
+    last_revision = db.query(func.max(PolicyVersion.revision)).filter(
+        PolicyVersion.policy_id == policy_id
+    ).scalar() or 0
+    revision = last_revision + 1
+
+    row = PolicyVersion(policy_id=policy_id, version=version, revision=revision)
+    if last_revision:
+        row.delta = encode_delta(reconstruct(db, policy_id, last_revision), content)
+    row.is_snapshot = (revision - 1) % SNAPSHOT_INTERVAL == 0
+    if row.is_snapshot:
+        row.content = content
+    db.add(row)
+    return row
+
+
+def backfill(db: Session) -> int:
+    """Convert full-content history rows to snapshots plus deltas"""
+    policy_ids = [r[0] for r in db.query(PolicyVersion.policy_id).filter(
+        PolicyVersion.revision.is_(None)
+    ).distinct()]
+    for policy_id in policy_ids:
+        _backfill_policy(db, policy_id)
+        db.commit()
+    return len(policy_ids)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"Converted version history for {backfill(db)} policies")
+    finally:
+        db.close()
@@ -0,0 +1,84 @@
+import html
+import json
+from typing import List, Tuple
+
+import markdown
+import nh3
+
+MARKDOWN_EXTENSIONS = ["toc", "tables", "fenced_code", "sane_lists"]
+
+# Part of the rendering key and of revision URLs (?v=), which are cached as
+# immutable; bump when the output for the same content changes. Stored
+# renderings of older versions are then not served (revisions need re-rendering).
+RENDER_VERSION = 2
+
+# nh3 defaults plus heading ids, which the table of contents links to
+_HEADINGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+ALLOWED_ATTRIBUTES = {tag: set(attrs) for tag, attrs in nh3.ALLOWED_ATTRIBUTES.items()}
+for _tag in _HEADINGS:
+    ALLOWED_ATTRIBUTES.setdefault(_tag, set()).add("id")
+
+
+def _toc_entries(tokens: List[dict]) -> List[dict]:
+    # toc_tokens names are HTML-escaped; the TOC carries plain text
+    return [
+        {"level": t["level"], "id": t["id"], "title": html.unescape(t["name"]), "children": _toc_entries(t["children"])}
+        for t in tokens
+    ]
+
+
+def render_markdown(content: str) -> Tuple[str, List[dict]]:
+    """Render policy markdown to sanitized HTML and a nested table of contents"""
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    rendered = md.convert(content)
+    return nh3.clean(rendered, attributes=ALLOWED_ATTRIBUTES), _toc_entries(md.toc_tokens)
+
+
+def render_policy(db, policy_id: int):
+    """Render and store the HTML for a policy's current content, if not already stored"""
+    from models import Policy, PolicyRendering
+    from sqlalchemy.exc import IntegrityError
+
+    policy = db.query(Policy).filter(Policy.id == policy_id).first()
+    if policy is None:
+        return None
+    def stored():
+        return db.query(PolicyRendering).filter(
+            PolicyRendering.policy_id == policy.id,
+            PolicyRendering.content_hash == policy.content_hash,
+            PolicyRendering.render_version == RENDER_VERSION
+        ).first()
+
+    existing = stored()
+    if existing is not None:
+        return existing
+
+    rendered, toc = render_markdown(policy.content)
+    rendering = PolicyRendering(
+        policy_id=policy.id,
+        version=policy.version,
+        content_hash=policy.content_hash,
+        html=rendered,
+        toc=json.dumps(toc),
+        render_version=RENDER_VERSION
+    )
+    db.add(rendering)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Rendered concurrently by a reader or another worker
+        db.rollback()
+        return stored()
+    db.refresh(rendering)
+    return rendering
+
+
+def render_policy_task(policy_id: int):
+    """Background entry point: runs after publish_policy has responded"""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        render_policy(db, policy_id)
+    finally:
+        db.close()
@@ -0,0 +1,201 @@
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, distinct, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import (
+    Alert, Control, ControlStatus, Evidence, FrameworkPostureSnapshot, Framework, Policy, PolicyAcknowledgment,
+    PostureSnapshot, Requirement, Risk, RiskLevel, User, UserRole, control_requirement,
+)
+
+# Today's row is overwritten on every run, so it tracks the latest state of the day
+SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("POSTURE_SNAPSHOT_INTERVAL_SECONDS", "3600"))
+
+PERIODS = ("day", "week", "month")
+METRICS = [
+    "total_risks", "low_risks", "medium_risks", "high_risks", "critical_risks",
+    "controls_lacking_evidence", "active_alerts", "acknowledgment_rate",
+]
+FRAMEWORK_METRICS = ["total_controls", "implemented_controls", "compliance_percentage"]
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_period_start(start: date, period: str) -> date:
+    if period == "week":
+        return start + timedelta(days=7)
+    if period == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+# ============ Measurement (the only pass over the live tables) ============
+
+def measure(db: Session) -> Tuple[dict, Dict[int, dict]]:
+    levels = dict(db.query(Risk.risk_level, func.count(Risk.id)).group_by(Risk.risk_level).all())
+    metrics = {
+        "total_risks": sum(levels.values()),
+        "low_risks": levels.get(RiskLevel.LOW, 0),
+        "medium_risks": levels.get(RiskLevel.MEDIUM, 0),
+        "high_risks": levels.get(RiskLevel.HIGH, 0),
+        "critical_risks": levels.get(RiskLevel.CRITICAL, 0),
+        "controls_lacking_evidence": db.query(Control.id).outerjoin(Evidence).filter(Evidence.id == None).count(),
+        "active_alerts": db.query(Alert.id).filter(Alert.is_resolved == False).count(),
+    }
+
+    # Share of (active employee, published policy) pairs acknowledged at the current version
+    employees = db.query(User.id).filter(User.role == UserRole.EMPLOYEE, User.is_active == True)
+    published = db.query(Policy.id).filter(Policy.is_published == True).count()
+    expected = employees.count() * published
+    acknowledged = db.query(PolicyAcknowledgment.policy_id, PolicyAcknowledgment.user_id).join(
+        Policy, Policy.id == PolicyAcknowledgment.policy_id
+    ).filter(
+        Policy.is_published == True,
+        PolicyAcknowledgment.policy_version == Policy.version,
+        PolicyAcknowledgment.user_id.in_(employees)
+    ).distinct().count()
+    metrics["acknowledgment_rate"] = round(acknowledged / expected * 100, 2) if expected else 0
+
+    implemented = case((Control.status == ControlStatus.IMPLEMENTED, Control.id))
+    rows = db.query(
+        Requirement.framework_id, func.count(distinct(Control.id)), func.count(distinct(implemented))
+    ).join(control_requirement, control_requirement.c.requirement_id == Requirement.id).join(
+        Control, Control.id == control_requirement.c.control_id
+    ).group_by(Requirement.framework_id).all()
+    counts = {framework_id: (total, done) for framework_id, total, done in rows}
+    frameworks = {}
+    for (framework_id,) in db.query(Framework.id):
+        total, done = counts.get(framework_id, (0, 0))
+        frameworks[framework_id] = {
+            "total_controls": total,
+            "implemented_controls": done,
+            "compliance_percentage": round(done / total * 100, 2) if total else 0,
+        }
+    return metrics, frameworks
+
+
+# ============ Snapshots and rollups ============
+
+def _upsert(db: Session, model, keys: dict, values: dict):
+    row = db.query(model).filter_by(**keys).first()
+    if row is None:
+        db.add(model(**keys, **values))
+    else:
+        for name, value in values.items():
+            setattr(row, name, value)
+
+
+def _roll_up(db: Session, day: date, period: str):
+    """Average the daily rows of the period containing `day` into its rollup row"""
+    start = period_start(day, period)
+    end = next_period_start(start, period)
+
+    row = db.query(
+        func.count(PostureSnapshot.id), *(func.avg(getattr(PostureSnapshot, m)) for m in METRICS)
+    ).filter(
+        PostureSnapshot.period == "day", PostureSnapshot.period_start >= start, PostureSnapshot.period_start < end
+    ).one()
+    if row[0]:
+        values = {m: round(float(v), 2) for m, v in zip(METRICS, row[1:])}
+        _upsert(db, PostureSnapshot, {"period": period, "period_start": start}, {"samples": row[0], **values})
+
+    rows = db.query(
+        FrameworkPostureSnapshot.framework_id, func.count(FrameworkPostureSnapshot.id),
+        *(func.avg(getattr(FrameworkPostureSnapshot, m)) for m in FRAMEWORK_METRICS)
+    ).filter(
+        FrameworkPostureSnapshot.period == "day",
+        FrameworkPostureSnapshot.period_start >= start,
+        FrameworkPostureSnapshot.period_start < end
+    ).group_by(FrameworkPostureSnapshot.framework_id).all()
+    for framework_id, samples, *averages in rows:
+        values = {m: round(float(v), 2) for m, v in zip(FRAMEWORK_METRICS, averages)}
+        _upsert(db, FrameworkPostureSnapshot,
+                {"period": period, "period_start": start, "framework_id": framework_id},
+                {"samples": samples, **values})
+
+
+def record_daily_snapshot(db: Session, day: Optional[date] = None) -> dict:
+    """Measure current posture into today's row and refresh its week and month rollups"""
+    day = day or datetime.utcnow().date()
+    metrics, frameworks = measure(db)
+    for attempt in range(2):
+        try:
+            _upsert(db, PostureSnapshot, {"period": "day", "period_start": day}, {"samples": 1, **metrics})
+            for framework_id, values in frameworks.items():
+                _upsert(db, FrameworkPostureSnapshot,
+                        {"period": "day", "period_start": day, "framework_id": framework_id},
+                        {"samples": 1, **values})
+            db.flush()
+            for period in ("week", "month"):
+                _roll_up(db, day, period)
+            db.commit()
+            break
+        except IntegrityError:
+            # Another worker inserted the same period rows first; update theirs
+            db.rollback()
+            if attempt:
+                raise
+    return metrics
+
+
+def posture_trends(db: Session, start: date, end: date, granularity: str,
+                   framework_id: Optional[int] = None) -> List[dict]:
+    """Stored series for [start, end]; reads snapshot rows only"""
+    first = period_start(start, granularity)
+    rows = db.query(PostureSnapshot).filter(
+        PostureSnapshot.period == granularity,
+        PostureSnapshot.period_start >= first,
+        PostureSnapshot.period_start <= end
+    ).order_by(PostureSnapshot.period_start).all()
+
+    query = db.query(FrameworkPostureSnapshot).filter(
+        FrameworkPostureSnapshot.period == granularity,
+        FrameworkPostureSnapshot.period_start >= first,
+        FrameworkPostureSnapshot.period_start <= end
+    )
+    if framework_id:
+        query = query.filter(FrameworkPostureSnapshot.framework_id == framework_id)
+    by_period: Dict[date, List[dict]] = {}
+    for fw in query.order_by(FrameworkPostureSnapshot.framework_id):
+        by_period.setdefault(fw.period_start, []).append({
+            "framework_id": fw.framework_id,
+            **{m: getattr(fw, m) for m in FRAMEWORK_METRICS},
+        })
+
+    return [
+        {
+            "period_start": row.period_start,
+            "samples": row.samples,
+            **{m: getattr(row, m) for m in METRICS},
+            "frameworks": by_period.get(row.period_start, []),
+        }
+        for row in rows
+    ]
+
+
+def auto_granularity(start: date, end: date) -> str:
+    days = (end - start).days
+    if days > 180:
+        return "month"
+    if days > 45:
+        return "week"
+    return "day"
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(record_daily_snapshot(db))
+    finally:
+        db.close()
@@ -0,0 +1,106 @@
+import hashlib
+from typing import Dict, Iterable, List, Optional, Type
+
+from fastapi import HTTPException, Request, Response
+import orjson
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import func
+from sqlalchemy.orm import Query
+
+# Cache-Control per resource type; everything sits behind auth, so never shared caches
+CACHE_CATALOG = "private, max-age=300"  # frameworks, requirements: change a few times a year
+CACHE_REVALIDATE = "private, no-cache"  # policies, controls: reuse only after a 304
+CACHE_IMMUTABLE = "private, max-age=31536000, immutable"  # content-addressed URLs
+
+
+def parse_fields(fields: Optional[str], schema: Type[BaseModel]) -> Optional[List[str]]:
+    """Validate a comma-separated `fields=` sparse fieldset against a response schema"""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # id is always returned so clients can key the rows
+    return ["id"] + [f for f in dict.fromkeys(requested) if f != "id"]
+
+
+# ============ Serialization ============
+
+_list_adapters: Dict[type, TypeAdapter] = {}
+
+
+def list_response(schema: Type[BaseModel], rows: Iterable, headers: Optional[dict] = None) -> Response:
+    """Validate ORM rows once and serialize them to JSON in pydantic-core
+
+    Returning a Response skips FastAPI's response_model pass, which would
+    otherwise validate and encode every row a second time. Endpoints keep
+    their response_model for the OpenAPI schema.
+    """
+    adapter = _list_adapters.get(schema)
+    if adapter is None:
+        adapter = _list_adapters[schema] = TypeAdapter(List[schema])
+    items = adapter.validate_python(rows, from_attributes=True)
+    return Response(adapter.dump_json(items), media_type="application/json", headers=headers)
+
+
+def sparse_response(
+    query: Query, model, fields: List[str], headers: Optional[dict] = None, constants: Optional[dict] = None
+) -> Response:
+    """SELECT only the requested columns and serialize them as-is
+
+    The query's entity is replaced by the column list, so unrequested columns
+    (e.g. policy content) are never read from the database. Requested fields
+    found in `constants` are not columns; every row gets the given value.
+
+    Also the fast path for full rows of column-only schemas: building ORM
+    objects and validating them from attributes costs several times more
+    than reading tuples (see benchmark_serialization.py). Output matches
+    pydantic's JSON, including "Z" for UTC datetimes.
+    """
+    constants = {f: constants[f] for f in fields if f in constants} if constants else {}
+    columns = [f for f in fields if f not in constants]
+    rows = query.with_entities(*(getattr(model, f) for f in columns)).all()
+    body = orjson.dumps([{**dict(zip(columns, row)), **constants} for row in rows], option=orjson.OPT_UTC_Z)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# ============ Conditional GET ============
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+
+def collection_version(query: Query, model) -> tuple:
+    """(count, max id, max change time) of a collection without loading rows"""
+    changed = model.created_at
+    if hasattr(model, "updated_at"):
+        changed = func.coalesce(model.updated_at, model.created_at)
+    return tuple(query.order_by(None).with_entities(func.count(model.id), func.max(model.id), func.max(changed)).one())
+
+
+def cache_headers(etag: str, cache_control: str) -> dict:
+    # Representations differ by role, so key caches on the credentials
+    return {"ETag": etag, "Cache-Control": cache_control, "Vary": "Authorization"}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Weak comparison of If-None-Match against the current ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,228 @@
+import enum
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from models import Risk, RiskHistory, RiskRegisterSnapshot
+
+# Snapshots stop this far behind now() so transactions still in flight when a
+# snapshot is taken cannot commit history rows into the past it already covers.
+SNAPSHOT_LAG_SECONDS = int(os.getenv("RISK_SNAPSHOT_LAG_SECONDS", "300"))
+SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("RISK_SNAPSHOT_INTERVAL_SECONDS", "86400"))
+
+TRACKED_FIELDS = [
+    "title", "description", "likelihood", "impact", "risk_score", "risk_level", "category", "status", "owner_id",
+    "lef_min", "lef_mode", "lef_max", "lm_min", "lm_mode", "lm_max",
+]
+
+
+class HistoryUnavailable(Exception):
+    """The requested point in time predates structured risk history"""
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def risk_state(risk: Risk) -> dict:
+    """JSON-ready state of a risk as recorded in history and snapshots"""
+    state = {field: _plain(getattr(risk, field)) for field in TRACKED_FIELDS}
+    state["control_ids"] = sorted(c.id for c in risk.controls)
+    state["created_at"] = _plain(risk.created_at)
+    return state
+
+
+def diff_states(before: Optional[dict], after: dict) -> dict:
+    before = before or {}
+    changes = {}
+    for field in TRACKED_FIELDS:
+        old, new = before.get(field), after.get(field)
+        if old != new:
+            changes[field] = {"old": old, "new": new}
+    old_ids, new_ids = set(before.get("control_ids", [])), set(after.get("control_ids", []))
+    if old_ids != new_ids:
+        changes["controls"] = {"added": sorted(new_ids - old_ids), "removed": sorted(old_ids - new_ids)}
+    return changes
+
+
+def describe(action: str, changes: dict) -> str:
+    """Human-readable summary kept in change_description"""
+    if action == "created":
+        return f"Risk created with status: {changes.get('status', {}).get('new')}"
+    if action == "deleted":
+        return "Risk deleted"
+    parts = []
+    for field, change in changes.items():
+        if field == "controls":
+            parts.append(f"controls: +{change['added']} -{change['removed']}")
+        else:
+            parts.append(f"{field}: {change['old']} -> {change['new']}")
+    return "; ".join(parts)
+
+
+def record_change(db: Session, risk: Risk, before: Optional[dict], action: str,
+                  changed_by_id: Optional[int]) -> Optional[RiskHistory]:
+    """Add a history row diffing `before` against the risk's current state
+
+    A deletion records the final state as old values, so reconstruction can
+    bring the risk back when stepping backward over it.
+    """
+    if action == "deleted":
+        final = risk_state(risk)
+        changes = diff_states(final, {})
+        changes["created_at"] = {"old": final["created_at"], "new": None}
+    else:
+        changes = diff_states(before, risk_state(risk))
+    if action == "updated" and not changes:
+        return None
+    history = RiskHistory(
+        risk_id=risk.id,
+        risk_ref=risk.id,
+        changed_by_id=changed_by_id,
+        action=action,
+        changes=changes,
+        change_description=describe(action, changes),
+    )
+    db.add(history)
+    return history
+
+
+# ============ Point-in-time reconstruction ============
+
+def apply_event(register: Dict[int, dict], risk_id: int, action: str, changes: dict, changed_at=None):
+    if action == "deleted":
+        register.pop(risk_id, None)
+        return
+    state = register.get(risk_id)
+    if state is None:
+        state = register[risk_id] = {"control_ids": [], "created_at": _plain(changed_at)}
+    for field, change in changes.items():
+        if field == "controls":
+            ids = set(state.get("control_ids", []))
+            ids.update(change["added"])
+            ids.difference_update(change["removed"])
+            state["control_ids"] = sorted(ids)
+        else:
+            state[field] = change["new"]
+
+
+def undo_event(register: Dict[int, dict], risk_id: int, action: str, changes: dict):
+    """Inverse of apply_event"""
+    if action == "created":
+        register.pop(risk_id, None)
+        return
+    if action == "deleted":
+        if not changes:
+            return  # Recorded before deletions kept their final state
+        state = register[risk_id] = {"control_ids": []}
+    else:
+        state = register.get(risk_id)
+        if state is None:
+            return
+    for field, change in changes.items():
+        if field == "controls":
+            ids = set(state.get("control_ids", []))
+            ids.difference_update(change["added"])
+            ids.update(change["removed"])
+            state["control_ids"] = sorted(ids)
+        else:
+            state[field] = change["old"]
+
+
+def _latest_snapshot(db: Session, as_of: datetime) -> Optional[RiskRegisterSnapshot]:
+    return db.query(RiskRegisterSnapshot).filter(
+        RiskRegisterSnapshot.taken_at <= as_of
+    ).order_by(RiskRegisterSnapshot.taken_at.desc()).first()
+
+
+def _replay(db: Session, register: Dict[int, dict], after: Optional[datetime], until: datetime):
+    query = db.query(
+        RiskHistory.risk_ref, RiskHistory.action, RiskHistory.changes, RiskHistory.changed_at
+    ).filter(RiskHistory.action.isnot(None), RiskHistory.changed_at <= until)
+    if after is not None:
+        query = query.filter(RiskHistory.changed_at > after)
+    for row in query.order_by(RiskHistory.changed_at, RiskHistory.id).yield_per(1000):
+        apply_event(register, row.risk_ref, row.action, row.changes or {}, row.changed_at)
+
+
+def _rewind(db: Session, register: Dict[int, dict], until: datetime):
+    """Undo the structured history after `until`, newest first"""
+    query = db.query(
+        RiskHistory.risk_ref, RiskHistory.action, RiskHistory.changes
+    ).filter(RiskHistory.action.isnot(None), RiskHistory.changed_at > until)
+    for row in query.order_by(RiskHistory.changed_at.desc(), RiskHistory.id.desc()).yield_per(1000):
+        undo_event(register, row.risk_ref, row.action, row.changes or {})
+
+
+def register_as_of(db: Session, as_of: datetime) -> Dict[int, dict]:
+    """Register state at as_of: the latest snapshot before it plus replayed history"""
+    snapshot = _latest_snapshot(db, as_of)
+    if snapshot is not None:
+        register = {int(k): v for k, v in json.loads(snapshot.data).items()}
+        _replay(db, register, snapshot.taken_at, as_of)
+        return register
+
+    # No snapshot yet: replay from the start, which needs fully structured history
+    legacy_until = db.query(func.max(RiskHistory.changed_at)).filter(RiskHistory.action.is_(None)).scalar()
+    if legacy_until is not None:
+        first = db.query(func.min(RiskRegisterSnapshot.taken_at)).scalar()
+        raise HistoryUnavailable(
+            f"Risk register history is available from {first.isoformat()}" if first
+            else "Risk register history has no baseline snapshot yet"
+        )
+    register = {}
+    _replay(db, register, None, as_of)
+    return register
+
+
+def take_snapshot(db: Session) -> RiskRegisterSnapshot:
+    """Store the register state as of now() minus the snapshot lag
+
+    The first snapshot is read from the live tables and becomes the baseline
+    for history recorded before field diffs existed. The tables are as of
+    now, so history after taken_at is undone to bring it back to taken_at.
+    Later snapshots roll the previous one forward by replaying history.
+    Events are plain field assignments, so applying (or undoing) one the
+    register already reflects is harmless.
+
+    Runs as a leased monitoring job, so one worker takes each snapshot.
+    """
+    taken_at = db.query(func.now()).scalar() - timedelta(seconds=SNAPSHOT_LAG_SECONDS)
+    previous = db.query(RiskRegisterSnapshot).order_by(RiskRegisterSnapshot.taken_at.desc()).first()
+    if previous is None:
+        risks = db.query(Risk).options(selectinload(Risk.controls)).yield_per(1000)
+        register = {risk.id: risk_state(risk) for risk in risks}
+        _rewind(db, register, taken_at)
+    else:
+        if taken_at <= previous.taken_at:
+            return previous
+        register = {int(k): v for k, v in json.loads(previous.data).items()}
+        _replay(db, register, previous.taken_at, taken_at)
+
+    snapshot = RiskRegisterSnapshot(
+        taken_at=taken_at,
+        risk_count=len(register),
+        data=json.dumps(register, separators=(",", ":")),
+    )
+    db.add(snapshot)
+    db.commit()
+    return snapshot
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        snapshot = take_snapshot(db)
+        print(f"Risk register snapshot at {snapshot.taken_at}: {snapshot.risk_count} risks")
+    finally:
+        db.close()
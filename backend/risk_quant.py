@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Risk, RiskSimulation
+
+SIM_TRIALS = int(os.getenv("RISK_SIM_TRIALS", "100000"))
+SIM_MAX_TRIALS = int(os.getenv("RISK_SIM_MAX_TRIALS", "1000000"))
+SIM_SEED = int(os.getenv("RISK_SIM_SEED", "20240101"))
+SIM_WORKERS = int(os.getenv("RISK_SIM_WORKERS", str(os.cpu_count() or 1)))
+SIM_EXCEEDANCE_POINTS = 50
+# Loss events one request may sample (trials x max events per year, summed over risks)
+SIM_MAX_EVENTS = int(float(os.getenv("RISK_SIM_MAX_EVENTS", "2e8")))
+MAX_EVENTS_PER_YEAR = float(os.getenv("RISK_MAX_EVENTS_PER_YEAR", "1000"))
+# Per-event losses are sampled this many at a time, bounding worker memory
+EVENT_CHUNK = 1_000_000
+
+PERCENTILES = (10, 50, 90, 95, 99)
+
+# FAIR inputs on Risk: min / most likely / max of each factor
+FREQUENCY_FIELDS = ("lef_min", "lef_mode", "lef_max")  # loss events per year
+MAGNITUDE_FIELDS = ("lm_min", "lm_mode", "lm_max")  # loss per event
+RANGE_FIELDS = FREQUENCY_FIELDS + MAGNITUDE_FIELDS
+
+# Bump when the simulation changes so cached results are not reused
+MODEL_VERSION = 1
+
+
+class SimulationTooLarge(ValueError):
+    pass
+
+
+# ============ Simulation kernel (runs in worker processes) ============
+
+def _pert(rng: np.random.Generator, low: float, mode: float, high: float, size: int) -> np.ndarray:
+    """Beta-PERT samples, the usual FAIR estimate distribution"""
+    if high <= low:
+        return np.full(size, low, dtype=np.float64)
+    span = high - low
+    alpha = 1 + 4 * (mode - low) / span
+    beta = 1 + 4 * (high - mode) / span
+    return low + rng.beta(alpha, beta, size) * span
+
+
+def simulate_losses(frequency: Sequence[float], magnitude: Sequence[float], trials: int, seed: int,
+                    risk_id: int) -> np.ndarray:
+    """Annual loss for each trial: Poisson event count at a PERT rate, PERT loss per event
+
+    The generator is derived from (seed, risk_id), so a risk's trials do not
+    depend on which other risks are simulated or how work is partitioned.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence([seed, risk_id]))
+    rates = _pert(rng, *frequency, trials)
+    events = rng.poisson(rates)
+    losses = np.zeros(trials, dtype=np.float64)
+    ends = np.cumsum(events)
+    start = 0
+    # Consecutive runs of trials holding at most EVENT_CHUNK events; draws
+    # stay in trial order, so results do not depend on the chunking
+    while start < trials:
+        before = int(ends[start - 1]) if start else 0
+        stop = max(start + 1, int(np.searchsorted(ends, before + EVENT_CHUNK, side="right")))
+        counts = events[start:stop]
+        count = int(ends[stop - 1]) - before
+        if count > EVENT_CHUNK:
+            # One trial with more events than a chunk: only its sum is kept
+            total, left = 0.0, count
+            while left:
+                size = min(left, EVENT_CHUNK)
+                total += float(_pert(rng, *magnitude, size).sum())
+                left -= size
+            losses[start] = total
+        elif count:
+            per_event = _pert(rng, *magnitude, count)
+            losses[start:stop] = np.bincount(
+                np.repeat(np.arange(stop - start), counts), weights=per_event, minlength=stop - start
+            )
+        start = stop
+    return losses
+
+
+def summarize(losses: np.ndarray) -> dict:
+    """Mean, percentiles and loss exceedance curve of an annual loss sample"""
+    ordered = np.sort(losses)
+    trials = ordered.size
+    percentiles = np.percentile(ordered, PERCENTILES)
+    top = float(ordered[-1])
+    if top > 0:
+        floor = max(float(ordered[ordered > 0][0]), top / 1e6)
+        thresholds = np.geomspace(floor, top, SIM_EXCEEDANCE_POINTS)
+        exceed = 1.0 - np.searchsorted(ordered, thresholds, side="right") / trials
+        exceedance = [[round(float(t), 2), round(float(p), 6)] for t, p in zip(thresholds, exceed)]
+    else:
+        exceedance = []
+    return {
+        "trials": trials,
+        "mean": round(float(ordered.mean()), 2),
+        "probability_of_loss": round(float(np.count_nonzero(ordered) / trials), 6),
+        "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, percentiles)},
+        "exceedance": exceedance,
+    }
+
+
+def _simulate_chunk(inputs: List[Tuple[int, tuple, tuple]], trials: int, seed: int):
+    """Worker entry point: per-risk summaries plus the chunk's summed annual losses"""
+    combined = np.zeros(trials, dtype=np.float64)
+    summaries = {}
+    for risk_id, frequency, magnitude in inputs:
+        losses = simulate_losses(frequency, magnitude, trials, seed, risk_id)
+        combined += losses
+        summaries[risk_id] = summarize(losses)
+    return summaries, combined
+
+
+# ============ Process pool ============
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=SIM_WORKERS)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _run(inputs: List[Tuple[int, tuple, tuple]], trials: int, seed: int):
+    if len(inputs) <= 1 or SIM_WORKERS <= 1:
+        return _simulate_chunk(inputs, trials, seed)
+    chunks = [inputs[i::SIM_WORKERS] for i in range(min(SIM_WORKERS, len(inputs)))]
+    futures = [_get_pool().submit(_simulate_chunk, chunk, trials, seed) for chunk in chunks]
+    summaries = {}
+    combined = np.zeros(trials, dtype=np.float64)
+    for future in futures:
+        chunk_summaries, chunk_losses = future.result()
+        summaries.update(chunk_summaries)
+        combined += chunk_losses
+    return summaries, combined
+
+
+# ============ Inputs and cache ============
+
+def risk_inputs(risk) -> Optional[Tuple[int, tuple, tuple]]:
+    frequency = tuple(getattr(risk, f) for f in FREQUENCY_FIELDS)
+    magnitude = tuple(getattr(risk, f) for f in MAGNITUDE_FIELDS)
+    if None in frequency or None in magnitude:
+        return None
+    return risk.id, tuple(map(float, frequency)), tuple(map(float, magnitude))
+
+
+def ranges_after(risk, changes: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+    """FAIR ranges once `changes` is applied; an explicit None clears a field"""
+    return {f: changes[f] if f in changes else getattr(risk, f) for f in RANGE_FIELDS}
+
+
+def validate_ranges(values: Dict[str, Optional[float]]) -> Optional[str]:
+    """Return a problem description, or None if the FAIR ranges are usable
+
+    A triple is either fully set or fully cleared.
+    """
+    for fields, label in ((FREQUENCY_FIELDS, "frequency"), (MAGNITUDE_FIELDS, "magnitude")):
+        triple = [values.get(f) for f in fields]
+        if all(v is None for v in triple):
+            continue
+        if any(v is None for v in triple):
+            return f"{label} range needs min, mode and max (or all three null to clear it)"
+        low, mode, high = triple
+        if not 0 <= low <= mode <= high:
+            return f"{label} range must satisfy 0 <= min <= mode <= max"
+    if values.get("lef_max") is not None and values["lef_max"] > MAX_EVENTS_PER_YEAR:
+        return f"frequency max cannot exceed {MAX_EVENTS_PER_YEAR:g} events per year"
+    return None
+
+
+def _check_size(inputs: List[Tuple[int, tuple, tuple]], trials: int):
+    expected = trials * sum(frequency[2] for _, frequency, _ in inputs)
+    if expected > SIM_MAX_EVENTS:
+        raise SimulationTooLarge(
+            f"Simulation would sample up to {expected:.3g} loss events (limit {SIM_MAX_EVENTS:.3g}); use fewer trials"
+        )
+
+
+def _cache_key(scope: str, inputs: List[tuple], trials: int, seed: int) -> str:
+    payload = json.dumps([MODEL_VERSION, scope, trials, seed, inputs], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cached(db: Session, key: str) -> Optional[dict]:
+    result = db.query(RiskSimulation.result).filter(RiskSimulation.cache_key == key).scalar()
+    return json.loads(result) if result else None
+
+
+def _store(db: Session, key: str, scope: str, risk_id: Optional[int], result: dict):
+    # Results for the same scope with older inputs can never be hit again
+    db.query(RiskSimulation).filter(
+        RiskSimulation.scope == scope, RiskSimulation.risk_id == risk_id, RiskSimulation.cache_key != key
+    ).delete(synchronize_session=False)
+    db.add(RiskSimulation(cache_key=key, scope=scope, risk_id=risk_id, result=json.dumps(result)))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # A concurrent request stored the same result
+
+
+def simulate_risk(db: Session, risk: Risk, trials: int = SIM_TRIALS, seed: int = SIM_SEED) -> Optional[dict]:
+    inputs = risk_inputs(risk)
+    if inputs is None:
+        return None
+    key = _cache_key("risk", [inputs], trials, seed)
+    result = _cached(db, key)
+    if result is None:
+        _check_size([inputs], trials)
+        summaries, _ = _simulate_chunk([inputs], trials, seed)
+        result = {"seed": seed, **summaries[risk.id]}
+        _store(db, key, "risk", risk.id, result)
+    return result
+
+
+def simulate_register(db: Session, trials: int = SIM_TRIALS, seed: int = SIM_SEED) -> dict:
+    """Per-risk and aggregate annual loss for every risk with FAIR ranges"""
+    rows = db.query(Risk.id, Risk.title, *(getattr(Risk, f) for f in FREQUENCY_FIELDS + MAGNITUDE_FIELDS)).order_by(Risk.id).all()
+    inputs = [i for i in (risk_inputs(r) for r in rows) if i is not None]
+    key = _cache_key("register", inputs, trials, seed)
+    result = _cached(db, key)
+    if result is not None:
+        return result
+
+    titles = {r.id: r.title for r in rows}
+    _check_size(inputs, trials)
+    if inputs:
+        summaries, combined = _run(inputs, trials, seed)
+        aggregate = summarize(combined)
+    else:
+        summaries, aggregate = {}, None
+    result = {
+        "seed": seed,
+        "trials": trials,
+        "risks_simulated": len(inputs),
+        "risks_without_ranges": len(rows) - len(inputs),
+        "aggregate": aggregate,
+        "risks": [
+            {
+                "risk_id": risk_id,
+                "title": titles[risk_id],
+                "mean": summaries[risk_id]["mean"],
+                "p90": summaries[risk_id]["percentiles"]["p90"],
+                "p99": summaries[risk_id]["percentiles"]["p99"],
+            }
+            for risk_id, _, _ in inputs
+        ],
+    }
+    _store(db, key, "register", None, result)
+    return result
@@ -0,0 +1,216 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from models import Risk, RiskHistory, RiskLevel, RiskScoringMatrix
+from risk_history import describe
+
+RESCORE_BATCH_SIZE = int(os.getenv("RISK_RESCORE_BATCH_SIZE", "1000"))
+
+SCALE = 5  # likelihood and impact are both rated 1-5
+LEVELS = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL]
+
+
+@dataclass(frozen=True)
+class ScoringMatrix:
+    """Score lookup table plus the minimum score of each level above low"""
+    name: str
+    scores: tuple  # SCALE x SCALE, indexed [likelihood - 1][impact - 1]
+    medium_threshold: int
+    high_threshold: int
+    critical_threshold: int
+    id: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, row: RiskScoringMatrix) -> "ScoringMatrix":
+        return cls(
+            name=row.name,
+            scores=tuple(tuple(r) for r in json.loads(row.scores)),
+            medium_threshold=row.medium_threshold,
+            high_threshold=row.high_threshold,
+            critical_threshold=row.critical_threshold,
+            id=row.id,
+        )
+
+    @property
+    def thresholds(self) -> List[int]:
+        return [self.medium_threshold, self.high_threshold, self.critical_threshold]
+
+    def score(self, likelihood: int, impact: int) -> int:
+        return self.scores[likelihood - 1][impact - 1]
+
+    def level(self, score: int) -> RiskLevel:
+        index = 0
+        for threshold in self.thresholds:
+            if score >= threshold:
+                index += 1
+        return LEVELS[index]
+
+    def apply(self, risk: Risk):
+        risk.risk_score = self.score(risk.likelihood, risk.impact)
+        risk.risk_level = self.level(risk.risk_score)
+
+
+# The original likelihood x impact rating with 20/12/6 level thresholds
+DEFAULT_MATRIX = ScoringMatrix(
+    name="Likelihood x Impact",
+    scores=tuple(tuple(l * i for i in range(1, SCALE + 1)) for l in range(1, SCALE + 1)),
+    medium_threshold=6,
+    high_threshold=12,
+    critical_threshold=20,
+)
+
+
+def validate_matrix(scores: Sequence[Sequence[int]], thresholds: Sequence[int]) -> Optional[str]:
+    """Return a problem description, or None if the matrix can be used"""
+    if len(scores) != SCALE or any(len(row) != SCALE for row in scores):
+        return f"scores must be a {SCALE}x{SCALE} table indexed [likelihood][impact]"
+    if any(not isinstance(v, int) or v < 0 for row in scores for v in row):
+        return "scores must be non-negative integers"
+    if not thresholds[0] < thresholds[1] < thresholds[2]:
+        return "thresholds must increase: medium < high < critical"
+    return None
+
+
+def get_active_matrix(db: Session) -> ScoringMatrix:
+    row = db.query(RiskScoringMatrix).filter(
+        RiskScoringMatrix.is_active == True
+    ).order_by(RiskScoringMatrix.id.desc()).first()
+    return ScoringMatrix.from_model(row) if row else DEFAULT_MATRIX
+
+
+def activate_matrix(db: Session, name: str, scores: Sequence[Sequence[int]], medium_threshold: int,
+                    high_threshold: int, critical_threshold: int, created_by_id: Optional[int] = None) -> RiskScoringMatrix:
+    """Store a new matrix version and make it the only active one"""
+    db.query(RiskScoringMatrix).filter(RiskScoringMatrix.is_active == True).update(
+        {RiskScoringMatrix.is_active: False}, synchronize_session=False
+    )
+    row = RiskScoringMatrix(
+        name=name,
+        scores=json.dumps([list(r) for r in scores]),
+        medium_threshold=medium_threshold,
+        high_threshold=high_threshold,
+        critical_threshold=critical_threshold,
+        is_active=True,
+        created_by_id=created_by_id,
+    )
+    db.add(row)
+    return row
+
+
+# ============ Bulk Rescore ============
+
+@dataclass
+class RescoreReport:
+    matrix: str
+    scanned: int = 0
+    changed: int = 0
+    batches: int = 0
+
+
+def _level_codes(levels) -> np.ndarray:
+    index = {level: i for i, level in enumerate(LEVELS)}
+    return np.fromiter((index.get(level, -1) for level in levels), dtype=np.int8, count=len(levels))
+
+
+def rescore_batch(matrix: ScoringMatrix, likelihood: np.ndarray, impact: np.ndarray):
+    """Vectorized scores and level codes (indexes into LEVELS) for arrays of ratings"""
+    table = np.asarray(matrix.scores, dtype=np.int64)
+    scores = table[likelihood - 1, impact - 1]
+    levels = np.searchsorted(np.asarray(matrix.thresholds), scores, side="right")
+    return scores, levels
+
+
+def rescore_all(db: Session, matrix: Optional[ScoringMatrix] = None, changed_by_id: Optional[int] = None,
+                batch_size: int = RESCORE_BATCH_SIZE) -> RescoreReport:
+    """Recompute risk_score/risk_level for the whole register
+
+    Risks are read in id order one batch at a time; only rows whose score or
+    level actually changes are written, with one executemany UPDATE and one
+    history INSERT per batch, committed per batch. Each batch is read FOR
+    UPDATE, so an edit to likelihood/impact waits for the batch instead of
+    being overwritten with a score computed from the old values.
+    """
+    matrix = matrix or get_active_matrix(db)
+    report = RescoreReport(matrix=matrix.name)
+    last_id = 0
+    while True:
+        rows = db.query(
+            Risk.id, Risk.likelihood, Risk.impact, Risk.risk_score, Risk.risk_level
+        ).filter(Risk.id > last_id).order_by(Risk.id).limit(batch_size).with_for_update().all()
+        if not rows:
+            db.rollback()
+            break
+        last_id = rows[-1].id
+        report.scanned += len(rows)
+
+        ids, likelihood, impact, old_scores, old_levels = zip(*rows)
+        likelihood = np.clip(np.asarray(likelihood, dtype=np.int64), 1, SCALE)
+        impact = np.clip(np.asarray(impact, dtype=np.int64), 1, SCALE)
+        old_scores = np.asarray([-1 if s is None else s for s in old_scores], dtype=np.int64)
+        scores, levels = rescore_batch(matrix, likelihood, impact)
+        changed = np.flatnonzero((scores != old_scores) | (levels != _level_codes(old_levels)))
+        if changed.size == 0:
+            db.rollback()  # Release the batch's locks
+            continue
+
+        updates = []
+        history = []
+        for i in changed.tolist():
+            level = LEVELS[levels[i]]
+            updates.append({"id": ids[i], "risk_score": int(scores[i]), "risk_level": level})
+            old_level = old_levels[i].value if old_levels[i] is not None else None
+            changes = {
+                "risk_score": {"old": rows[i].risk_score, "new": int(scores[i])},
+                "risk_level": {"old": old_level, "new": level.value},
+            }
+            history.append({
+                "risk_id": ids[i],
+                "risk_ref": ids[i],
+                "changed_by_id": changed_by_id,
+                "action": "rescored",
+                "changes": changes,
+                "change_description": f"Rescored with matrix '{matrix.name}': " + describe("rescored", changes),
+            })
+        db.execute(update(Risk), updates)
+        db.execute(insert(RiskHistory), history)
+        db.commit()
+        report.changed += len(updates)
+        report.batches += 1
+
+    if matrix.id is not None:
+        db.query(RiskScoringMatrix).filter(RiskScoringMatrix.id == matrix.id).update(
+            {RiskScoringMatrix.rescored_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+    return report
+
+
+def rescore_task(matrix_id: int, changed_by_id: Optional[int] = None):
+    """Background entry point: runs after the matrix update has responded"""
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        row = db.query(RiskScoringMatrix).filter(RiskScoringMatrix.id == matrix_id).first()
+        # A newer matrix may have been activated meanwhile; its own job rescores
+        if row and row.is_active:
+            rescore_all(db, ScoringMatrix.from_model(row), changed_by_id)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(rescore_all(db))
+    finally:
+        db.close()
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
-from datetime import datetime
-from models import UserRole, ControlStatus, RiskStatus, RiskLevel
+from typing import Any, Dict, Optional, List
+from datetime import date, datetime
+from models import UserRole, ControlStatus, RiskStatus, RiskLevel, JobStatus
+from policy_render import RENDER_VERSION
 
 # User Schemas
 class UserBase(BaseModel):
@@ -51,6 +52,31 @@ class FrameworkResponse(FrameworkBase):
     class Config:
         from_attributes = True
 
+class CatalogImportReport(BaseModel):
+    framework_id: int
+    framework_name: str
+    version: Optional[str] = None
+    framework_created: bool
+    added: int
+    updated: int
+    unchanged: int
+    removed: int  # Requirements missing from the file; deleted only with prune
+    duplicates: int
+    dry_run: bool
+    removed_codes: List[str]
+
+class RequirementGap(BaseModel):
+    category: str  # unmapped, not_implemented, missing_evidence
+    requirement_id: int
+    code: str
+    title: str
+    control_ids: List[int]  # Mapped controls causing the gap
+
+class FrameworkGapReport(BaseModel):
+    framework_id: int
+    counts: Dict[str, int]
+    gaps: List[RequirementGap]
+
 # Requirement Schemas
 class RequirementBase(BaseModel):
     code: str
@@ -68,6 +94,17 @@ class RequirementResponse(RequirementBase):
     class Config:
         from_attributes = True
 
+class CoveredRequirement(BaseModel):
+    id: int
+    code: str
+
+class FrameworkCoverage(BaseModel):
+    framework_id: int
+    target_framework_id: int
+    code_prefix: str
+    control_ids: List[int]  # Controls mapped to matching source requirements
+    requirements: List[CoveredRequirement]  # Target requirements those controls also map to
+
 # Control Schemas
 class ControlBase(BaseModel):
     title: str
@@ -87,6 +124,9 @@ class ControlUpdate(BaseModel):
     implementation_details: Optional[str] = None
     requirement_ids: Optional[List[int]] = None
 
+class ControlBulkPatch(ControlUpdate):
+    id: int
+
 class ControlResponse(ControlBase):
     id: int
     owner_id: Optional[int]
@@ -97,6 +137,34 @@ class ControlResponse(ControlBase):
     class Config:
         from_attributes = True
 
+class ControlImpact(BaseModel):
+    control_id: int
+    risk_ids: List[int]  # Risks this control mitigates
+    unmitigated_risk_ids: List[int]  # Risks with no other implemented control
+
+# Bulk Schemas
+class BulkRequest(BaseModel):
+    # Rows are validated one by one so a bad row is reported instead of failing the request
+    items: List[Any] = Field(..., min_length=1)
+
+class BulkRowResult(BaseModel):
+    index: int  # Position in the request's items
+    id: int
+    action: str  # created, updated, unchanged
+
+class BulkRowError(BaseModel):
+    index: int
+    id: Optional[int] = None
+    detail: str
+
+class BulkResult(BaseModel):
+    created: int
+    updated: int
+    unchanged: int
+    failed: int
+    results: List[BulkRowResult]
+    errors: List[BulkRowError]
+
 # Evidence Schemas
 class EvidenceBase(BaseModel):
     title: str
@@ -111,12 +179,46 @@ class EvidenceResponse(EvidenceBase):
     control_id: int
     file_name: Optional[str]
     file_path: Optional[str]
+    page_count: Optional[int] = None
     uploaded_by_id: Optional[int]
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+class EvidenceSearchHit(BaseModel):
+    evidence: EvidenceResponse
+    rank: float
+
+class EvidenceSearchResponse(BaseModel):
+    query: str
+    skip: int
+    limit: int
+    has_more: bool
+    results: List[EvidenceSearchHit]
+
+class ExtractionJobResponse(BaseModel):
+    id: int
+    evidence_id: int
+    status: JobStatus
+    attempts: int
+    last_error: Optional[str]
+    next_attempt_at: Optional[datetime]
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class EvidenceGCReport(BaseModel):
+    scanned: int
+    skipped_recent: int
+    quarantined: int
+    restored: int
+    purged: int
+    reclaimed_bytes: int
+    errors: List[str]
+
 # Policy Schemas
 class PolicyBase(BaseModel):
     title: str
@@ -141,6 +243,64 @@ class PolicyResponse(PolicyBase):
     class Config:
         from_attributes = True
 
+class PolicySummary(BaseModel):
+    id: int
+    title: str
+    version: str
+    is_published: bool
+    published_at: Optional[datetime]
+    content_length: Optional[int]
+    content_hash: Optional[str]
+    render_version: int = RENDER_VERSION  # With content_hash, addresses the immutable rendered revision
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class PolicyTocEntry(BaseModel):
+    level: int
+    id: str
+    title: str
+    children: List["PolicyTocEntry"] = []
+
+class PolicyRenderedResponse(BaseModel):
+    policy_id: int
+    version: str
+    content_hash: str
+    html: str
+    toc: List[PolicyTocEntry]
+    render_version: int
+    rendered_at: Optional[datetime]
+
+class PolicyVersionResponse(BaseModel):
+    id: int
+    policy_id: int
+    revision: Optional[int]
+    version: str
+    is_snapshot: bool
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class PolicyVersionContent(PolicyVersionResponse):
+    content: str
+
+class PolicyDiffHunk(BaseModel):
+    base_start: int
+    removed: List[str]
+    added: List[str]
+
+class PolicyVersionDiff(BaseModel):
+    policy_id: int
+    revision: int
+    version: str
+    base_revision: Optional[int]
+    lines_added: int
+    lines_removed: int
+    hunks: List[PolicyDiffHunk]
+
 # Policy Acknowledgment Schemas
 class PolicyAcknowledgmentCreate(BaseModel):
     policy_id: int
@@ -163,6 +323,13 @@ class RiskBase(BaseModel):
     impact: int = Field(..., ge=1, le=5)
     category: Optional[str] = None
     status: RiskStatus = RiskStatus.IDENTIFIED
+    # Optional FAIR ranges: loss events per year and loss per event (min / most likely / max)
+    lef_min: Optional[float] = Field(None, ge=0)
+    lef_mode: Optional[float] = Field(None, ge=0)
+    lef_max: Optional[float] = Field(None, ge=0)
+    lm_min: Optional[float] = Field(None, ge=0)
+    lm_mode: Optional[float] = Field(None, ge=0)
+    lm_max: Optional[float] = Field(None, ge=0)
 
 class RiskCreate(RiskBase):
     owner_id: Optional[int] = None
@@ -177,6 +344,15 @@ class RiskUpdate(BaseModel):
     status: Optional[RiskStatus] = None
     owner_id: Optional[int] = None
     control_ids: Optional[List[int]] = None
+    lef_min: Optional[float] = Field(None, ge=0)
+    lef_mode: Optional[float] = Field(None, ge=0)
+    lef_max: Optional[float] = Field(None, ge=0)
+    lm_min: Optional[float] = Field(None, ge=0)
+    lm_mode: Optional[float] = Field(None, ge=0)
+    lm_max: Optional[float] = Field(None, ge=0)
+
+class RiskBulkPatch(RiskUpdate):
+    id: int
 
 class RiskResponse(RiskBase):
     id: int
@@ -189,6 +365,85 @@ class RiskResponse(RiskBase):
     class Config:
         from_attributes = True
 
+class RiskHistoryResponse(BaseModel):
+    id: int
+    risk_id: Optional[int]
+    risk_ref: Optional[int]
+    action: Optional[str]  # None on entries recorded before field-level diffs
+    changes: Optional[dict]
+    change_description: str
+    changed_by_id: Optional[int]
+    changed_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class RiskHeatmap(BaseModel):
+    cells: List[List[int]]  # [likelihood, impact, count], non-empty cells only
+    total: int
+
+class RiskAggregateGroup(BaseModel):
+    key: Optional[str]
+    label: Optional[str] = None
+    count: int
+    avg_score: Optional[float]
+    max_score: Optional[int]
+
+class RiskAggregateResponse(BaseModel):
+    group_by: str
+    groups: List[RiskAggregateGroup]
+    total: int
+
+class RiskIdPage(BaseModel):
+    ids: List[int]
+    has_more: bool
+
+class LossDistribution(BaseModel):
+    trials: int
+    mean: float
+    probability_of_loss: float  # Share of simulated years with at least one loss
+    percentiles: Dict[str, float]  # p10, p50, p90, p95, p99 annual loss
+    exceedance: List[List[float]]  # [annual loss, P(loss > it)]
+
+class RiskSimulationResponse(LossDistribution):
+    risk_id: int
+    seed: int
+
+class RiskLossSummary(BaseModel):
+    risk_id: int
+    title: str
+    mean: float
+    p90: float
+    p99: float
+
+class RegisterSimulationResponse(BaseModel):
+    seed: int
+    trials: int
+    risks_simulated: int
+    risks_without_ranges: int
+    aggregate: Optional[LossDistribution]
+    risks: List[RiskLossSummary]
+
+class RiskScoringMatrixBase(BaseModel):
+    name: str
+    scores: List[List[int]]  # 5x5, indexed [likelihood - 1][impact - 1]
+    medium_threshold: int
+    high_threshold: int
+    critical_threshold: int
+
+class RiskScoringMatrixUpdate(RiskScoringMatrixBase):
+    pass
+
+class RiskScoringMatrixResponse(RiskScoringMatrixBase):
+    id: Optional[int] = None  # None while the built-in default is in use
+    rescored_at: Optional[datetime] = None
+
+class RiskRescoreReport(BaseModel):
+    matrix: str
+    scanned: int
+    changed: int
+    batches: int
+
 # Alert Schemas
 class AlertResponse(BaseModel):
     id: int
@@ -196,12 +451,44 @@ class AlertResponse(BaseModel):
     description: Optional[str]
     severity: str
     is_resolved: bool
+    alert_type: Optional[str] = None
     related_control_id: Optional[int]
+    related_policy_id: Optional[int] = None
+    occurrences: int = 1
     created_at: datetime
+    last_seen_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class MonitorJobResponse(BaseModel):
+    name: str
+    interval_seconds: int
+    lease_holder: Optional[str] = None  # Worker currently running the job
+    lease_expires_at: Optional[datetime] = None
+    next_run_at: Optional[datetime] = None
+    last_run_at: Optional[datetime] = None
+    last_alerts: int = 0
+    last_resolved: int = 0
+    last_error: Optional[str] = None
+
+class MonitorRunResult(BaseModel):
+    name: str
+    alerts: int  # Conditions observed (new alerts or repeats of open ones)
+    resolved: int  # Open alerts whose condition cleared
+
+# Search Schemas
+class SearchHit(BaseModel):
+    type: str
+    id: int
+    title: str
+    subtitle: Optional[str]
+    score: float
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+
 # Dashboard Schemas
 class ComplianceProgress(BaseModel):
     framework_id: int
@@ -220,6 +507,32 @@ class DashboardStats(BaseModel):
     active_alerts: int
     controls_lacking_evidence: int
 
+class FrameworkPosturePoint(BaseModel):
+    framework_id: int
+    total_controls: float
+    implemented_controls: float
+    compliance_percentage: float
+
+class PosturePoint(BaseModel):
+    period_start: date
+    samples: int  # Daily snapshots averaged into this point
+    total_risks: float
+    low_risks: float
+    medium_risks: float
+    high_risks: float
+    critical_risks: float
+    controls_lacking_evidence: float
+    active_alerts: float
+    acknowledgment_rate: float
+    frameworks: List[FrameworkPosturePoint]
+
+class PostureTrends(BaseModel):
+    granularity: str
+    start: date
+    end: date
+    frameworks: Dict[int, str]  # framework_id -> name
+    points: List[PosturePoint]
+
 # Report Schemas
 class PolicyAcknowledgmentReport(BaseModel):
     policy_id: int
@@ -230,3 +543,43 @@ class PolicyAcknowledgmentReport(BaseModel):
     pending_count: int
     acknowledgment_rate: float
     pending_users: List[UserResponse]
+
+# Metrics Schemas
+class RouteCompressionStats(BaseModel):
+    route: str
+    responses: int
+    compressed: int
+    bytes_in: int
+    bytes_out: int
+    ratio: Optional[float] = None
+    cpu_seconds: float
+    cpu_ms_per_response: float
+
+class InvalidationTopicStats(BaseModel):
+    topic: str
+    published: int  # Events this worker sent
+    received: int  # Events from other workers
+    lag_ms_last: Optional[float] = None  # Send-to-apply delay, includes clock skew across hosts
+    lag_ms_max: Optional[float] = None
+    lag_ms_avg: Optional[float] = None
+    last_received_at: Optional[float] = None
+
+class InvalidationStats(BaseModel):
+    instance_id: str
+    notify_enabled: bool  # LISTEN/NOTIFY needs PostgreSQL
+    connected: bool
+    reconnects: int
+    malformed: int
+    topics: List[InvalidationTopicStats]
+
+class LiveTicket(BaseModel):
+    ticket: str
+    expires_in: int  # Seconds
+
+class LiveStats(BaseModel):
+    clients: int
+    max_clients: int
+    queue_size: int
+    frames_sent: int
+    resyncs: int  # Backlogs dropped for slow clients
+    rejected: int  # Connections refused at max_clients
@@ -0,0 +1,265 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, event, func, literal, literal_column, or_
+from sqlalchemy.orm import Session, defer
+
+from database import engine
+from models import Control, Evidence, Policy, Requirement, Risk, control_requirement, evidence_search_vector
+
+USE_POSTGRES_FTS = engine.dialect.name == "postgresql"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it of on or that the to was were will with".split()
+)
+
+# Field weights mirror the setweight() labels used for the Postgres index
+_FIELD_WEIGHTS = {
+    "title": 1.0,
+    "description": 0.4,
+    "content_text": 0.2,
+    "extracted_text": 0.1,
+}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class InvertedIndex:
+    """In-process evidence index used when the database has no full-text search
+
+    Postings map term -> {evidence_id: weighted term frequency}. Queries are an
+    AND over all terms ranked by tf-idf; phrase order is not enforced.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.built = False
+
+    def _add_locked(self, doc_id: int, fields: Dict[str, Optional[str]]):
+        self._remove_locked(doc_id)
+        scores: Dict[str, float] = defaultdict(float)
+        for name, weight in _FIELD_WEIGHTS.items():
+            for term in tokenize(fields.get(name)):
+                scores[term] += weight
+        for term, score in scores.items():
+            self._postings[term][doc_id] = score
+        self._doc_terms[doc_id] = set(scores)
+
+    def _remove_locked(self, doc_id: int):
+        for term in self._doc_terms.pop(doc_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def add(self, doc_id: int, fields: Dict[str, Optional[str]]):
+        with self._lock:
+            if self.built:
+                self._add_locked(doc_id, fields)
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            if self.built:
+                self._remove_locked(doc_id)
+
+    def build(self, db: Session):
+        with self._lock:
+            if self.built:
+                return
+            rows = db.query(
+                Evidence.id, Evidence.title, Evidence.description, Evidence.content_text, Evidence.extracted_text
+            ).yield_per(1000)
+            for row in rows:
+                self._add_locked(row.id, row._asdict())
+            self.built = True
+
+    def search(self, query: str, allowed: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            postings = [self._postings.get(t, {}) for t in terms]
+            total = max(len(self._doc_terms), 1)
+            if any(not p for p in postings):
+                return []
+            # Intersect starting from the rarest term
+            ordered = sorted(postings, key=len)
+            candidates = set(ordered[0])
+            for p in ordered[1:]:
+                candidates.intersection_update(p)
+                if not candidates:
+                    return []
+            if allowed is not None:
+                candidates &= allowed
+            idf = [math.log(1 + total / len(p)) for p in postings]
+            ranked = [
+                (doc_id, sum(p[doc_id] * w for p, w in zip(postings, idf)))
+                for doc_id in candidates
+            ]
+        ranked.sort(key=lambda hit: (-hit[1], hit[0]))
+        return ranked
+
+
+evidence_index = InvertedIndex()
+
+
+def _filtered_evidence(db: Session, control_id: Optional[int], framework_id: Optional[int]):
+    query = db.query(Evidence)
+    if control_id:
+        query = query.filter(Evidence.control_id == control_id)
+    if framework_id:
+        mapped = db.query(control_requirement.c.control_id).join(
+            Requirement, Requirement.id == control_requirement.c.requirement_id
+        ).filter(Requirement.framework_id == framework_id)
+        query = query.filter(Evidence.control_id.in_(mapped))
+    return query
+
+
+def search_evidence(db: Session, q: str, control_id: Optional[int] = None, framework_id: Optional[int] = None,
+                    skip: int = 0, limit: int = 20) -> Tuple[List[Tuple[Evidence, float]], bool]:
+    """Return a ranked page of (evidence, rank) and whether more results exist"""
+    query = _filtered_evidence(db, control_id, framework_id).options(defer(Evidence.extracted_text))
+
+    if USE_POSTGRES_FTS:
+        vector = evidence_search_vector(Evidence.title, Evidence.description, Evidence.content_text, Evidence.extracted_text)
+        tsquery = func.websearch_to_tsquery(literal_column("'english'::regconfig"), q)
+        rank = func.ts_rank_cd(vector, tsquery)
+        rows = query.add_columns(rank.label("rank")).filter(
+            vector.op("@@")(tsquery)
+        ).order_by(rank.desc(), Evidence.id).offset(skip).limit(limit + 1).all()
+        hits = [(row[0], float(row[1])) for row in rows]
+        return hits[:limit], len(hits) > limit
+
+    evidence_index.build(db)
+    allowed = None
+    if control_id or framework_id:
+        allowed = {r[0] for r in query.with_entities(Evidence.id)}
+    ranked = evidence_index.search(q, allowed)
+    page = ranked[skip:skip + limit]
+    by_id = {e.id: e for e in query.filter(Evidence.id.in_([doc_id for doc_id, _ in page]))} if page else {}
+    hits = [(by_id[doc_id], rank) for doc_id, rank in page if doc_id in by_id]
+    return hits, len(ranked) > skip + limit
+
+
+# ============ Unified Search ============
+
+# type -> (model, [(column, weight)], title column, subtitle column)
+SEARCH_ENTITIES = {
+    "control": (Control, [(Control.title, 1.0), (Control.description, 0.6)], Control.title, Control.status),
+    "risk": (Risk, [(Risk.title, 1.0), (Risk.category, 0.7)], Risk.title, Risk.category),
+    "policy": (Policy, [(Policy.title, 1.0), (Policy.content, 0.5)], Policy.title, Policy.version),
+    "requirement": (Requirement, [(Requirement.code, 1.0), (Requirement.title, 0.9)], Requirement.title, Requirement.code),
+}
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def _entity_query(db: Session, entity: str, q: str, limit: int, published_only: bool):
+    model, fields, title_col, subtitle_col = SEARCH_ENTITIES[entity]
+    prefix = _escape_like(q) + "%"
+
+    if USE_POSTGRES_FTS:
+        # "q <% col" is word similarity above pg_trgm.word_similarity_threshold;
+        # both it and the prefix ILIKE are served by the gin_trgm_ops indexes
+        conditions = []
+        scores = []
+        for column, weight in fields:
+            conditions.append(literal(q).op("<%")(column))
+            conditions.append(column.ilike(prefix, escape="!"))
+            scores.append(case(
+                (column.ilike(prefix, escape="!"), literal(weight)),
+                else_=func.word_similarity(q, column) * weight
+            ))
+        score = func.greatest(*scores) if len(scores) > 1 else scores[0]
+    else:
+        contains = "%" + _escape_like(q) + "%"
+        conditions = []
+        scores = []
+        for column, weight in fields:
+            conditions.append(column.ilike(contains, escape="!"))
+            scores.append(case(
+                (column.ilike(prefix, escape="!"), literal(weight)),
+                (column.ilike(contains, escape="!"), literal(weight * 0.6)),
+                else_=literal(0.0)
+            ))
+        score = func.max(*scores) if len(scores) > 1 else scores[0]
+
+    query = db.query(model.id, title_col, subtitle_col, score.label("score")).filter(or_(*conditions))
+    if published_only and model is Policy:
+        query = query.filter(Policy.is_published == True)
+    return query.order_by(score.desc(), model.id).limit(limit)
+
+
+def search_all(db: Session, q: str, types: List[str], limit: int = 20, published_only: bool = False) -> List[dict]:
+    """Return typed hits across entities, best score first"""
+    hits = []
+    for entity in types:
+        for row in _entity_query(db, entity, q, limit, published_only):
+            subtitle = row[2]
+            hits.append({
+                "type": entity,
+                "id": row[0],
+                "title": row[1],
+                "subtitle": subtitle.value if hasattr(subtitle, "value") else subtitle,
+                "score": float(row[3] or 0),
+            })
+    hits.sort(key=lambda h: (-h["score"], h["type"], h["id"]))
+    return hits[:limit]
+
+
+# ============ Index maintenance (in-process fallback only) ============
+
+def _record_changes(session: Session, flush_context):
+    # Capture values now: attributes are expired by the time after_commit runs
+    pending = session.info.setdefault("search_index_changes", {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Evidence):
+            pending[obj.id] = {name: obj.__dict__.get(name) for name in _FIELD_WEIGHTS if name in obj.__dict__}
+    for obj in session.deleted:
+        if isinstance(obj, Evidence):
+            pending[obj.id] = None
+
+
+def _apply_changes(session: Session):
+    pending = session.info.pop("search_index_changes", None)
+    if not pending or not evidence_index.built:
+        return
+    # Deferred columns that were never loaded (e.g. extracted_text) are re-read
+    incomplete = [doc_id for doc_id, fields in pending.items() if fields is not None and len(fields) < len(_FIELD_WEIGHTS)]
+    if incomplete:
+        with engine.connect() as conn:
+            table = Evidence.__table__
+            rows = conn.execute(
+                table.select().with_only_columns(table.c.id, *(table.c[name] for name in _FIELD_WEIGHTS))
+                .where(table.c.id.in_(incomplete))
+            )
+            for row in rows:
+                pending[row.id] = {name: row._mapping[name] for name in _FIELD_WEIGHTS}
+    for doc_id, fields in pending.items():
+        if fields is None:
+            evidence_index.remove(doc_id)
+        else:
+            evidence_index.add(doc_id, fields)
+
+
+def _discard_changes(session: Session):
+    session.info.pop("search_index_changes", None)
+
+
+if not USE_POSTGRES_FTS:
+    event.listen(Session, "after_flush", _record_changes)
+    event.listen(Session, "after_commit", _apply_changes)
+    event.listen(Session, "after_rollback", _discard_changes)
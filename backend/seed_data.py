@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 from models import Base, User, UserRole, Framework, Requirement, Control, Policy, ControlStatus
 from auth import get_password_hash
+from invalidation import CATALOG, publish
 
 def seed_database():
     """Seed the database with initial data"""
@@ -497,6 +498,9 @@ All personnel handling personal data receive privacy training.
         db.commit()
         print(f"Created {len(policies)} policy templates")
         
+        # Running workers rebuild their catalog cache
+        publish(db, CATALOG)
+        
         print("Database seeding completed successfully!")
         
     except Exception as e:
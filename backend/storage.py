@@ -0,0 +1,233 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional
+
+STORAGE_BACKEND = os.getenv("EVIDENCE_STORAGE", "local")
+EVIDENCE_DIR = Path(os.getenv("EVIDENCE_DIR", "/app/evidence"))
+
+S3_BUCKET = os.getenv("S3_BUCKET", "isms-evidence")
+S3_PREFIX = os.getenv("S3_PREFIX", "evidence/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # e.g. http://minio:9000
+S3_REGION = os.getenv("S3_REGION", "us-east-1")
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+S3_MULTIPART_CHUNKSIZE = int(os.getenv("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))
+PRESIGNED_URL_EXPIRY_SECONDS = int(os.getenv("PRESIGNED_URL_EXPIRY_SECONDS", "300"))
+
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    modified: float  # POSIX timestamp
+
+
+class EvidenceStorage(ABC):
+    """Interface for evidence file storage; keys are flat relative names
+
+    check_storage.py runs every driver through the same contract.
+    """
+
+    @abstractmethod
+    def save(self, key: str, fileobj: BinaryIO) -> str:
+        ...
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def move(self, src: str, dst: str) -> None:
+        ...
+
+    @abstractmethod
+    def list(self, prefix: str = "") -> Iterator[StoredObject]:
+        """Yield objects directly under prefix, one at a time"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Filesystem path if the object can be served straight from disk"""
+        return None
+
+    def presigned_url(self, key: str, filename: Optional[str] = None,
+                      expires_in: int = PRESIGNED_URL_EXPIRY_SECONDS) -> Optional[str]:
+        """Direct download URL bypassing the API, if the backend supports it"""
+        return None
+
+    def reference_aliases(self, key: str) -> List[str]:
+        """Values of Evidence.file_path that may refer to this key"""
+        return [key]
+
+    def key_for(self, file_path: str) -> str:
+        """Map a stored Evidence.file_path value to a storage key"""
+        return file_path
+
+
+class LocalStorage(EvidenceStorage):
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, key: str, fileobj: BinaryIO) -> str:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as buffer:
+            shutil.copyfileobj(fileobj, buffer)
+        return key
+
+    def open(self, key: str) -> BinaryIO:
+        return self._path(key).open("rb")
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def move(self, src: str, dst: str) -> None:
+        target = self._path(dst)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # rename within the same volume is atomic
+        os.replace(self._path(src), target)
+        os.utime(target)
+
+    def list(self, prefix: str = "") -> Iterator[StoredObject]:
+        directory = self.root / prefix if prefix else self.root
+        if not directory.is_dir():
+            return
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                yield StoredObject(key=f"{prefix}{entry.name}", size=st.st_size, modified=st.st_mtime)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+    def reference_aliases(self, key: str) -> List[str]:
+        # Rows created before the storage abstraction hold absolute paths
+        return [key, str(self.root / key)]
+
+    def key_for(self, file_path: str) -> str:
+        path = Path(file_path)
+        if path.is_absolute():
+            try:
+                return str(path.relative_to(self.root))
+            except ValueError:
+                return path.name
+        return file_path
+
+
+class S3Storage(EvidenceStorage):
+    """S3-compatible driver (AWS S3, MinIO, Ceph RGW, ...)
+
+    client: an S3 client to use instead of building one from boto3, e.g. a
+    stand-in in check_storage.py; it then keeps its own transfer settings.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.transfer_config = None
+        if client is None:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+            # upload_fileobj switches to a multipart upload above the threshold and
+            # streams the part uploads, so large files are never buffered whole
+            self.transfer_config = TransferConfig(
+                multipart_threshold=S3_MULTIPART_THRESHOLD,
+                multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+            )
+        self.client = client
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def save(self, key: str, fileobj: BinaryIO) -> str:
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(key), Config=self.transfer_config)
+        return key
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self.client.exceptions.ClientError:
+            return False
+
+    def move(self, src: str, dst: str) -> None:
+        self.client.copy_object(
+            Bucket=self.bucket,
+            Key=self._key(dst),
+            CopySource={"Bucket": self.bucket, "Key": self._key(src)},
+        )
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(src))
+
+    def list(self, prefix: str = "") -> Iterator[StoredObject]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        full_prefix = self._key(prefix)
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=full_prefix, Delimiter="/"):
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(full_prefix):]
+                if not name or name.startswith("."):
+                    continue
+                modified = obj["LastModified"]
+                if isinstance(modified, datetime):
+                    modified = modified.timestamp()
+                yield StoredObject(key=f"{prefix}{name}", size=obj["Size"], modified=modified)
+
+    def presigned_url(self, key: str, filename: Optional[str] = None,
+                      expires_in: int = PRESIGNED_URL_EXPIRY_SECONDS) -> Optional[str]:
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+
+def create_storage() -> EvidenceStorage:
+    if STORAGE_BACKEND == "s3":
+        return S3Storage(S3_BUCKET, S3_PREFIX, endpoint_url=S3_ENDPOINT_URL, region=S3_REGION)
+    if STORAGE_BACKEND == "local":
+        return LocalStorage(EVIDENCE_DIR)
+    raise ValueError(f"Unknown EVIDENCE_STORAGE backend: {STORAGE_BACKEND}")
+
+
+_storage: Optional[EvidenceStorage] = None
+
+
+def get_storage() -> EvidenceStorage:
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
@@ -34,6 +34,12 @@ export const frameworkAPI = {
   list: () => api.get('/api/frameworks'),
   get: (id) => api.get(`/api/frameworks/${id}`),
   create: (data) => api.post('/api/frameworks', data),
+  coverage: (id, params) => api.get(`/api/frameworks/${id}/coverage`, { params }),
+  gaps: (id, category) => api.get(`/api/frameworks/${id}/gaps`, { params: category ? { category } : {} }),
+  import: (formData, params) => api.post('/api/frameworks/import', formData, {
+    params,
+    headers: { 'Content-Type': 'multipart/form-data' },
+  }),
 };
 
 // Requirement API
@@ -49,6 +55,9 @@ export const controlAPI = {
   create: (data) => api.post('/api/controls', data),
   update: (id, data) => api.put(`/api/controls/${id}`, data),
   delete: (id) => api.delete(`/api/controls/${id}`),
+  impact: (id) => api.get(`/api/controls/${id}/impact`),
+  bulkUpsert: (items) => api.post('/api/controls/bulk', { items }),
+  bulkPatch: (items) => api.patch('/api/controls/bulk', { items }),
 };
 
 // Evidence API
@@ -58,6 +67,7 @@ export const evidenceAPI = {
     headers: { 'Content-Type': 'multipart/form-data' },
   }),
   delete: (id) => api.delete(`/api/evidence/${id}`),
+  download: (id) => api.get(`/api/evidence/${id}/download`, { responseType: 'blob' }),
 };
 
 // Policy API
@@ -68,6 +78,10 @@ export const policyAPI = {
   update: (id, data) => api.put(`/api/policies/${id}`, data),
   delete: (id) => api.delete(`/api/policies/${id}`),
   publish: (id) => api.post(`/api/policies/${id}/publish`),
+  rendered: (id, contentHash, renderVersion) => api.get(
+    contentHash ? `/api/policies/${id}/rendered/${contentHash}` : `/api/policies/${id}/rendered`,
+    { params: contentHash && renderVersion ? { v: renderVersion } : {} }
+  ),
 };
 
 // Policy Acknowledgment API
@@ -83,23 +97,90 @@ export const riskAPI = {
   create: (data) => api.post('/api/risks', data),
   update: (id, data) => api.put(`/api/risks/${id}`, data),
   delete: (id) => api.delete(`/api/risks/${id}`),
+  heatmap: (filters = {}) => api.get('/api/risks/heatmap', { params: filters }),
+  aggregates: (groupBy, filters = {}) => api.get('/api/risks/aggregates', { params: { group_by: groupBy, ...filters } }),
+  drilldown: (params) => api.get('/api/risks/drilldown', { params }),
+  history: (id) => api.get(`/api/risks/${id}/history`),
+  bulkUpsert: (items) => api.post('/api/risks/bulk', { items }),
+  bulkPatch: (items) => api.patch('/api/risks/bulk', { items }),
+  simulation: (id, params = {}) => api.get(`/api/risks/${id}/simulation`, { params }),
+  simulateRegister: (params = {}) => api.get('/api/risks/simulation', { params }),
 };
 
 // Alert API
 export const alertAPI = {
-  list: (includeResolved = false) => api.get('/api/alerts', { params: { include_resolved: includeResolved } }),
+  list: (includeResolved = false, params = {}) => api.get('/api/alerts', { params: { include_resolved: includeResolved, ...params } }),
+};
+
+// Monitoring API (admin)
+export const monitoringAPI = {
+  jobs: () => api.get('/api/monitoring/jobs'),
+  run: (name) => api.post(`/api/monitoring/jobs/${name}/run`),
 };
 
 // Dashboard API
 export const dashboardAPI = {
   getStats: () => api.get('/api/dashboard/stats'),
+  trends: (params = {}) => api.get('/api/dashboard/trends', { params }),
+};
+
+// Live updates (Server-Sent Events). handlers: { alerts, controls, dashboard, resync }.
+// EventSource cannot send headers, so each connection uses a short-lived
+// ticket in the query string. Once the browser gives up on a connection
+// (e.g. its ticket expired before a reconnect), a new ticket is fetched.
+// onOffline runs after each failed connection attempt (before the retry).
+// Returns a function that closes the stream.
+export const subscribeLive = (handlers, onOffline = () => {}) => {
+  let source = null;
+  let retryTimer = null;
+  let closed = false;
+
+  const connect = async () => {
+    try {
+      const { data } = await api.post('/api/live/ticket');
+      if (closed) return;
+      source = new EventSource(`${API_BASE_URL}/api/live?ticket=${encodeURIComponent(data.ticket)}`);
+      Object.entries(handlers).forEach(([event, handler]) => {
+        source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+      });
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          source.close();
+          onOffline();
+          retry();
+        }
+      };
+    } catch (error) {
+      // Logged out or session expired: stop rather than retry
+      if (error.response?.status === 401) return;
+      onOffline();
+      retry();
+    }
+  };
+
+  const retry = () => {
+    if (!closed) retryTimer = setTimeout(connect, 5000);
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    if (source) source.close();
+  };
 };
 
 // Report API
 export const reportAPI = {
   policyAcknowledgment: (policyId) => api.get(`/api/reports/policy-acknowledgments/${policyId}`),
-  riskRegister: () => api.get('/api/reports/risk-register'),
+  riskRegister: (asOf) => api.get('/api/reports/risk-register', { params: asOf ? { as_of: asOf } : {} }),
   compliance: (frameworkId) => api.get(`/api/reports/compliance/${frameworkId}`),
 };
 
+// Search API
+export const searchAPI = {
+  search: (q, types) => api.get('/api/search', { params: { q, types } }),
+  evidence: (q, params) => api.get('/api/evidence/search', { params: { q, ...params } }),
+};
+
 export default api;
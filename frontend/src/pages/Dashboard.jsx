@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { dashboardAPI, alertAPI } from '../api';
+import { dashboardAPI, alertAPI, subscribeLive } from '../api';
 import { FiShield, FiAlertTriangle, FiFileText, FiCheckCircle, FiAlertCircle } from 'react-icons/fi';
 import { PieChart, Pie, Cell, ResponsiveContainer, Legend, Tooltip, BarChart, Bar, XAxis, YAxis, CartesianGrid } from 'recharts';
 
@@ -9,7 +9,23 @@ function Dashboard({ user }) {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    loadData();
+    // Pushed changes replace polling; the server sends a resync on every
+    // (re)connect and when this client fell behind, which (re)loads everything
+    return subscribeLive({
+      resync: () => loadData(),
+      dashboard: (delta) => setStats((current) => (current ? { ...current, ...delta } : current)),
+      alerts: ({ alerts: changed }) => {
+        if (changed === null) {
+          alertAPI.list().then((res) => setAlerts(res.data));
+          return;
+        }
+        setAlerts((current) => {
+          const byId = new Map(current.map((a) => [a.id, a]));
+          changed.forEach((a) => (a.is_resolved ? byId.delete(a.id) : byId.set(a.id, a)));
+          return [...byId.values()].sort((a, b) => new Date(b.last_seen_at) - new Date(a.last_seen_at));
+        });
+      },
+    }, loadData);
   }, []);
 
   const loadData = async () => {
@@ -93,14 +93,20 @@ function Policies({ user, readOnly }) {
     setSelectedPolicy(null);
   };
 
-  const openEditModal = (policy) => {
-    setSelectedPolicy(policy);
-    setFormData({
-      title: policy.title,
-      content: policy.content,
-      version: policy.version
-    });
-    setShowModal(true);
+  const openEditModal = async (policy) => {
+    // The list only carries summaries; fetch the body for editing
+    try {
+      const res = await policyAPI.get(policy.id);
+      setSelectedPolicy(res.data);
+      setFormData({
+        title: res.data.title,
+        content: res.data.content,
+        version: res.data.version
+      });
+      setShowModal(true);
+    } catch (error) {
+      toast.error('Failed to load policy');
+    }
   };
 
   if (loading) {
@@ -35,9 +35,27 @@ function PolicyView() {
   };
 
   const viewPolicy = async (policy) => {
-    setSelectedPolicy(policy);
+    // Server-rendered HTML; content hash plus render version make the URL cacheable forever
+    try {
+      const res = await policyAPI.rendered(policy.id, policy.content_hash, policy.render_version)
+        .catch(() => policyAPI.rendered(policy.id));
+      setSelectedPolicy({ ...policy, html: res.data.html, toc: res.data.toc });
+    } catch (error) {
+      toast.error('Failed to load policy');
+    }
   };
 
+  const renderToc = (entries) => (
+    <ul style={{ margin: 0, paddingLeft: '1.25rem' }}>
+      {entries.map((entry) => (
+        <li key={entry.id}>
+          <a href={`#${entry.id}`}>{entry.title}</a>
+          {entry.children.length > 0 && renderToc(entry.children)}
+        </li>
+      ))}
+    </ul>
+  );
+
   if (loading) {
     return <div className="loading"><div className="spinner"></div></div>;
   }
@@ -120,13 +138,13 @@ function PolicyView() {
               marginBottom: '1.5rem',
               backgroundColor: 'white'
             }}>
-              <pre style={{
-                whiteSpace: 'pre-wrap',
-                fontFamily: 'inherit',
-                margin: 0
-              }}>
-                {selectedPolicy.content}
-              </pre>
+              {selectedPolicy.toc?.length > 0 && (
+                <nav style={{ marginBottom: '1rem', fontSize: '0.875rem' }}>
+                  {renderToc(selectedPolicy.toc)}
+                </nav>
+              )}
+              {/* HTML is sanitized by the backend when it is rendered */}
+              <div dangerouslySetInnerHTML={{ __html: selectedPolicy.html }} />
             </div>
 
             <div className="alert alert-warning" style={{ marginBottom: '1.5rem' }}>